@@ -2,6 +2,13 @@
 ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server (e.g. ``uvicorn backend.asgi:application``) so the
+Server-Sent Events endpoint (/api/events/stream/) can hold many idle
+connections without tying up worker threads.
+
+Under ASGI the outbound-I/O endpoints (Zoho pull, GitHub org/repo sync) use
+their async views (ASYNC_IO_VIEWS); set ASYNC_IO_VIEWS=False to keep the
+sync views.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
@@ -12,5 +19,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+os.environ.setdefault("ASYNC_IO_VIEWS", "True")
 
 application = get_asgi_application()
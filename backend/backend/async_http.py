@@ -0,0 +1,32 @@
+"""
+Shared async HTTP client for the ASGI profile.
+
+One httpx.AsyncClient per event loop, so outbound calls from async views
+(Zoho pull, GitHub sync) reuse pooled keep-alive connections instead of
+opening a new TLS connection per request.
+"""
+import asyncio
+import weakref
+
+import httpx
+
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+DEFAULT_TIMEOUT = 60
+
+_clients = weakref.WeakKeyDictionary()  # event loop -> AsyncClient
+
+
+def get_async_client():
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            timeout=DEFAULT_TIMEOUT,
+        )
+        _clients[loop] = client
+    return client
@@ -56,6 +56,7 @@ INSTALLED_APPS = [
     "reporting", # Reporting module
     "gamification", # Gamification engine
     "github", # GitHub integration
+    "events", # Domain event outbox
 ]
 
 MIDDLEWARE = [
@@ -155,6 +156,7 @@ CORS_ALLOWED_ORIGINS = [
     'http://192.168.1.26:5173', # Allow network access
 ]
 CORS_ALLOW_CREDENTIALS = True
+CORS_EXPOSE_HEADERS = ['X-Next-Cursor']  # reporting options paging
 
 # CSRF Trusted Origins (for Django Admin)
 CSRF_TRUSTED_ORIGINS = [
@@ -175,8 +177,49 @@ REST_FRAMEWORK = {
     ],
 }
 
-# Email Backend (Gmail SMTP)
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Server-Sent Events: seconds between checks for notifications/activity written
+# by other processes (e.g. run_event_worker). 0 = only rows written in-process.
+SSE_POLL_INTERVAL = float(os.getenv('SSE_POLL_INTERVAL', '2'))
+
+# ASGI profile: route outbound-I/O endpoints (Zoho pull, GitHub sync) to their
+# async views. backend/asgi.py turns this on by default.
+ASYNC_IO_VIEWS = os.getenv('ASYNC_IO_VIEWS', 'False') == 'True'
+
+# Reporting SQL datasets (MySQL): per-query time limit, and the largest EXPLAIN
+# row estimate a dataset query may have. 0 turns either check off.
+REPORTING_SQL_TIMEOUT_MS = int(os.getenv('REPORTING_SQL_TIMEOUT_MS', '30000'))
+REPORTING_SQL_MAX_EXPLAIN_ROWS = int(os.getenv('REPORTING_SQL_MAX_EXPLAIN_ROWS', '5000000'))
+
+# Reporting result cache: table version keys must be shared by every process
+# that writes (web workers, run_event_worker, run_report_worker,
+# refresh_snapshots), or a write in one process never invalidates another's
+# cached results. Uses Redis when REPORTING_CACHE_URL is set (needs the redis
+# package), otherwise the database (run `python manage.py createcachetable`
+# once). A single-process deployment can set REPORTING_SINGLE_PROCESS=True
+# to allow a local cache.
+REPORTING_CACHE_URL = os.getenv('REPORTING_CACHE_URL', '')
+REPORTING_SINGLE_PROCESS = os.getenv('REPORTING_SINGLE_PROCESS', 'False') == 'True'
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'reporting': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REPORTING_CACHE_URL,
+    } if REPORTING_CACHE_URL else {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'reporting_cache',
+    },
+}
+
+# Report jobs (run_report_worker): where results are stored, and how many jobs
+# may run at once for the same dataset.
+REPORT_JOB_DIR = os.getenv('REPORT_JOB_DIR', str(BASE_DIR / 'var' / 'report_jobs'))
+REPORT_JOB_DATASET_CONCURRENCY = int(os.getenv('REPORT_JOB_DATASET_CONCURRENCY', '2'))
+
+# Email Backend (Gmail SMTP). Emails are queued and sent by run_mail_worker;
+# set EMAIL_BACKEND=django.core.mail.backends.locmem.EmailBackend to test without SMTP.
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
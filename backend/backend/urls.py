@@ -27,5 +27,6 @@ urlpatterns = [
     path("api/reporting/", include('reporting.urls')), # Reporting
     path("api/gamification/", include('gamification.urls')), # Gamification
     path("api/github/", include('github.urls')), # GitHub integration
+    path("api/events/", include('events.urls')), # Server-Sent Events
 ]
 
@@ -0,0 +1,136 @@
+"""
+Benchmark: sync (WSGI) vs async (ASGI) outbound-I/O profiles.
+
+Runs the Zoho webhook fetch both ways against a local stub of the upstream
+API that answers every request after a fixed delay:
+
+  sync  - fetch_webhook_batch() in a fixed pool of worker threads, like a
+          WSGI server with that many workers.
+  async - afetch_webhook_batch() on one event loop over the pooled client,
+          like the ASGI profile (ASYNC_IO_VIEWS).
+
+No database is touched; only the fetch phase (the part that blocks on the
+network) is measured.
+
+Usage:
+    python benchmark_io_profiles.py
+    python benchmark_io_profiles.py --requests=200 --workers=8 --latency=0.1
+    python benchmark_io_profiles.py --json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pm.zoho_client import afetch_webhook_batch, fetch_webhook_batch
+
+
+def start_stub_upstream(latency, total_items):
+    """Fake webhook-logs API: paginated results after `latency` seconds."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            time.sleep(latency)
+            query = parse_qs(urlparse(self.path).query)
+            page = int(query.get('page', ['1'])[0])
+            page_size = int(query.get('page_size', ['100'])[0])
+            start = (page - 1) * page_size
+            results = [{'id': i, 'raw_body': '{}'} for i in range(start, min(start + page_size, total_items))]
+            body = json.dumps({'count': total_items, 'results': results}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        request_queue_size = 1024  # default backlog (5) drops bursts of connects
+
+    server = Server(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api/webhook-logs/?full_raw_body=true"
+
+
+def summarize(profile, latencies, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'profile': profile,
+        'requests': len(latencies),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 2),
+        'latency_p50_ms': round(statistics.median(latencies) * 1000, 1),
+        'latency_p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+    }
+
+
+def run_sync(url, n_requests, workers, batch_size):
+    def one():
+        t0 = time.perf_counter()
+        fetch_webhook_batch(0, batch_size, base_url=url)
+        return time.perf_counter() - t0
+
+    start = time.perf_counter()
+    # fetch_webhook_batch logs every page; keep the report readable
+    with ThreadPoolExecutor(max_workers=workers) as pool, contextlib.redirect_stdout(io.StringIO()):
+        latencies = list(pool.map(lambda _: one(), range(n_requests)))
+    return summarize(f'sync ({workers} workers)', latencies, time.perf_counter() - start)
+
+
+async def run_async(url, n_requests, batch_size):
+    async def one():
+        t0 = time.perf_counter()
+        await afetch_webhook_batch(0, batch_size, base_url=url)
+        return time.perf_counter() - t0
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(one() for _ in range(n_requests)))
+    return summarize('async (1 event loop)', latencies, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare sync and async outbound-I/O profiles')
+    parser.add_argument('--requests', type=int, default=100, help='Concurrent view calls to simulate')
+    parser.add_argument('--workers', type=int, default=4, help='Sync worker threads (WSGI workers)')
+    parser.add_argument('--latency', type=float, default=0.05, help='Stub upstream delay per request (seconds)')
+    parser.add_argument('--batch-size', type=int, default=300, help='Items per simulated pull (pages = batch/100)')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    server, url = start_stub_upstream(args.latency, total_items=args.batch_size)
+    try:
+        results = [
+            run_sync(url, args.requests, args.workers, args.batch_size),
+            asyncio.run(run_async(url, args.requests, args.batch_size)),
+        ]
+    finally:
+        server.shutdown()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"🔹 {args.requests} pulls of {args.batch_size} items, upstream latency {args.latency * 1000:.0f} ms")
+    for r in results:
+        print(f"  {r['profile']:<22} {r['throughput_rps']:>8} req/s   "
+              f"p50 {r['latency_p50_ms']:>7} ms   p95 {r['latency_p95_ms']:>7} ms   total {r['elapsed_s']} s")
+
+
+if __name__ == '__main__':
+    main()
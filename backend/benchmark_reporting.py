@@ -0,0 +1,509 @@
+"""
+Benchmark: reporting engine over synthetic data.
+
+  generate - bulk-inserts a synthetic workload (members, projects, tasks,
+             activity logs, timesheet entries) at the requested scale.
+             Generated rows have primary keys in a reserved UUID range, so
+             they never mix with real data and `clean` removes exactly them.
+  run      - (re)creates one benchmark dataset per shape, then times
+             DatasetExecutor.execute, QueryBuilderService.build_query, the
+             preview endpoint (result cache disabled and warm) and CSV/XLSX
+             exports over them. With --baseline, each median is compared to
+             a previous report and regressions fail the run (exit code 1).
+  clean    - deletes the generated rows and benchmark datasets.
+
+Shapes: flat and joined task lists, timesheets with calculated columns,
+activity logs, an aggregating SQL dataset and a materialized copy of the
+joined task list.
+
+Usage:
+    python benchmark_reporting.py generate --tasks=1000000 --activity=5000000 --timesheets=2000000
+    python benchmark_reporting.py run --repeat=5 --output=reporting_bench.json
+    python benchmark_reporting.py run --baseline=reporting_bench.json --threshold=0.2
+    python benchmark_reporting.py run --shapes=tasks_flat,tasks_joined --operations=execute,export_csv --json
+    python benchmark_reporting.py clean
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+import django
+# App start-up messages would corrupt --json output
+with contextlib.redirect_stdout(sys.stderr):
+    django.setup()
+
+from django.conf import settings
+from django.db import connection, reset_queries, transaction
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from pm.models import ActivityLogs, Members, Projects, TaskPriorities, TaskStatuses, Tasks, TimesheetEntry
+from reporting.models import Dataset, DatasetColumn
+from reporting.services import executor, snapshots
+from reporting.services.executor import DatasetExecutor
+from reporting.services.query import QueryBuilderService
+from reporting.views import DatasetViewSet, PreviewView
+
+# High 64 bits of every generated primary key
+MARK = 0xBE7C_4E90_0000_0000
+KINDS = {'member': 1, 'project': 2, 'status': 3, 'priority': 4, 'task': 5, 'activity': 6, 'timesheet': 7}
+MODELS = [
+    # Deletion order: children first
+    ('timesheet', TimesheetEntry),
+    ('activity', ActivityLogs),
+    ('task', Tasks),
+    ('project', Projects),
+    ('member', Members),
+    ('status', TaskStatuses),
+    ('priority', TaskPriorities),
+]
+
+DATASET_PREFIX = 'bench: '
+STATUSES = ['Backlog', 'To Do', 'In Progress', 'In Review', 'Done', 'Cancelled']
+PRIORITIES = ['Low', 'Medium', 'High', 'Urgent']
+VERBS = ['created', 'updated', 'commented', 'assigned', 'moved', 'closed']
+SUBJECTS = ['task', 'project', 'comment', 'iteration']
+WORDS = ['api', 'login', 'report', 'invoice', 'sync', 'export', 'dashboard', 'cache', 'search', 'billing',
+         'onboarding', 'upload', 'profile', 'payment', 'webhook', 'audit', 'grid', 'filter', 'mobile', 'email']
+START_DATE = date(2024, 1, 1)
+
+NOISE_FLOOR_MS = 5  # differences below this are never reported as regressions
+
+
+def bench_id(kind, i):
+    return uuid.UUID(int=(MARK << 64) | (KINDS[kind] << 48) | i)
+
+
+def bench_rows(model):
+    """Generated rows of a model (primary keys in the reserved range)."""
+    return model.objects.filter(pk__gte=uuid.UUID(int=MARK << 64), pk__lte=uuid.UUID(int=((MARK + 1) << 64) - 1))
+
+
+# ==================== GENERATE ====================
+
+def _insert(model, n, make_row, batch_size, label):
+    """bulk_create n rows built by make_row(i), one transaction per batch."""
+    started = time.perf_counter()
+    for offset in range(0, n, batch_size):
+        with transaction.atomic():
+            model.objects.bulk_create([make_row(i) for i in range(offset, min(offset + batch_size, n))])
+        reset_queries()  # DEBUG keeps every statement otherwise
+        done = min(offset + batch_size, n)
+        if done == n or (offset // batch_size) % 20 == 0:
+            print(f"\r  {label:<12} {done:>10,}/{n:,}", end='', flush=True)
+    elapsed = time.perf_counter() - started
+    print(f"   {elapsed:.1f}s ({n / elapsed if elapsed else 0:,.0f} rows/s)")
+    return {'rows': n, 'elapsed_s': round(elapsed, 3)}
+
+
+def generate(args):
+    if bench_rows(Tasks).exists():
+        sys.exit("Benchmark data already exists; run `clean` first")
+
+    rng = random.Random(args.seed)
+    n_tasks, n_activity, n_timesheets = args.tasks, args.activity, args.timesheets
+    n_members = args.members or max(50, n_tasks // 2000)
+    n_projects = args.projects or max(20, n_tasks // 5000)
+    batch = args.batch_size
+
+    # Task i belongs to project i % P and was created by member (i * 7919) % M,
+    # so timesheets and activity logs can refer to tasks without loading them.
+    def task_project(i):
+        return i % n_projects
+
+    def task_member(i):
+        return (i * 7919) % n_members
+
+    print(f"🔹 Generating {n_tasks:,} tasks, {n_activity:,} activity logs, {n_timesheets:,} timesheet entries")
+    timings = {}
+    timings['statuses'] = _insert(TaskStatuses, len(STATUSES), lambda i: TaskStatuses(
+        task_status_id=bench_id('status', i), name=STATUSES[i], sort_order=i,
+    ), batch, 'statuses')
+    timings['priorities'] = _insert(TaskPriorities, len(PRIORITIES), lambda i: TaskPriorities(
+        task_priority_id=bench_id('priority', i), name=PRIORITIES[i], sort_order=i,
+    ), batch, 'priorities')
+    timings['members'] = _insert(Members, n_members, lambda i: Members(
+        member_id=bench_id('member', i), first_name=f"Bench{i}", last_name='User',
+        email=f"bench{i}@bench.local", is_active=1,
+    ), batch, 'members')
+    timings['projects'] = _insert(Projects, n_projects, lambda i: Projects(
+        project_id=bench_id('project', i), name=f"Bench Project {i:05}", status=rng.choice(['active', 'on_hold', 'done']),
+        owner_member_id_id=bench_id('member', i % n_members), start_date=START_DATE,
+    ), batch, 'projects')
+    timings['tasks'] = _insert(Tasks, n_tasks, lambda i: Tasks(
+        task_id=bench_id('task', i),
+        project_id_id=bench_id('project', task_project(i)),
+        created_by_member_id_id=bench_id('member', task_member(i)),
+        title=f"{rng.choice(WORDS)} {rng.choice(WORDS)} #{i}",
+        status_id_id=bench_id('status', rng.choices(range(len(STATUSES)), weights=[3, 3, 2, 1, 6, 1])[0]),
+        priority_id_id=bench_id('priority', rng.randrange(len(PRIORITIES))),
+        estimate_hours=round(rng.uniform(0.5, 40), 1),
+        percent_complete=rng.randrange(0, 101, 5),
+        start_date=START_DATE + timedelta(days=rng.randrange(365)),
+        due_date=START_DATE + timedelta(days=rng.randrange(30, 540)),
+    ), batch, 'tasks')
+    timings['activity'] = _insert(ActivityLogs, n_activity, lambda i: ActivityLogs(
+        activity_log_id=bench_id('activity', i),
+        project_id_id=bench_id('project', task_project(i % max(n_tasks, 1))),
+        member_id_id=bench_id('member', rng.randrange(n_members)),
+        verb=rng.choice(VERBS), subject_type=rng.choice(SUBJECTS),
+        subject_id=bench_id('task', i % max(n_tasks, 1)),
+        data={'field': rng.choice(['status', 'title', 'assignee']), 'n': i},
+    ), batch, 'activity')
+    # Entry i logs task i % T on day i // T, which keeps (member, date, project, task) unique
+    timings['timesheets'] = _insert(TimesheetEntry, n_timesheets if n_tasks else 0, lambda i: TimesheetEntry(
+        timesheet_id=bench_id('timesheet', i),
+        member_id=bench_id('member', task_member(i % n_tasks)),
+        project_id=bench_id('project', task_project(i % n_tasks)),
+        task_id=bench_id('task', i % n_tasks),
+        date=START_DATE + timedelta(days=i // n_tasks),
+        hours=rng.choice([0.5, 1, 1.5, 2, 3, 4, 6, 8]),
+        is_billable=rng.random() < 0.7,
+    ), batch, 'timesheets')
+
+    if args.json:
+        print(json.dumps({'seed': args.seed, 'inserted': timings}, indent=2))
+
+
+def clean(args):
+    for dataset in Dataset.objects.filter(name__startswith=DATASET_PREFIX):
+        print(f"  dataset {dataset.name}")
+        if dataset.snapshot_table:
+            snapshots.drop_snapshot(dataset)
+        dataset.delete()
+    for kind, model in MODELS:
+        qs = bench_rows(model)
+        # A plain DELETE: the ORM would load millions of rows to send signals
+        deleted = qs._raw_delete(qs.db)
+        print(f"  {kind:<12} {deleted:>10,} deleted")
+
+
+# ==================== DATASETS ====================
+
+SHAPES = [
+    {
+        'name': 'tasks_flat',
+        'primary_model': 'pm.Tasks',
+        'columns': ['title', 'estimate_hours', 'percent_complete', 'due_date'],
+        'filters': {'percent_complete__gte': 90},
+    },
+    {
+        'name': 'tasks_joined',
+        'primary_model': 'pm.Tasks',
+        'columns': [
+            'title', 'project_id__name', 'status_id__name', 'priority_id__name',
+            'created_by_member_id__email', 'due_date',
+        ],
+        'filters': {'status_id__name': 'In Review'},
+    },
+    {
+        'name': 'timesheets_calculated',
+        'primary_model': 'pm.TimesheetEntry',
+        'columns': ['date', 'hours', 'member__email', 'project__name'],
+        'calculated': {'minutes': 'ROUND(hours * 60, 0)', 'billable_hours': 'IF(is_billable, hours, 0)'},
+        'filters': {'date__gte': str(START_DATE + timedelta(days=1))},
+    },
+    {
+        'name': 'activity_logs',
+        'primary_model': 'pm.ActivityLogs',
+        'columns': ['verb', 'subject_type', 'created_at', 'member_id__first_name', 'project_id__name'],
+        'filters': {'verb': 'closed'},
+    },
+    {
+        'name': 'tasks_sql',
+        'sql': (
+            "SELECT p.name AS project, s.name AS status, COUNT(*) AS tasks, SUM(t.estimate_hours) AS hours "
+            "FROM tasks t JOIN projects p ON p.project_id = t.project_id "
+            "LEFT JOIN task_statuses s ON s.task_status_id = t.status_id "
+            "GROUP BY p.name, s.name"
+        ),
+        'columns': ['project', 'status', 'tasks', 'hours'],
+        'filters': {'status': 'Done'},
+    },
+    {
+        'name': 'tasks_joined_materialized',
+        'primary_model': 'pm.Tasks',
+        'columns': [
+            'title', 'project_id__name', 'status_id__name', 'priority_id__name',
+            'created_by_member_id__email', 'due_date',
+        ],
+        'filters': {'status_id__name': 'In Review'},
+        'materialize': True,
+    },
+]
+
+OPERATIONS = ['execute', 'execute_filtered', 'build_query', 'preview_cold', 'preview_warm', 'export_csv', 'export_xlsx']
+DEFAULT_OPERATIONS = [op for op in OPERATIONS if op != 'export_xlsx']
+
+# Result cache off: every request runs its query
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+def create_dataset(shape):
+    """Fresh benchmark dataset for a shape (any previous one is replaced)."""
+    name = DATASET_PREFIX + shape['name']
+    for old in Dataset.objects.filter(name=name):
+        if old.snapshot_table:
+            snapshots.drop_snapshot(old)
+        old.delete()
+
+    dataset = Dataset.objects.create(
+        name=name,
+        query_type='sql' if shape.get('sql') else 'orm',
+        primary_model=shape.get('primary_model'),
+        sql_query=shape.get('sql'),
+        materialize=shape.get('materialize', False),
+        refresh_interval=0,
+    )
+    for order, path in enumerate(shape['columns']):
+        DatasetColumn.objects.create(dataset=dataset, field_name=path, display_name=path, sort_order=order)
+    for order, (path, formula) in enumerate(shape.get('calculated', {}).items(), start=len(shape['columns'])):
+        DatasetColumn.objects.create(
+            dataset=dataset, field_name=path, display_name=path, sort_order=order,
+            is_calculated=True, formula=formula, data_type='number',
+        )
+    dataset.refresh_from_db()
+    return dataset
+
+
+# ==================== OPERATIONS ====================
+
+factory = APIRequestFactory()
+
+
+def _ok(response):
+    if response.status_code >= 400:
+        response.render()
+        raise RuntimeError(f"HTTP {response.status_code}: {response.content[:300].decode(errors='replace')}")
+    return response
+
+
+def _preview(dataset, filters):
+    request = factory.post('/api/reporting/preview/', {'dataset_id': str(dataset.dataset_id), 'filters': filters}, format='json')
+    response = _ok(PreviewView.as_view()(request))
+    response.render()
+    return {'rows': response.data['count'], 'bytes': len(response.content)}
+
+
+def _export(dataset, filters, file_type):
+    request = factory.get(f'/api/reporting/datasets/{dataset.pk}/export/{file_type}/', {'filters': json.dumps(filters)})
+    response = _ok(DatasetViewSet.as_view({'get': 'export'})(request, pk=str(dataset.pk), file_type=file_type))
+    size = sum(len(chunk) for chunk in response.streaming_content)
+    response.close()
+    return {'bytes': size}
+
+
+def operation(name, shape, dataset, args):
+    """Callable running one measured operation; returns a dict of result sizes."""
+    filters = shape.get('filters', {})
+    export_filters = {} if args.export_all else filters
+
+    if name == 'execute':
+        return lambda: {'rows': len(DatasetExecutor.execute(dataset, None, args.limit))}
+    if name == 'execute_filtered':
+        return lambda: {'rows': len(DatasetExecutor.execute(dataset, filters, args.limit))}
+    if name == 'build_query':
+        if shape.get('sql'):
+            return None
+
+        def build():
+            qs = QueryBuilderService.build_query({
+                'primary_model': shape['primary_model'], 'columns': shape['columns'], 'filters': filters,
+            })
+            return {'rows': len(list(qs[:args.limit]))}
+        return build
+    if name == 'preview_cold':
+        def cold():
+            with override_settings(CACHES=NO_CACHE):
+                return _preview(dataset, filters)
+        return cold
+    if name == 'preview_warm':
+        return lambda: _preview(dataset, filters)
+    if name == 'export_csv':
+        return lambda: _export(dataset, export_filters, 'csv')
+    if name == 'export_xlsx':
+        return lambda: _export(dataset, export_filters, 'xlsx')
+    raise ValueError(f"Unknown operation '{name}'")
+
+
+def measure(func, repeat, warmup):
+    """Timings of `repeat` calls after `warmup` untimed ones."""
+    for _ in range(warmup):
+        func()
+    timings = []
+    sizes = {}
+    for _ in range(repeat):
+        reset_queries()
+        started = time.perf_counter()
+        sizes = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        **sizes,
+        'runs': len(timings),
+        'min_ms': round(timings[0], 2),
+        'median_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(timings[max(0, int(len(timings) * 0.95 + 0.5) - 1)], 2),
+        'max_ms': round(timings[-1], 2),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Median change against a previous report, per (shape, operation)."""
+    previous = {(r['shape'], r['operation']): r for r in baseline.get('results', []) if 'median_ms' in r}
+    comparison = []
+    for r in results:
+        before = previous.get((r['shape'], r['operation']))
+        if not before or 'median_ms' not in r:
+            continue
+        delta = r['median_ms'] - before['median_ms']
+        ratio = r['median_ms'] / before['median_ms'] if before['median_ms'] else None
+        comparison.append({
+            'shape': r['shape'],
+            'operation': r['operation'],
+            'baseline_median_ms': before['median_ms'],
+            'median_ms': r['median_ms'],
+            'change': round(ratio - 1, 3) if ratio is not None else None,
+            'regression': ratio is not None and ratio > 1 + threshold and delta > NOISE_FLOOR_MS,
+        })
+    return comparison
+
+
+def run(args):
+    shapes = [s for s in SHAPES if not args.shapes or s['name'] in args.shapes.split(',')]
+    operations = args.operations.split(',') if args.operations else DEFAULT_OPERATIONS
+    unknown = set(operations) - set(OPERATIONS)
+    if unknown:
+        sys.exit(f"Unknown operations: {', '.join(sorted(unknown))} (choose from {', '.join(OPERATIONS)})")
+
+    report = {
+        'meta': {
+            'started_at': timezone.now().isoformat(),
+            'commit': _git_commit(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'debug': settings.DEBUG,
+            'repeat': args.repeat,
+            'warmup': args.warmup,
+            'limit': args.limit,
+            'export_filtered': not args.export_all,
+            'data': {kind: bench_rows(model).count() for kind, model in MODELS},
+        },
+        'results': [],
+    }
+    if not report['meta']['data']['task']:
+        print("⚠️  No benchmark data found; run `generate` first", file=sys.stderr)
+
+    executor.clear_plans()
+    for shape in shapes:
+        dataset = create_dataset(shape)
+        log = sys.stderr if args.json else sys.stdout
+        print(f"🔹 {shape['name']}", file=log)
+
+        steps = []
+        if dataset.materialize:
+            steps.append(('snapshot_refresh', lambda: {'rows': snapshots.refresh(dataset, full=True)[1]}, 1, 0))
+        for name in operations:
+            func = operation(name, shape, dataset, args)
+            if func is not None:
+                # One full export per run is plenty
+                once = name.startswith('export')
+                steps.append((name, func, 1 if once else args.repeat, 0 if once else args.warmup))
+
+        for name, func, repeat, warmup in steps:
+            result = {'shape': shape['name'], 'operation': name}
+            try:
+                result.update(measure(func, repeat, warmup))
+            except Exception as e:
+                result['error'] = str(e)
+            if name == 'snapshot_refresh':
+                # Later operations read the snapshot
+                dataset.refresh_from_db()
+            report['results'].append(result)
+            if 'error' in result:
+                print(f"  {name:<18} ERROR {result['error']}", file=log)
+            else:
+                size = f"rows {result['rows']}" if 'rows' in result else f"{result.get('bytes', 0):,} bytes"
+                print(f"  {name:<18} median {result['median_ms']:>10} ms   p95 {result['p95_ms']:>10} ms   {size}", file=log)
+
+    report['meta']['finished_at'] = timezone.now().isoformat()
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['comparison'] = compare(report['results'], json.load(f), args.threshold)
+        regressions = [c for c in report['comparison'] if c['regression']]
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+    elif args.baseline:
+        print(f"\n🔹 Against {args.baseline} (threshold {args.threshold:.0%})")
+        for c in report['comparison']:
+            change = f"{c['change']:+.1%}" if c['change'] is not None else 'n/a'
+            flag = '  ❌ regression' if c['regression'] else ''
+            print(f"  {c['shape']:<26} {c['operation']:<18} {c['baseline_median_ms']:>10} → "
+                  f"{c['median_ms']:>10} ms  {change}{flag}")
+
+    if regressions:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the reporting engine over synthetic data')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    gen = sub.add_parser('generate', help='Bulk-insert synthetic benchmark data')
+    gen.add_argument('--tasks', type=int, default=100000)
+    gen.add_argument('--activity', type=int, default=500000, help='Activity log rows')
+    gen.add_argument('--timesheets', type=int, default=200000, help='Timesheet entries')
+    gen.add_argument('--members', type=int, default=0, help='Default: tasks / 2000 (at least 50)')
+    gen.add_argument('--projects', type=int, default=0, help='Default: tasks / 5000 (at least 20)')
+    gen.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT')
+    gen.add_argument('--seed', type=int, default=42)
+    gen.add_argument('--json', action='store_true', help='Print insert timings as JSON')
+
+    bench = sub.add_parser('run', help='Time the reporting engine')
+    bench.add_argument('--repeat', type=int, default=5, help='Timed runs per operation (exports run once)')
+    bench.add_argument('--warmup', type=int, default=1, help='Untimed runs before timing')
+    bench.add_argument('--limit', type=int, default=100, help='Row limit for execute and build_query')
+    bench.add_argument('--shapes', help=f"Comma-separated subset of: {', '.join(s['name'] for s in SHAPES)}")
+    bench.add_argument('--operations', help=f"Comma-separated subset of: {', '.join(OPERATIONS)}")
+    bench.add_argument('--export-all', action='store_true', help="Export every row instead of the shape's filter")
+    bench.add_argument('--output', help='Write the JSON report to this file')
+    bench.add_argument('--baseline', help='Previous JSON report to compare against')
+    bench.add_argument('--threshold', type=float, default=0.2, help='Median slowdown counted as a regression')
+    bench.add_argument('--json', action='store_true', help='Print the JSON report')
+
+    sub.add_parser('clean', help='Delete benchmark data and datasets')
+
+    args = parser.parse_args()
+    {'generate': generate, 'run': run, 'clean': clean}[args.command](args)
+
+
+if __name__ == '__main__':
+    main()
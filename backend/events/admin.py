@@ -0,0 +1,16 @@
+from django.contrib import admin
+from .models import OutboxEvent, OutboundEmail
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'event_type', 'ordering_key', 'status', 'attempts', 'created_at', 'processed_at']
+    list_filter = ['event_type', 'status']
+    search_fields = ['ordering_key', 'last_error']
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ['id', 'category', 'to_email', 'subject', 'status', 'attempts', 'created_at', 'sent_at']
+    list_filter = ['category', 'status']
+    search_fields = ['to_email', 'subject', 'last_error']
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class EventsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'events'
+    verbose_name = 'Domain Events'
+
+    def ready(self):
+        # Connect the SSE broadcast receivers
+        import events.stream  # noqa: F401
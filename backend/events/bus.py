@@ -0,0 +1,119 @@
+"""
+Domain event bus backed by the outbox table.
+
+    from events.bus import publish, subscribe
+
+    # Writer: inside the transaction that makes the change
+    publish('task.status_changed', {...}, ordering_key=member_id)
+
+    # Subscriber: registered at import time (e.g. from an app's ready())
+    @subscribe('task.status_changed')
+    def handle(payload): ...
+
+dispatch_pending() is run by the `run_event_worker` command. Handlers that
+raise are retried with exponential backoff; while an event is waiting for a
+retry, later events with the same ordering_key are held back so each member's
+events are always handled in order.
+"""
+import traceback
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from events.models import OutboxEvent
+
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 3600
+
+_subscribers = {}
+
+
+def subscribe(event_type):
+    """Decorator registering a handler(payload) for an event type."""
+    def decorator(func):
+        _subscribers.setdefault(event_type, []).append(func)
+        return func
+    return decorator
+
+
+def publish(event_type, payload, ordering_key=''):
+    """
+    Record an event. Call it inside the writer's transaction so the event is
+    stored if and only if the change commits.
+    """
+    return OutboxEvent.objects.create(
+        event_type=event_type,
+        ordering_key=str(ordering_key or ''),
+        payload=payload,
+    )
+
+
+def _backoff(attempts):
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+def _handle(event):
+    for handler in _subscribers.get(event.event_type, []):
+        handler(event.payload)
+
+
+def dispatch_pending(batch_size=100):
+    """
+    Dispatch one batch of due events in id order; events still waiting for a
+    retry, and later events with the same ordering_key, are left for later.
+    Returns (dispatched, failed) counts.
+    """
+    now = timezone.now()
+    dispatched = failed = 0
+
+    # Events waiting for a retry hold back later events with the same key
+    earlier_waiting = OutboxEvent.objects.filter(
+        status='pending', ordering_key=OuterRef('ordering_key'),
+        id__lt=OuterRef('id'), next_attempt_at__gt=now,
+    )
+
+    with transaction.atomic():
+        # skip_locked lets a second worker pick other rows instead of waiting;
+        # run a single worker if strict per-key ordering matters across workers
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(status='pending')
+            .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+            .filter(Q(ordering_key='') | ~Exists(earlier_waiting))
+            .order_by('id')[:batch_size]
+        )
+
+        blocked_keys = set()
+        for event in events:
+            key = event.ordering_key
+            if key and key in blocked_keys:
+                continue
+
+            try:
+                with transaction.atomic():
+                    _handle(event)
+            except Exception:
+                event.attempts += 1
+                event.last_error = traceback.format_exc()[-4000:]
+                if event.attempts >= MAX_ATTEMPTS:
+                    event.status = 'dead'
+                    event.processed_at = now
+                else:
+                    event.next_attempt_at = now + _backoff(event.attempts)
+                    if key:
+                        blocked_keys.add(key)
+                event.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at', 'processed_at'])
+                failed += 1
+                print(f"⚠️ Event #{event.id} {event.event_type} failed (attempt {event.attempts})")
+                continue
+
+            event.status = 'done'
+            event.attempts += 1
+            event.processed_at = timezone.now()
+            event.save(update_fields=['status', 'attempts', 'processed_at'])
+            dispatched += 1
+
+    return dispatched, failed
@@ -0,0 +1,131 @@
+"""
+Outbound mail queue.
+
+    from events.mail import queue_email, queue_emails
+
+    # Inside the request's transaction: the email is stored with the change
+    queue_email('a@b.com', 'Subject', 'Body', category='invite')
+
+send_pending() is run by the `run_mail_worker` command. Each batch is sent
+over one SMTP connection (EMAIL_BACKEND, so locmem works in tests). Failed
+messages are retried with exponential backoff and marked dead after
+MAX_ATTEMPTS.
+"""
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from events.models import OutboundEmail
+
+MAX_ATTEMPTS = 6
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+
+
+def _default_from():
+    return settings.EMAIL_HOST_USER or settings.DEFAULT_FROM_EMAIL
+
+
+def queue_emails(messages):
+    """
+    Queue many emails with one INSERT.
+    `messages` is a list of dicts: to_email, subject, body, optional category/from_email.
+    """
+    return OutboundEmail.objects.bulk_create([
+        OutboundEmail(
+            category=m.get('category', ''),
+            to_email=m['to_email'],
+            from_email=m.get('from_email') or _default_from() or '',
+            subject=m['subject'],
+            body=m['body'],
+        )
+        for m in messages
+    ])
+
+
+def queue_email(to_email, subject, body, category='', from_email=None):
+    return queue_emails([{
+        'to_email': to_email,
+        'subject': subject,
+        'body': body,
+        'category': category,
+        'from_email': from_email,
+    }])[0]
+
+
+def _backoff(attempts):
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+def _failed(email, error, now):
+    email.attempts += 1
+    email.last_error = error[-4000:]
+    if email.attempts >= MAX_ATTEMPTS:
+        email.status = 'dead'
+    else:
+        email.next_attempt_at = now + _backoff(email.attempts)
+
+
+def send_pending(batch_size=50):
+    """
+    Send one batch of due emails over a single connection.
+    Returns (sent, failed) counts.
+    """
+    now = timezone.now()
+    sent = failed = 0
+
+    with transaction.atomic():
+        emails = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='pending')
+            .exclude(next_attempt_at__gt=now)
+            .order_by('id')[:batch_size]
+        )
+        if not emails:
+            return 0, 0
+
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+        except Exception:
+            # Server unreachable: the whole batch waits for the next attempt
+            error = traceback.format_exc()
+            for email in emails:
+                _failed(email, error, now)
+            OutboundEmail.objects.bulk_update(emails, ['attempts', 'last_error', 'status', 'next_attempt_at'])
+            print(f"⚠️ Mail server unavailable, {len(emails)} emails deferred")
+            return 0, len(emails)
+
+        try:
+            for email in emails:
+                message = EmailMessage(
+                    subject=email.subject,
+                    body=email.body,
+                    from_email=email.from_email or None,
+                    to=[email.to_email],
+                    connection=connection,
+                )
+                try:
+                    message.send()
+                except Exception:
+                    _failed(email, traceback.format_exc(), now)
+                    failed += 1
+                    print(f"⚠️ Email #{email.id} to {email.to_email} failed (attempt {email.attempts})")
+                    continue
+
+                email.status = 'sent'
+                email.attempts += 1
+                email.sent_at = timezone.now()
+                sent += 1
+        finally:
+            connection.close()
+
+        OutboundEmail.objects.bulk_update(
+            emails, ['status', 'attempts', 'last_error', 'next_attempt_at', 'sent_at']
+        )
+
+    return sent, failed
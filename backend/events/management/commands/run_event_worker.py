@@ -0,0 +1,58 @@
+"""
+Django Management Command: run_event_worker
+
+Dispatches domain events from the outbox to their subscribers
+(gamification credits, notifications, ...), off the HTTP request path.
+
+Usage:
+    python manage.py run_event_worker                 # Run forever
+    python manage.py run_event_worker --once          # Drain pending events and exit
+    python manage.py run_event_worker --interval=2    # Poll every 2 seconds when idle
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from events.bus import dispatch_pending
+
+
+class Command(BaseCommand):
+    help = 'Dispatch pending domain events from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Dispatch until nothing is ready, then exit',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds to sleep when there is nothing to dispatch',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Events claimed per batch',
+        )
+
+    def handle(self, *args, **options):
+        once = options.get('once')
+        interval = options.get('interval')
+        batch_size = options.get('batch_size')
+
+        self.stdout.write("Event worker started")
+        while True:
+            close_old_connections()
+            dispatched, failed = dispatch_pending(batch_size)
+            if dispatched or failed:
+                self.stdout.write(f"  dispatched={dispatched} failed={failed}")
+
+            # Failures back off, so a batch with only failures may still leave due events
+            if not (dispatched or failed):
+                if once:
+                    break
+                time.sleep(interval)
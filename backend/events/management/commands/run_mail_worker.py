@@ -0,0 +1,57 @@
+"""
+Django Management Command: run_mail_worker
+
+Sends queued emails (invitations, password resets, ...) in batches over a
+single SMTP connection, off the HTTP request path.
+
+Usage:
+    python manage.py run_mail_worker                 # Run forever
+    python manage.py run_mail_worker --once          # Send everything due and exit
+    python manage.py run_mail_worker --batch-size=100
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from events.mail import send_pending
+
+
+class Command(BaseCommand):
+    help = 'Send queued outbound emails'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Send until nothing is due, then exit',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Seconds to sleep when there is nothing to send',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Emails sent per SMTP connection',
+        )
+
+    def handle(self, *args, **options):
+        once = options.get('once')
+        interval = options.get('interval')
+        batch_size = options.get('batch_size')
+
+        self.stdout.write("Mail worker started")
+        while True:
+            close_old_connections()
+            sent, failed = send_pending(batch_size)
+            if sent or failed:
+                self.stdout.write(f"  sent={sent} failed={failed}")
+
+            if not sent:
+                if once:
+                    break
+                time.sleep(interval)
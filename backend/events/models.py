@@ -0,0 +1,74 @@
+"""
+Domain Events - Transactional Outbox
+Events are written in the same transaction as the change that caused them and
+dispatched to subscribers later by the event worker (run_event_worker).
+Outbound emails are queued the same way and sent by run_mail_worker.
+"""
+from django.db import models
+
+
+class OutboxEvent(models.Model):
+    """A domain event waiting to be (or already) dispatched."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('dead', 'Dead'),  # gave up after max attempts
+    ]
+
+    id = models.BigAutoField(primary_key=True)  # dispatch order
+    event_type = models.CharField(max_length=100, help_text="e.g., task.status_changed")
+    ordering_key = models.CharField(max_length=100, blank=True, default='',
+                                    help_text="Events with the same key are handled in order (e.g. member_id)")
+    payload = models.JSONField(default=dict)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'outbox_events'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.event_type} ({self.status})"
+
+
+class OutboundEmail(models.Model):
+    """A queued email, sent by the mail worker (run_mail_worker)."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead'),  # gave up after max attempts
+    ]
+
+    id = models.BigAutoField(primary_key=True)  # send order
+    category = models.CharField(max_length=50, blank=True, default='', help_text="e.g., invite, password_reset")
+    to_email = models.CharField(max_length=255)
+    from_email = models.CharField(max_length=255, blank=True, default='')
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'outbound_emails'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.category} to {self.to_email} ({self.status})"
@@ -0,0 +1,261 @@
+"""
+In-process pub/sub for Server-Sent Events.
+
+Channels are "member:<member_id>" and "project:<project_id>". New
+Notification and ActivityLogs rows are broadcast to the matching channels
+after their transaction commits; connected SSE clients (events.views.stream_view)
+wait on an asyncio queue, so an idle client costs no database work.
+
+Rows written by another process (e.g. run_event_worker creating notifications)
+never reach this process's signals. While at least one client is connected, a
+single shared tailer picks those up with one query per table every
+SSE_POLL_INTERVAL seconds, however many clients there are. Set
+SSE_POLL_INTERVAL = 0 when all writers run in the ASGI process.
+
+Event ids are a composite "<created_at>|<key>" cursor, so a reconnect resumes
+after exactly the last row sent even when several rows share a timestamp.
+Rows can commit after later-stamped ones (run_event_worker writes a whole
+batch in one transaction), so the tailer also re-reads the last
+TAIL_OVERLAP_SECONDS before its cursor; publish() drops rows already sent.
+"""
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+HEARTBEAT_SECONDS = 15
+RETRY_MILLISECONDS = 5000
+REPLAY_LIMIT = 100
+RECENT_IDS = 5000
+TAIL_OVERLAP_SECONDS = 30
+
+_lock = threading.Lock()
+_subscribers = {}  # channel -> set of (loop, queue)
+_recent = OrderedDict()  # row ids already broadcast (dedupe signals vs tailer)
+_tailer = None
+
+
+# ==================== SERIALIZATION ====================
+
+def _event_id(created_at, key):
+    return f"{created_at.isoformat()}|{key}"
+
+
+def parse_event_id(event_id):
+    """(created_at, key) from an event id; ids without a key resume at the timestamp itself."""
+    stamp, _, key = (event_id or '').partition('|')
+    created_at = parse_datetime(stamp)
+    return (created_at, key) if created_at else None
+
+
+def notification_message(n):
+    key = f"notification:{n.notification_id}"
+    return {
+        'id': _event_id(n.created_at, key),
+        'cursor': (n.created_at, key),
+        'event': 'notification',
+        'channels': [f"member:{n.member_id}"],
+        'key': key,
+        'data': {
+            'notification_id': str(n.notification_id),
+            'type': n.notification_type,
+            'title': n.title,
+            'message': n.message,
+            'icon': n.icon,
+            'is_read': n.is_read,
+            'link': n.link,
+            'created_at': n.created_at.isoformat()
+        },
+    }
+
+
+def activity_message(a):
+    channels = []
+    if a.member_id_id:
+        channels.append(f"member:{a.member_id_id}")
+    if a.project_id_id:
+        channels.append(f"project:{a.project_id_id}")
+    key = f"activity:{a.activity_log_id}"
+    return {
+        'id': _event_id(a.created_at, key),
+        'cursor': (a.created_at, key),
+        'event': 'activity',
+        'channels': channels,
+        'key': key,
+        'data': {
+            'activity_log_id': str(a.activity_log_id),
+            'project_id': str(a.project_id_id) if a.project_id_id else None,
+            'member_id': str(a.member_id_id) if a.member_id_id else None,
+            'verb': a.verb,
+            'subject_type': a.subject_type,
+            'subject_id': str(a.subject_id),
+            'data': a.data,
+            'created_at': a.created_at.isoformat()
+        },
+    }
+
+
+def format_sse(message):
+    return f"id: {message['id']}\nevent: {message['event']}\ndata: {json.dumps(message['data'])}\n\n"
+
+
+# ==================== PUB/SUB ====================
+
+def publish(message):
+    """Deliver a message to every subscriber of its channels (thread-safe)."""
+    with _lock:
+        if message['key'] in _recent:
+            return
+        _recent[message['key']] = True
+        while len(_recent) > RECENT_IDS:
+            _recent.popitem(last=False)
+
+        targets = set()
+        for channel in message['channels']:
+            targets |= _subscribers.get(channel, set())
+
+    for loop, queue in targets:
+        loop.call_soon_threadsafe(queue.put_nowait, message)
+
+
+def broadcast_notifications(notifications):
+    for n in notifications:
+        publish(notification_message(n))
+
+
+@receiver(post_save, sender='pm.ActivityLogs')
+def _activity_saved(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: publish(activity_message(instance)))
+
+
+@receiver(post_save, sender='gamification.Notification')
+def _notification_saved(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: publish(notification_message(instance)))
+
+
+def _subscribe(channels):
+    global _tailer
+    entry = (asyncio.get_running_loop(), asyncio.Queue())
+    with _lock:
+        for channel in channels:
+            _subscribers.setdefault(channel, set()).add(entry)
+        if _tailer is None and getattr(settings, 'SSE_POLL_INTERVAL', 2):
+            _tailer = asyncio.ensure_future(_tail())
+    return entry
+
+
+def _unsubscribe(channels, entry):
+    with _lock:
+        for channel in channels:
+            subscribers = _subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(entry)
+                if not subscribers:
+                    del _subscribers[channel]
+
+
+# ==================== DATABASE ACCESS ====================
+
+def _rows_since(after, member_id=None, project_id=None, limit=REPLAY_LIMIT, until=None):
+    """
+    Notification and ActivityLogs messages after the (created_at, key) cursor
+    `after`, oldest first; with `until`, only rows up to that timestamp.
+    """
+    from gamification.models import Notification
+    from pm.models import ActivityLogs
+
+    since, after_key = after
+    # >= so rows sharing the cursor's timestamp are compared on their key below
+    notifications = Notification.objects.filter(created_at__gte=since)
+    activity = ActivityLogs.objects.filter(created_at__gte=since)
+    if until is not None:
+        notifications = notifications.filter(created_at__lte=until)
+        activity = activity.filter(created_at__lte=until)
+    if member_id or project_id:
+        notifications = notifications.filter(member_id=member_id) if member_id else notifications.none()
+        if member_id and project_id:
+            activity = activity.filter(member_id=member_id) | activity.filter(project_id=project_id)
+        elif member_id:
+            activity = activity.filter(member_id=member_id)
+        else:
+            activity = activity.filter(project_id=project_id)
+
+    messages = [notification_message(n) for n in notifications.order_by('created_at', 'notification_id')[:limit]]
+    messages += [activity_message(a) for a in activity.order_by('created_at', 'activity_log_id')[:limit]]
+    messages = [m for m in messages if m['cursor'] > (since, after_key)]
+    messages.sort(key=lambda m: m['cursor'])
+    return messages[:limit]
+
+
+async def _tail():
+    """Shared poller for rows written by other processes; stops when nobody listens."""
+    global _tailer
+    cursor = (timezone.now(), '')
+    interval = getattr(settings, 'SSE_POLL_INTERVAL', 2)
+    overlap = timedelta(seconds=TAIL_OVERLAP_SECONDS)
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            with _lock:
+                if not _subscribers:
+                    _tailer = None
+                    return
+            # Rows committed late with a timestamp before the cursor
+            late = await sync_to_async(_rows_since)((cursor[0] - overlap, ''), limit=1000, until=cursor[0])
+            messages = await sync_to_async(_rows_since)(cursor, limit=1000)
+            for message in late + messages:
+                publish(message)
+            if messages:
+                cursor = messages[-1]['cursor']
+    except Exception:
+        with _lock:
+            _tailer = None
+        raise
+
+
+async def stream(member_id=None, project_id=None, last_event_id=None):
+    """
+    Async iterator of SSE frames for a member and/or project.
+    `last_event_id` (the Last-Event-ID header) replays rows missed while the
+    client was disconnected with one query; after that only the queue is read.
+    """
+    channels = []
+    if member_id:
+        channels.append(f"member:{member_id}")
+    if project_id:
+        channels.append(f"project:{project_id}")
+
+    loop_queue = _subscribe(channels)
+    queue = loop_queue[1]
+    try:
+        yield f"retry: {RETRY_MILLISECONDS}\n\n"
+
+        replayed = set()
+        after = parse_event_id(last_event_id) if last_event_id else None
+        if after:
+            for message in await sync_to_async(_rows_since)(after, member_id, project_id):
+                replayed.add(message['key'])
+                yield format_sse(message)
+
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            if message['key'] in replayed:
+                continue  # already sent during replay
+            yield format_sse(message)
+    finally:
+        _unsubscribe(channels, loop_queue)
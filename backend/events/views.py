@@ -0,0 +1,33 @@
+import uuid
+
+from django.http import JsonResponse, StreamingHttpResponse
+
+from .stream import stream
+
+
+async def stream_view(request):
+    """
+    Server-Sent Events stream of new notifications and activity.
+    Query params: ?member_id=<uuid>&project_id=<uuid> (at least one).
+    Reconnecting clients send Last-Event-ID (EventSource does this automatically)
+    to receive what they missed. Serve through ASGI (backend.asgi) so each open
+    stream doesn't hold a worker thread.
+    """
+    try:
+        # Normalize so channel names match the rows' UUID formatting
+        member_id = str(uuid.UUID(request.GET['member_id'])) if request.GET.get('member_id') else None
+        project_id = str(uuid.UUID(request.GET['project_id'])) if request.GET.get('project_id') else None
+    except ValueError:
+        return JsonResponse({'error': 'Invalid member_id or project_id'}, status=400)
+    if not member_id and not project_id:
+        return JsonResponse({'error': 'member_id or project_id required'}, status=400)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+
+    response = StreamingHttpResponse(
+        stream(member_id, project_id, last_event_id),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # disable proxy buffering (nginx)
+    return response
@@ -0,0 +1,146 @@
+"""
+Rule-indexed achievement engine.
+
+Achievement.unlock_condition dicts (e.g. {"total_credits": 1000} or
+{"streak_days": 7}) are compiled once into threshold evaluators and indexed by
+the metric they depend on. An award only evaluates the achievements whose
+metric actually changed, using counter values that are already in memory.
+
+Metrics:
+    total_credits   - UserLevel.total_credits
+    streak_days     - UserStreak.current_streak
+    tasks_completed, bugs_fixed, code_reviews, early_delivery, sop_followed
+                    - UserMetrics counters
+"""
+import threading
+import time
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from gamification.models import Achievement, UserAchievement, UserMetrics
+
+# Rule event_name -> UserMetrics counter it increments
+EVENT_METRICS = {
+    'task_completed': 'tasks_completed',
+    'bug_fixed': 'bugs_fixed',
+    'code_review': 'code_reviews',
+    'early_delivery': 'early_delivery',
+    'sop_followed': 'sop_followed',
+}
+
+# Older condition keys still found in seeded data
+METRIC_ALIASES = {
+    'early_completions': 'early_delivery',
+}
+
+SUPPORTED_METRICS = set(UserMetrics.COUNTER_FIELDS) | {'total_credits', 'streak_days'}
+
+# Other processes can't see our invalidation signal, so rebuild periodically too
+INDEX_TTL_SECONDS = 300
+
+_lock = threading.Lock()
+_index = None
+_index_built_at = 0
+
+
+def _compile():
+    """
+    Build {metric: [(threshold, achievement), ...]} sorted by threshold.
+    A condition with several keys unlocks when any of them is met.
+    """
+    index = {}
+    for achievement in Achievement.objects.filter(is_active=True):
+        for key, threshold in (achievement.unlock_condition or {}).items():
+            metric = METRIC_ALIASES.get(key, key)
+            if metric not in SUPPORTED_METRICS:
+                print(f"   ⚠️ Achievement '{achievement.name}' uses unknown metric '{key}'")
+                continue
+            try:
+                threshold = int(threshold)
+            except (TypeError, ValueError):
+                continue
+            index.setdefault(metric, []).append((threshold, achievement))
+
+    for evaluators in index.values():
+        evaluators.sort(key=lambda e: e[0])
+    return index
+
+
+def get_index():
+    global _index, _index_built_at
+    with _lock:
+        if _index is None or time.monotonic() - _index_built_at > INDEX_TTL_SECONDS:
+            _index = _compile()
+            _index_built_at = time.monotonic()
+        return _index
+
+
+def invalidate_index():
+    global _index
+    with _lock:
+        _index = None
+
+
+@receiver(post_save, sender=Achievement)
+@receiver(post_delete, sender=Achievement)
+def _achievement_changed(sender, **kwargs):
+    # Drop now for this thread, and again after commit in case another
+    # thread rebuilt from pre-commit data in between
+    invalidate_index()
+    transaction.on_commit(invalidate_index)
+
+
+def increment_metrics(member_id, deltas):
+    """
+    Apply counter deltas ({metric: n}) for a member and return the new values
+    of the changed counters.
+    """
+    deltas = {m: n for m, n in deltas.items() if m in UserMetrics.COUNTER_FIELDS and n}
+    if not deltas:
+        return {}
+
+    UserMetrics.objects.get_or_create(member_id=member_id)
+    UserMetrics.objects.filter(member_id=member_id).update(
+        **{m: F(m) + n for m, n in deltas.items()}
+    )
+    return UserMetrics.objects.filter(member_id=member_id).values(*deltas.keys()).first()
+
+
+def evaluate(member_id, metrics):
+    """
+    Unlock achievements for the metrics that changed.
+
+    `metrics` maps metric name -> current value. Only achievements indexed under
+    those metrics are considered. Returns the newly unlocked Achievements.
+    """
+    index = get_index()
+
+    candidates = {}
+    for metric, value in metrics.items():
+        for threshold, achievement in index.get(metric, []):
+            if threshold > value:
+                break  # sorted by threshold
+            candidates[achievement.achievement_id] = achievement
+
+    if not candidates:
+        return []
+
+    unlocked_ids = set(
+        UserAchievement.objects.filter(
+            member_id=member_id, achievement_id__in=candidates.keys()
+        ).values_list('achievement_id', flat=True)
+    )
+    newly_unlocked = [a for aid, a in candidates.items() if aid not in unlocked_ids]
+    if not newly_unlocked:
+        return []
+
+    UserAchievement.objects.bulk_create(
+        [UserAchievement(member_id=member_id, achievement=a) for a in newly_unlocked],
+        ignore_conflicts=True
+    )
+    for achievement in newly_unlocked:
+        print(f"🏅 Achievement Unlocked: {achievement.name} for {member_id}")
+    return newly_unlocked
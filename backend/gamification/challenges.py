@@ -0,0 +1,124 @@
+"""
+Event-driven challenge progress.
+
+Active challenges are kept in an in-memory index keyed by activity_type. When
+a member earns credits, update_user_level() reports what happened (counter
+deltas, credits earned, current streak) and only the member's joined,
+unfinished challenges for those activity types are touched. Completion is
+detected in the same pass and the reward is paid through the ledger service.
+"""
+import threading
+import time
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from gamification.models import Challenge, UserChallenge, CreditLedger
+
+# Challenge progress that tracks a current value instead of a running count
+VALUE_ACTIVITIES = {'streak_days'}
+
+INDEX_TTL_SECONDS = 300
+
+_lock = threading.Lock()
+_index = None
+_index_built_at = 0
+
+
+def _compile():
+    """Build {activity_type: [Challenge, ...]} for challenges that haven't ended."""
+    index = {}
+    for challenge in Challenge.objects.filter(is_active=True, end_date__gte=timezone.now()):
+        index.setdefault(challenge.activity_type, []).append(challenge)
+    return index
+
+
+def get_index():
+    global _index, _index_built_at
+    with _lock:
+        if _index is None or time.monotonic() - _index_built_at > INDEX_TTL_SECONDS:
+            _index = _compile()
+            _index_built_at = time.monotonic()
+        return _index
+
+
+def invalidate_index():
+    global _index
+    with _lock:
+        _index = None
+
+
+@receiver(post_save, sender=Challenge)
+@receiver(post_delete, sender=Challenge)
+def _challenge_changed(sender, **kwargs):
+    invalidate_index()
+    transaction.on_commit(invalidate_index)
+
+
+def record_activity(member_id, counts, streak_days=None):
+    """
+    Advance a member's challenges.
+
+    `counts` maps activity_type -> amount to add (tasks_completed, credits_earned...).
+    `streak_days` is the member's current streak, if it changed.
+    Returns the challenges completed by this activity (rewards already paid;
+    the caller sends the notifications).
+    """
+    from django.contrib.contenttypes.models import ContentType
+    from gamification.services import append_ledger
+
+    now = timezone.now()
+    index = get_index()
+
+    updates = {t: n for t, n in counts.items() if n}
+    if streak_days is not None:
+        updates['streak_days'] = streak_days
+
+    touched = {}
+    for activity_type, amount in updates.items():
+        challenges = [c for c in index.get(activity_type, []) if c.start_date <= now <= c.end_date]
+        if not challenges:
+            continue
+        rows = UserChallenge.objects.filter(
+            member_id=member_id, challenge__in=challenges, completed=False
+        )
+        if activity_type in VALUE_ACTIVITIES:
+            rows.update(progress=amount)
+        else:
+            rows.update(progress=F('progress') + amount)
+        touched.update({c.challenge_id: c for c in challenges})
+
+    if not touched:
+        return []
+
+    finished = UserChallenge.objects.filter(
+        member_id=member_id, challenge_id__in=touched.keys(), completed=False,
+        progress__gte=F('challenge__target_count')
+    ).values_list('id', 'challenge_id')
+
+    completed = []
+    for row_id, challenge_id in finished:
+        # Conditional update so a concurrent award can't pay the reward twice
+        if UserChallenge.objects.filter(id=row_id, completed=False).update(completed=True, completed_at=now):
+            completed.append(touched[challenge_id])
+
+    if not completed:
+        return []
+
+    content_type = ContentType.objects.get_for_model(Challenge)
+    append_ledger([
+        CreditLedger(
+            member_id=member_id,
+            amount=c.reward_credits,
+            reason=f"Challenge Completed: {c.name}"[:255],
+            content_type=content_type,
+            object_id=c.challenge_id,
+        )
+        for c in completed if c.reward_credits
+    ])
+    for c in completed:
+        print(f"   🎯 CHALLENGE COMPLETE: {c.name} for {member_id}")
+    return completed
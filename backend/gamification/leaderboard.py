@@ -0,0 +1,112 @@
+"""
+Leaderboards built from DailyCredits buckets.
+
+append_ledger() keeps one bucket per (member, day) up to date, so a weekly
+board sums at most 7 rows per member instead of scanning the ledger. Ranked
+results are cached per (period, limit) and dropped whenever new credits land.
+
+Boards are cached in each process, keyed by a version token kept in the
+shared 'reporting' cache (settings.CACHES): credits are awarded by
+run_event_worker, and its invalidation has to reach the web processes.
+"""
+import uuid
+from datetime import timedelta
+
+from django.core.cache import cache, caches
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from gamification.models import DailyCredits, UserLevel
+
+PERIOD_DAYS = {
+    'weekly': 7,
+    'monthly': 30,
+}
+
+CACHE_TTL_SECONDS = 300
+VERSION_KEY = 'gamification:leaderboard:version'
+SHARED_CACHE_ALIAS = 'reporting'
+
+
+def record_daily_credits(deltas, day=None):
+    """
+    Add credit deltas ({member_id: amount}) to the members' buckets for `day`.
+    Called by append_ledger inside the ledger transaction.
+    """
+    day = day or timezone.now().date()
+    DailyCredits.objects.bulk_create(
+        [DailyCredits(member_id=member_id, date=day) for member_id in deltas],
+        ignore_conflicts=True
+    )
+    for member_id, amount in deltas.items():
+        DailyCredits.objects.filter(member_id=member_id, date=day).update(
+            credits=F('credits') + amount
+        )
+
+
+def invalidate_leaderboards():
+    """Give boards a new version so every process ignores its cached ones."""
+    caches[SHARED_CACHE_ALIAS].set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def _get_version():
+    shared = caches[SHARED_CACHE_ALIAS]
+    version = shared.get(VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        # add() so two processes starting at once agree on one version
+        if not shared.add(VERSION_KEY, version, None):
+            version = shared.get(VERSION_KEY, version)
+    return version
+
+
+def get_leaderboard(period='all-time', limit=10):
+    """
+    Ranked list of {'rank', 'member_id', 'name', 'period_credits',
+    'total_credits', 'level'} for the period.
+    """
+    today = timezone.now().date()
+    # Today's date is part of the key so rolling windows move at midnight
+    key = f"gamification:leaderboard:{_get_version()}:{period}:{limit}:{today.isoformat()}"
+    results = cache.get(key)
+    if results is not None:
+        return results
+
+    buckets = DailyCredits.objects.all()
+    if period in PERIOD_DAYS:
+        buckets = buckets.filter(date__gt=today - timedelta(days=PERIOD_DAYS[period]))
+
+    rankings = list(
+        buckets.values('member_id')
+        .annotate(period_credits=Sum('credits'))
+        .order_by('-period_credits')[:limit]
+    )
+    results = _enrich(rankings)
+    cache.set(key, results, CACHE_TTL_SECONDS)
+    return results
+
+
+def _enrich(rankings):
+    """Attach member names and levels with one query each."""
+    from pm.models import Members
+
+    member_ids = [entry['member_id'] for entry in rankings]
+    names = {
+        m['member_id']: f"{m['first_name']} {m['last_name']}"
+        for m in Members.objects.filter(member_id__in=member_ids).values('member_id', 'first_name', 'last_name')
+    }
+    levels = {ul.member_id: ul for ul in UserLevel.objects.filter(member_id__in=member_ids)}
+
+    results = []
+    for rank, entry in enumerate(rankings, 1):
+        member_id = entry['member_id']
+        user_level = levels.get(member_id)
+        results.append({
+            'rank': rank,
+            'member_id': str(member_id),
+            'name': names.get(member_id, "Unknown"),
+            'period_credits': entry['period_credits'],
+            'total_credits': user_level.total_credits if user_level else 0,
+            'level': user_level.current_level if user_level else 'Novice'
+        })
+    return results
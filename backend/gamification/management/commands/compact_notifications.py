@@ -0,0 +1,61 @@
+"""
+Django Management Command: compact_notifications
+
+Deletes read notifications older than the retention window so the
+notification table (and every member's list query) stays small.
+Unread notifications are never deleted, so unread counters are unaffected.
+
+Usage:
+    python manage.py compact_notifications              # Keep 30 days of read notifications
+    python manage.py compact_notifications --days=90
+    python manage.py compact_notifications --dry-run
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from gamification.models import Notification
+
+
+class Command(BaseCommand):
+    help = 'Delete old read notifications'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Keep read notifications newer than this many days',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows deleted per statement',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many rows would be deleted',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        batch_size = options['batch_size']
+        old_read = Notification.objects.filter(is_read=True, created_at__lt=cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f"{old_read.count()} read notifications older than {cutoff:%Y-%m-%d} would be deleted")
+            return
+
+        # Delete in batches to keep each statement (and its locks) short
+        deleted = 0
+        while True:
+            ids = list(old_read.values_list('notification_id', flat=True)[:batch_size])
+            if not ids:
+                break
+            count, _ = Notification.objects.filter(notification_id__in=ids).delete()
+            deleted += count
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} read notifications older than {cutoff:%Y-%m-%d}"))
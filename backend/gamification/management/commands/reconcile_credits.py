@@ -0,0 +1,69 @@
+"""
+Django Management Command: reconcile_credits
+
+Verifies UserLevel.total_credits against the CreditLedger.
+Totals are maintained incrementally by gamification.services.append_ledger,
+so this is meant to run periodically (e.g. nightly cron) as a safety net.
+
+Usage:
+    python manage.py reconcile_credits          # Report mismatches only
+    python manage.py reconcile_credits --fix    # Correct mismatched totals
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from gamification.models import CreditLedger, UserLevel
+
+
+class Command(BaseCommand):
+    help = 'Verify UserLevel credit totals against the credit ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Overwrite mismatched totals with the ledger sum',
+        )
+
+    def handle(self, *args, **options):
+        fix = options.get('fix')
+
+        ledger_totals = dict(
+            CreditLedger.objects.values('member_id')
+            .annotate(total=Sum('amount'))
+            .values_list('member_id', 'total')
+        )
+        levels = {ul.member_id: ul for ul in UserLevel.objects.all()}
+
+        mismatches = []
+        for member_id in set(ledger_totals) | set(levels):
+            expected = ledger_totals.get(member_id) or 0
+            ul = levels.get(member_id)
+            actual = ul.total_credits if ul else None
+            if actual != expected:
+                mismatches.append((member_id, actual, expected))
+
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS(f"All {len(levels)} member totals match the ledger"))
+            return
+
+        for member_id, actual, expected in mismatches:
+            self.stdout.write(self.style.WARNING(f"  {member_id}: stored={actual} ledger={expected}"))
+
+        if not fix:
+            self.stdout.write(self.style.WARNING(
+                f"{len(mismatches)} mismatched totals. Re-run with --fix to correct them."
+            ))
+            return
+
+        with transaction.atomic():
+            for member_id, actual, expected in mismatches:
+                ul, _ = UserLevel.objects.select_for_update().get_or_create(member_id=member_id)
+                # Re-read the ledger under the lock so concurrent awards aren't lost
+                ul.total_credits = CreditLedger.objects.filter(
+                    member_id=member_id
+                ).aggregate(Sum('amount'))['amount__sum'] or 0
+                ul.save(update_fields=['total_credits', 'updated_at'])
+                ul.calculate_level()
+
+        self.stdout.write(self.style.SUCCESS(f"Fixed {len(mismatches)} member totals"))
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:00
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+# Rule event_name -> counter (mirrors gamification.achievements.EVENT_METRICS)
+EVENT_METRICS = {
+    'task_completed': 'tasks_completed',
+    'bug_fixed': 'bugs_fixed',
+    'code_review': 'code_reviews',
+    'early_delivery': 'early_delivery',
+    'sop_followed': 'sop_followed',
+}
+
+
+def backfill_metrics(apps, schema_editor):
+    """Seed counters from existing ledger history."""
+    CreditLedger = apps.get_model('gamification', 'CreditLedger')
+    UserMetrics = apps.get_model('gamification', 'UserMetrics')
+
+    rows = {}
+    counts = (
+        CreditLedger.objects.filter(rule__event_name__in=EVENT_METRICS.keys())
+        .values('member_id', 'rule__event_name')
+        .annotate(n=Count('transaction_id'))
+    )
+    for c in counts:
+        row = rows.setdefault(c['member_id'], UserMetrics(member_id=c['member_id']))
+        field = EVENT_METRICS[c['rule__event_name']]
+        setattr(row, field, getattr(row, field) + c['n'])
+
+    UserMetrics.objects.bulk_create(rows.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0005_challenge_reward_rewardredemption_userchallenge'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserMetrics',
+            fields=[
+                ('member_id', models.UUIDField(primary_key=True, serialize=False)),
+                ('tasks_completed', models.IntegerField(default=0)),
+                ('bugs_fixed', models.IntegerField(default=0)),
+                ('code_reviews', models.IntegerField(default=0)),
+                ('early_delivery', models.IntegerField(default=0)),
+                ('sop_followed', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_metrics, migrations.RunPython.noop),
+    ]
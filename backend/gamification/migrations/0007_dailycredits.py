@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:01
+
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_buckets(apps, schema_editor):
+    """Build daily buckets from existing ledger history."""
+    CreditLedger = apps.get_model('gamification', 'CreditLedger')
+    DailyCredits = apps.get_model('gamification', 'DailyCredits')
+
+    buckets = (
+        CreditLedger.objects.annotate(day=TruncDate('created_at'))
+        .values('member_id', 'day')
+        .annotate(total=Sum('amount'))
+    )
+    DailyCredits.objects.bulk_create(
+        [DailyCredits(member_id=b['member_id'], date=b['day'], credits=b['total']) for b in buckets],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0006_usermetrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCredits',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('member_id', models.UUIDField()),
+                ('date', models.DateField()),
+                ('credits', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'member_id'], name='gamificatio_date_c2b3da_idx')],
+                'unique_together': {('member_id', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_buckets, migrations.RunPython.noop),
+    ]
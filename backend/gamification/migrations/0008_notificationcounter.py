@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:04
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_counters(apps, schema_editor):
+    """Seed unread counters from existing notifications."""
+    Notification = apps.get_model('gamification', 'Notification')
+    NotificationCounter = apps.get_model('gamification', 'NotificationCounter')
+
+    counts = (
+        Notification.objects.filter(is_read=False)
+        .values('member_id')
+        .annotate(n=Count('notification_id'))
+    )
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(member_id=c['member_id'], unread_count=c['n']) for c in counts],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0007_dailycredits'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('member_id', models.UUIDField(primary_key=True, serialize=False)),
+                ('unread_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['member_id', 'created_at'], name='gamificatio_member__6b0c65_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['is_read', 'created_at'], name='gamificatio_is_read_352dcc_idx'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
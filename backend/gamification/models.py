@@ -82,7 +82,50 @@ class UserLevel(models.Model):
         else:
             self.current_level = "Novice"
             self.next_level_at = 500
-        self.save()
+        # total_credits is maintained with F() increments; never overwrite it here
+        self.save(update_fields=['current_level', 'next_level_at', 'updated_at'])
+
+
+class DailyCredits(models.Model):
+    """
+    Per-member credit totals per day, maintained on every ledger insert.
+    Leaderboards sum these buckets instead of scanning the ledger.
+    """
+    member_id = models.UUIDField()
+    date = models.DateField()
+    credits = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['member_id', 'date']
+        indexes = [
+            models.Index(fields=['date', 'member_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.member_id} - {self.date}: {self.credits}"
+
+
+class UserMetrics(models.Model):
+    """
+    Per-member activity counters used by achievements and challenges.
+    Incremented (with F expressions) as credits are awarded, so checks never
+    have to re-count the ledger.
+    """
+    # Metrics that are counters stored on this row
+    # (total_credits lives on UserLevel, streak_days on UserStreak)
+    COUNTER_FIELDS = ['tasks_completed', 'bugs_fixed', 'code_reviews', 'early_delivery', 'sop_followed']
+
+    member_id = models.UUIDField(primary_key=True)
+    tasks_completed = models.IntegerField(default=0)
+    bugs_fixed = models.IntegerField(default=0)
+    code_reviews = models.IntegerField(default=0)
+    early_delivery = models.IntegerField(default=0)
+    sop_followed = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.member_id} - {self.tasks_completed} tasks"
 
 
 class Achievement(models.Model):
@@ -163,11 +206,29 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['member_id', 'created_at']),
+            models.Index(fields=['is_read', 'created_at']),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.member_id}"
 
 
+class NotificationCounter(models.Model):
+    """
+    Unread notification count per member, kept in step with inserts and
+    mark-as-read so polling never has to COUNT the notification table.
+    """
+    member_id = models.UUIDField(primary_key=True)
+    unread_count = models.IntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.member_id} - {self.unread_count} unread"
+
+
 class UserStreak(models.Model):
     """
     Tracks user's daily activity streaks.
@@ -1,7 +1,8 @@
+import uuid
 from django.dispatch import receiver
 from pm.signals import task_status_changed
-from gamification.models import GamificationRule, CreditLedger, UserLevel
-from django.db import transaction
+from gamification.models import GamificationRule
+from gamification.services import award_credits_batch
 
 @receiver(task_status_changed)
 def handle_task_status_changed(sender, instance, old_status, new_status, actor, **kwargs):
@@ -9,157 +10,124 @@ def handle_task_status_changed(sender, instance, old_status, new_status, actor,
     Listen to Task changes and award credits.
     """
     print(f"🎮 Gamification Receiver Triggered: {old_status} -> {new_status} by {actor}")
-    
+
     if not actor:
         return
 
     # 1. Check for 'Task Completion' rule
     # In real world, we check Rule Conditions. For now, hardcode logic mapped to Rule Name.
     # Start Simple: If New Status == 'Completed' (or Done)
-    
+
     is_completion = False
     if new_status and new_status.name.lower() in ['completed', 'done', 'approved']:
         is_completion = True
-    
+
     if is_completion:
         # Find Rule
         rule = GamificationRule.objects.filter(event_name='task_completed', is_active=True).first()
         if rule:
-            # Check if not already awarded for this task?
-            # Ledger prevents duplicates? Or we allow re-earning?
-            # Ideally unique per task completion.
-            exists = CreditLedger.objects.filter(
-                object_id=instance.task_id, 
-                rule=rule
-            ).exists()
-            
-            if not exists:
-                with transaction.atomic():
-                    # Award Credits
-                    CreditLedger.objects.create(
-                        member_id=actor.member_id,
-                        amount=rule.credits,
-                        reason=f"Task Completed: {instance.name}",
-                        rule=rule,
-                        content_object=instance
-                    )
-                    
-                    # Update Level
-                    _update_user_level(actor.member_id, rule.credits, instance.name)
-                    print(f"   💰 Awarded {rule.credits} Credits to {actor.first_name}")
-
-def _update_user_level(member_id, credits_earned=0, task_name=""):
-    from django.db.models import Sum
-    from gamification.services import check_achievements, create_notification
-    
-    total = CreditLedger.objects.filter(member_id=member_id).aggregate(Sum('amount'))['amount__sum'] or 0
-    
-    ul, _ = UserLevel.objects.get_or_create(member_id=member_id)
-    old_level = ul.current_level
-    ul.total_credits = total
-    ul.calculate_level()
-    
-    # Create credit notification
-    if credits_earned > 0:
-        create_notification(
-            member_id=str(member_id),
-            notification_type='credit',
-            title=f"+{credits_earned} Credits Earned!",
-            message=f"You earned credits for: {task_name}",
-            icon='💰',
-            link='/impact'
-        )
-    
-    # Check for level up
-    if ul.current_level != old_level:
-        create_notification(
-            member_id=str(member_id),
-            notification_type='level_up',
-            title=f"🚀 Level Up!",
-            message=f"Congratulations! You reached {ul.current_level}!",
-            icon='🚀',
-            link='/impact'
-        )
-    
-    # Check for new achievements
-    newly_unlocked = check_achievements(member_id)
-    if newly_unlocked:
-        for a in newly_unlocked:
-            create_notification(
-                member_id=str(member_id),
-                notification_type='achievement',
-                title=f"New Badge: {a.name}!",
-                message=a.description,
-                icon=a.icon,
-                link='/impact'
-            )
-            print(f"   🏅 NEW ACHIEVEMENT: {a.icon} {a.name}")
-    
-    # Update streak
-    from gamification.models import UserStreak
-    streak, _ = UserStreak.objects.get_or_create(member_id=member_id)
-    old_streak = streak.current_streak
-    new_streak = streak.update_streak()
-    
-    # Notify on streak milestones
-    if new_streak in [7, 14, 30, 60, 100] and new_streak != old_streak:
-        create_notification(
-            member_id=str(member_id),
-            notification_type='system',
-            title=f"🔥 {new_streak}-Day Streak!",
-            message=f"Amazing! You've been active for {new_streak} consecutive days!",
-            icon='🔥',
-            link='/impact'
-        )
-        print(f"   🔥 STREAK MILESTONE: {new_streak} days!")
-
-from github.signals import commit_synced
+            # Completed on or before the due date counts as an early delivery
+            from django.utils import timezone
+            metrics = {}
+            if instance.due_date and timezone.now().date() <= instance.due_date:
+                metrics['early_delivery'] = 1
+
+            # Ledger dedupe (one award per task) happens inside the batch API
+            award_credits_batch([{
+                'member_id': actor.member_id,
+                'rule': rule,
+                'source': instance,
+                'reason': f"Task Completed: {instance.title}",
+                'label': instance.title,
+                'metrics': metrics,
+            }])
+
+
+from events.bus import subscribe
+
+@subscribe('task.status_changed')
+def handle_task_status_event(payload):
+    """
+    Outbox subscriber for task status changes (see TasksViewSet.perform_update).
+    Runs in the event worker; exceptions propagate so the event is retried.
+    """
+    from pm.models import Tasks, TaskStatuses, Members
+
+    statuses = TaskStatuses.objects.in_bulk(
+        [s for s in (payload['old_status_id'], payload['new_status_id']) if s]
+    )
+    task = Tasks.objects.get(task_id=payload['task_id'])
+    actor = Members.objects.filter(member_id=payload['actor_id']).first()
+
+    handle_task_status_changed(
+        sender=Tasks,
+        instance=task,
+        old_status=statuses.get(uuid.UUID(payload['old_status_id'])) if payload['old_status_id'] else None,
+        new_status=statuses.get(uuid.UUID(payload['new_status_id'])),
+        actor=actor
+    )
+
+
+from github.signals import commit_synced, commits_synced
+
+def _get_commit_rule():
+    rule, _ = GamificationRule.objects.get_or_create(
+        event_name='code_commit',
+        defaults={
+            'name': 'Code Commit',
+            'description': 'Awarded for every commit synced from GitHub',
+            'credits': 5,
+            'is_active': True
+        }
+    )
+    return rule
+
+
+def award_commit_credits(commits):
+    """
+    Award credits for GitHub commits whose author (email or login) resolves
+    to a Member through the identity table.
+    """
+    from pm import identities
+
+    commits = [c for c in commits if c.author_email or c.author_login]
+    if not commits:
+        return []
+
+    rule = _get_commit_rule()
+    if not rule.is_active:
+        return []
+
+    events = []
+    for commit in commits:
+        member_id = identities.resolve_author(commit.author_email, commit.author_login)
+        if not member_id:
+            print(f"   ⚠️ No member found for commit author: {commit.author_email or commit.author_login}")
+            continue
+        events.append({
+            'member_id': member_id,
+            'rule': rule,
+            'source': commit,
+            'reason': f"Commit: {commit.message[:30]}...",
+            'label': f"Commit {commit.sha[:7]}",
+        })
+
+    return award_credits_batch(events)
+
 
 @receiver(commit_synced)
 def handle_commit_synced(sender, commit, created, **kwargs):
     """
-    Award credits for GitHub commits if email matches a Member.
+    Award credits for a single GitHub commit if email matches a Member.
     """
-    if not commit.author_email:
-        return
+    award_commit_credits([commit])
 
-    # Check mapping
-    from pm.models import Members
-    member = Members.objects.filter(email=commit.author_email).first()
-    
-    if member:
-        # Find or Create Rule
-        rule, _ = GamificationRule.objects.get_or_create(
-            event_name='code_commit',
-            defaults={
-                'name': 'Code Commit',
-                'description': 'Awarded for every commit synced from GitHub',
-                'credits': 5,
-                'is_active': True
-            }
-        )
-        
-        if not rule.is_active:
-            return
-
-        # Check for duplication (Idempotency)
-        exists = CreditLedger.objects.filter(
-            object_id=commit.commit_id,
-            rule=rule
-        ).exists()
-        
-        if not exists:
-            # Award Credits
-            CreditLedger.objects.create(
-                member_id=member.member_id,
-                amount=rule.credits,
-                reason=f"Commit: {commit.message[:30]}...",
-                rule=rule,
-                content_object=commit
-            )
-            
-            # Update Link using Member ID string
-            _update_user_level(member.member_id, rule.credits, f"Commit {commit.sha[:7]}")
-            print(f"   💻 Awarded {rule.credits} Credits to {member.first_name} for commit")
-    else:
-        print(f"   ⚠️ No member found for commit author: {commit.author_email}")
+
+@receiver(commits_synced)
+def handle_commits_synced(sender, commits, **kwargs):
+    """
+    Award credits for a batch of synced GitHub commits.
+    """
+    created = award_commit_credits(commits)
+    if created:
+        print(f"   💻 Awarded credits for {len(created)} commits")
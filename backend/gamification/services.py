@@ -1,64 +1,340 @@
-from gamification.models import Achievement, UserAchievement, UserLevel, CreditLedger
-from django.db.models import Sum
+from gamification.models import UserLevel, CreditLedger
+from django.db.models import Sum, F
+from django.db import transaction
+import uuid
 
-def check_achievements(member_id: str):
+def check_achievements(member_id: str, metrics: dict = None):
     """
     Check if a user qualifies for any new achievements.
-    Called after credits are awarded.
+
+    `metrics` holds the metric values that just changed (see
+    gamification.achievements); only achievements depending on them are
+    evaluated. Without it, every metric is loaded and checked (full re-check).
+    """
+    from gamification.achievements import evaluate
+
+    if metrics is None:
+        from gamification.models import UserMetrics, UserStreak
+
+        user_level = UserLevel.objects.filter(member_id=member_id).first()
+        streak = UserStreak.objects.filter(member_id=member_id).first()
+        metrics = UserMetrics.objects.filter(member_id=member_id).values(*UserMetrics.COUNTER_FIELDS).first() or {}
+        metrics['total_credits'] = user_level.total_credits if user_level else 0
+        metrics['streak_days'] = streak.current_streak if streak else 0
+
+    return evaluate(member_id, metrics)
+
+
+def create_notification(member_id: str, notification_type: str, title: str, message: str, icon: str = '🔔', link: str = None):
+    """
+    Create an in-app notification for a user.
     """
-    newly_unlocked = []
+    return create_notifications([{
+        'member_id': member_id,
+        'notification_type': notification_type,
+        'title': title,
+        'message': message,
+        'icon': icon,
+        'link': link,
+    }])[0]
+
+
+def create_notifications(notifications):
+    """
+    Create several notifications with one INSERT and bump each member's
+    unread counter. Each item takes the same keys as create_notification().
+    """
+    from gamification.models import Notification
+
+    if not notifications:
+        return []
+
+    objs = [Notification(**n) for n in notifications]
+    unread = {}
+    for n in objs:
+        member_id = uuid.UUID(str(n.member_id))
+        unread[member_id] = unread.get(member_id, 0) + 1
+
+    with transaction.atomic():
+        Notification.objects.bulk_create(objs)
+        adjust_unread_counts(unread)
+
+        # bulk_create sends no post_save, so push to SSE clients explicitly
+        from events.stream import broadcast_notifications
+        transaction.on_commit(lambda: broadcast_notifications(objs))
+    return objs
+
+
+def adjust_unread_counts(deltas):
+    """Apply {member_id: delta} to the members' NotificationCounter rows."""
+    from gamification.models import NotificationCounter
+
+    deltas = {m: d for m, d in deltas.items() if d}
+    if not deltas:
+        return
+
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(member_id=m) for m in deltas],
+        ignore_conflicts=True
+    )
+    for member_id, delta in deltas.items():
+        NotificationCounter.objects.filter(member_id=member_id).update(
+            unread_count=F('unread_count') + delta
+        )
+
+
+def get_unread_count(member_id):
+    from gamification.models import NotificationCounter
+
+    counter = NotificationCounter.objects.filter(member_id=member_id).first()
+    return max(counter.unread_count, 0) if counter else 0
+
+
+def mark_notifications_read(member_id=None, notification_ids=None):
+    """
+    Mark notifications read and decrement unread counters by the number of
+    rows that actually changed. Returns that number.
+    """
+    from django.db.models import Count
+    from gamification.models import Notification, NotificationCounter
+
+    with transaction.atomic():
+        if member_id and not notification_ids:
+            changed = Notification.objects.filter(member_id=member_id, is_read=False).update(is_read=True)
+            NotificationCounter.objects.filter(member_id=member_id).update(unread_count=0)
+            return changed
+
+        unread = Notification.objects.filter(notification_id__in=notification_ids or [], is_read=False)
+        if member_id:
+            unread = unread.filter(member_id=member_id)
+        per_member = {
+            row['member_id']: row['n']
+            for row in unread.values('member_id').annotate(n=Count('notification_id'))
+        }
+        changed = unread.update(is_read=True)
+        adjust_unread_counts({m: -n for m, n in per_member.items()})
+        return changed
+
+
+def append_ledger(entries):
+    """
+    Insert CreditLedger rows and apply them to UserLevel.total_credits.
+
+    This is the single write path for credits (tasks, commits, rewards,
+    challenges). Totals are incremented with F() expressions in the same
+    transaction as the ledger insert, so the ledger never has to be re-summed.
+    The member's DailyCredits bucket for today is updated the same way.
+    Members without a UserLevel row yet are seeded from their full ledger sum.
+    Use the `reconcile_credits` command to verify totals periodically.
+    """
+    if not entries:
+        return []
+
+    deltas = {}
+    for entry in entries:
+        member_id = uuid.UUID(str(entry.member_id))
+        deltas[member_id] = deltas.get(member_id, 0) + entry.amount
+
+    with transaction.atomic():
+        CreditLedger.objects.bulk_create(entries)
+
+        existing = set(
+            UserLevel.objects.filter(member_id__in=deltas.keys()).values_list('member_id', flat=True)
+        )
+        missing = [m for m in deltas if m not in existing]
+        if missing:
+            # New rows: seed from the ledger (already includes this batch)
+            totals = dict(
+                CreditLedger.objects.filter(member_id__in=missing)
+                .values('member_id').annotate(total=Sum('amount'))
+                .values_list('member_id', 'total')
+            )
+            UserLevel.objects.bulk_create(
+                [UserLevel(member_id=m, total_credits=totals.get(m, 0)) for m in missing],
+                ignore_conflicts=True
+            )
+
+        for member_id in existing:
+            UserLevel.objects.filter(member_id=member_id).update(
+                total_credits=F('total_credits') + deltas[member_id]
+            )
+
+        # Leaderboard buckets + cache invalidation
+        from gamification.leaderboard import record_daily_credits, invalidate_leaderboards
+        record_daily_credits(deltas)
+        transaction.on_commit(invalidate_leaderboards)
+
+    return entries
+
+
+def update_user_level(member_id, credits_earned=0, task_name="", metric_deltas=None):
+    """
+    Recompute a member's level, achievements, streak and challenge progress
+    after credits change.
+    Sends the credit / level-up / achievement / streak notifications.
+
+    `metric_deltas` ({metric: n}) increments the member's activity counters;
+    only achievements and challenges depending on a changed metric are evaluated.
+    """
+    from gamification.models import UserStreak
+    from gamification.achievements import increment_metrics
+    from gamification.challenges import record_activity
+
+    notifications = []
+
+    # Update streak
+    streak, _ = UserStreak.objects.get_or_create(member_id=member_id)
+    old_streak = streak.current_streak
+    new_streak = streak.update_streak()
+    
+    # Notify on streak milestones
+    if new_streak in [7, 14, 30, 60, 100] and new_streak != old_streak:
+        notifications.append({
+            'member_id': str(member_id),
+            'notification_type': 'system',
+            'title': f"🔥 {new_streak}-Day Streak!",
+            'message': f"Amazing! You've been active for {new_streak} consecutive days!",
+            'icon': '🔥',
+            'link': '/impact'
+        })
+        print(f"   🔥 STREAK MILESTONE: {new_streak} days!")
     
-    # Get user stats
-    user_level = UserLevel.objects.filter(member_id=member_id).first()
-    total_credits = user_level.total_credits if user_level else 0
+    # Activity counters, then challenges (completion rewards hit the ledger
+    # before the level is computed below)
+    changed = increment_metrics(member_id, metric_deltas or {})
+    completed_challenges = record_activity(
+        member_id,
+        {**(metric_deltas or {}), 'credits_earned': max(credits_earned, 0)},
+        streak_days=new_streak if new_streak != old_streak else None
+    )
+    for c in completed_challenges:
+        notifications.append({
+            'member_id': str(member_id),
+            'notification_type': 'challenge',
+            'title': f"{c.icon} Challenge Complete: {c.name}!",
+            'message': f"You earned {c.reward_credits} credits.",
+            'icon': c.icon,
+            'link': '/impact'
+        })
     
-    # Count transactions (as proxy for tasks completed)
-    tasks_completed = CreditLedger.objects.filter(
-        member_id=member_id,
-        rule__event_name='task_completed'
-    ).count()
+    # total_credits is kept current by append_ledger(), no ledger SUM needed
+    ul, _ = UserLevel.objects.get_or_create(member_id=member_id)
+    old_level = ul.current_level
+    ul.calculate_level()
     
-    # Get all achievements user doesn't have yet
-    unlocked_ids = UserAchievement.objects.filter(member_id=member_id).values_list('achievement_id', flat=True)
-    available = Achievement.objects.filter(is_active=True).exclude(achievement_id__in=unlocked_ids)
+    # Create credit notification
+    if credits_earned > 0:
+        notifications.append({
+            'member_id': str(member_id),
+            'notification_type': 'credit',
+            'title': f"+{credits_earned} Credits Earned!",
+            'message': f"You earned credits for: {task_name}",
+            'icon': '💰',
+            'link': '/impact'
+        })
     
-    for achievement in available:
-        condition = achievement.unlock_condition
-        unlocked = False
-        
-        # Check different condition types
-        if 'total_credits' in condition:
-            if total_credits >= condition['total_credits']:
-                unlocked = True
-        
-        if 'tasks_completed' in condition:
-            if tasks_completed >= condition['tasks_completed']:
-                unlocked = True
-        
-        # Add more condition checks as needed...
-        
-        if unlocked:
-            UserAchievement.objects.create(
-                member_id=member_id,
-                achievement=achievement
-            )
-            newly_unlocked.append(achievement)
-            print(f"🏅 Achievement Unlocked: {achievement.name} for {member_id}")
+    # Check for level up
+    if ul.current_level != old_level:
+        notifications.append({
+            'member_id': str(member_id),
+            'notification_type': 'level_up',
+            'title': "🚀 Level Up!",
+            'message': f"Congratulations! You reached {ul.current_level}!",
+            'icon': '🚀',
+            'link': '/impact'
+        })
+    
+    # Check for new achievements (only those whose metric changed)
+    if credits_earned:
+        changed['total_credits'] = ul.total_credits
+    if new_streak != old_streak:
+        changed['streak_days'] = new_streak
     
-    return newly_unlocked
+    newly_unlocked = check_achievements(member_id, changed)
+    if newly_unlocked:
+        for a in newly_unlocked:
+            notifications.append({
+                'member_id': str(member_id),
+                'notification_type': 'achievement',
+                'title': f"New Badge: {a.name}!",
+                'message': a.description,
+                'icon': a.icon,
+                'link': '/impact'
+            })
+            print(f"   🏅 NEW ACHIEVEMENT: {a.icon} {a.name}")
+    
+    # One insert for every notification this award produced
+    create_notifications(notifications)
 
 
-def create_notification(member_id: str, notification_type: str, title: str, message: str, icon: str = '🔔', link: str = None):
+def award_credits_batch(events):
     """
-    Create an in-app notification for a user.
+    Award credits for a batch of source events (completed tasks, synced commits...).
+
+    Each event is a dict with:
+        member_id - member earning the credits
+        rule      - GamificationRule that applies
+        source    - model instance that earned them (Task, Commit, ...)
+        reason    - ledger text
+        label     - short text used in the credit notification
+        metrics   - optional extra counter deltas, e.g. {'early_delivery': 1}
+                    (the rule's own metric is counted automatically)
+
+    Events already in the ledger for the same (rule, source) are skipped using a
+    single lookup, new ledger rows are bulk-inserted, and each affected member's
+    level, achievements and streak are recomputed once for the whole batch.
+    Returns the list of created CreditLedger rows.
     """
-    from gamification.models import Notification
-    
-    return Notification.objects.create(
-        member_id=member_id,
-        notification_type=notification_type,
-        title=title,
-        message=message,
-        icon=icon,
-        link=link
+    from django.contrib.contenttypes.models import ContentType
+    from gamification.achievements import EVENT_METRICS
+
+    events = [e for e in events if e.get('member_id') and e.get('rule') and e['rule'].is_active]
+    if not events:
+        return []
+
+    # One query to find everything already awarded
+    seen = set(
+        CreditLedger.objects.filter(
+            rule_id__in={e['rule'].pk for e in events},
+            object_id__in={e['source'].pk for e in events}
+        ).values_list('rule_id', 'object_id')
     )
+
+    entries = []
+    earned = {}  # member_id -> (credits, [labels], {metric: delta})
+    for e in events:
+        key = (e['rule'].pk, e['source'].pk)
+        if key in seen:
+            continue
+        seen.add(key)  # also dedupes within the batch
+
+        entries.append(CreditLedger(
+            member_id=e['member_id'],
+            amount=e['rule'].credits,
+            reason=e['reason'][:255],
+            rule=e['rule'],
+            content_type=ContentType.objects.get_for_model(e['source']),
+            object_id=e['source'].pk
+        ))
+        credits, labels, metrics = earned.get(e['member_id'], (0, [], {}))
+        labels.append(e.get('label') or e['reason'])
+        deltas = dict(e.get('metrics') or {})
+        if e['rule'].event_name in EVENT_METRICS:
+            metric = EVENT_METRICS[e['rule'].event_name]
+            deltas[metric] = deltas.get(metric, 0) + 1
+        for metric, n in deltas.items():
+            metrics[metric] = metrics.get(metric, 0) + n
+        earned[e['member_id']] = (credits + e['rule'].credits, labels, metrics)
+
+    if not entries:
+        return []
+
+    with transaction.atomic():
+        append_ledger(entries)
+
+        for member_id, (credits, labels, metrics) in earned.items():
+            label = labels[0] if len(labels) == 1 else f"{labels[0]} and {len(labels) - 1} more"
+            update_user_level(member_id, credits, label, metrics)
+            print(f"   💰 Awarded {credits} Credits to {member_id} ({len(labels)} events)")
+
+    return entries
@@ -59,57 +59,14 @@ class LeaderboardViewSet(viewsets.ViewSet):
     Query params: ?period=weekly|monthly|all-time&limit=10
     """
     def list(self, request):
-        from django.db.models import Sum
-        from django.utils import timezone
-        from datetime import timedelta
-        from pm.models import Members
+        from .leaderboard import get_leaderboard
         
         period = request.query_params.get('period', 'all-time')
         limit = int(request.query_params.get('limit', 10))
         
-        # Determine date filter
-        if period == 'weekly':
-            start_date = timezone.now() - timedelta(days=7)
-        elif period == 'monthly':
-            start_date = timezone.now() - timedelta(days=30)
-        else:
-            start_date = None
-        
-        # Aggregate credits from ledger
-        ledger_qs = CreditLedger.objects.all()
-        if start_date:
-            ledger_qs = ledger_qs.filter(created_at__gte=start_date)
-        
-        # Group by member and sum
-        rankings = ledger_qs.values('member_id').annotate(
-            period_credits=Sum('amount')
-        ).order_by('-period_credits')[:limit]
-        
-        # Enrich with member details
-        results = []
-        for rank, entry in enumerate(rankings, 1):
-            member_id = entry['member_id']
-            try:
-                member = Members.objects.get(member_id=member_id)
-                name = f"{member.first_name} {member.last_name}"
-            except Members.DoesNotExist:
-                name = "Unknown"
-            
-            # Get user level for total credits
-            user_level = UserLevel.objects.filter(member_id=member_id).first()
-            
-            results.append({
-                'rank': rank,
-                'member_id': str(member_id),
-                'name': name,
-                'period_credits': entry['period_credits'],
-                'total_credits': user_level.total_credits if user_level else 0,
-                'level': user_level.current_level if user_level else 'Novice'
-            })
-        
         return Response({
             'period': period,
-            'rankings': results
+            'rankings': get_leaderboard(period, limit)
         })
 
 
@@ -118,15 +75,40 @@ class NotificationViewSet(viewsets.ViewSet):
     User notifications API.
     """
     def list(self, request):
-        """Get user's notifications."""
+        """
+        Get user's notifications.
+        Pass ?since=<cursor from the previous response> to fetch only new items.
+        """
+        import uuid
+        from django.db.models import Q
+        from django.utils.dateparse import parse_datetime
         from .models import Notification
+        from .services import get_unread_count
         
         member_id = request.query_params.get('member_id')
         if not member_id:
             return Response({'error': 'member_id required'}, status=400)
         
-        notifications = Notification.objects.filter(member_id=member_id)[:20]
-        unread_count = Notification.objects.filter(member_id=member_id, is_read=False).count()
+        notifications = Notification.objects.filter(member_id=member_id)
+        
+        since = request.query_params.get('since')
+        if since:
+            # Cursor is '<created_at>|<notification_id>' of the last item returned
+            since_at, _, since_id = since.partition('|')
+            since_dt = parse_datetime(since_at)
+            try:
+                since_uuid = uuid.UUID(since_id) if since_id else None
+            except ValueError:
+                since_uuid = None
+            if not since_dt or (since_id and since_uuid is None):
+                return Response({'error': 'Invalid since cursor'}, status=400)
+            after = Q(created_at__gt=since_dt)
+            if since_uuid:
+                after |= Q(created_at=since_dt, notification_id__gt=since_uuid)
+            # Oldest first so a backlog larger than one page is drained in order
+            notifications = list(notifications.filter(after).order_by('created_at', 'notification_id')[:20])
+        else:
+            notifications = list(notifications.order_by('-created_at', '-notification_id')[:20])
         
         data = [{
             'notification_id': str(n.notification_id),
@@ -139,23 +121,31 @@ class NotificationViewSet(viewsets.ViewSet):
             'created_at': n.created_at.isoformat()
         } for n in notifications]
         
+        if since:
+            last = notifications[-1] if notifications else None
+        else:
+            # First load is newest first; the newest row seen is where polling resumes
+            last = notifications[0] if notifications else None
+        
         return Response({
             'notifications': data,
-            'unread_count': unread_count
+            'unread_count': get_unread_count(member_id),
+            # Unchanged when nothing new arrived
+            'cursor': f"{last.created_at.isoformat()}|{last.notification_id}" if last else since
         })
     
     def create(self, request):
         """Mark notifications as read."""
-        from .models import Notification
+        from .services import mark_notifications_read
         
         notification_ids = request.data.get('notification_ids', [])
         member_id = request.data.get('member_id')
         mark_all = request.data.get('mark_all', False)
         
         if mark_all and member_id:
-            Notification.objects.filter(member_id=member_id).update(is_read=True)
+            mark_notifications_read(member_id=member_id)
         elif notification_ids:
-            Notification.objects.filter(notification_id__in=notification_ids).update(is_read=True)
+            mark_notifications_read(notification_ids=notification_ids)
         
         return Response({'status': 'ok'})
 
@@ -179,14 +169,18 @@ class ChallengesViewSet(viewsets.ViewSet):
             end_date__gte=now
         )
         
+        # Load the member's rows for all active challenges in one query
+        joined = {}
+        if member_id:
+            joined = {
+                uc.challenge_id: uc for uc in UserChallenge.objects.filter(
+                    member_id=member_id, challenge__in=active_challenges
+                )
+            }
+        
         result = []
         for c in active_challenges:
-            # Check if user joined
-            user_challenge = None
-            if member_id:
-                user_challenge = UserChallenge.objects.filter(
-                    member_id=member_id, challenge=c
-                ).first()
+            user_challenge = joined.get(c.challenge_id)
             
             result.append({
                 'challenge_id': str(c.challenge_id),
@@ -294,22 +288,22 @@ class RewardsViewSet(viewsets.ViewSet):
         if RewardRedemption.objects.filter(member_id=member_id, reward=reward, status='active').exists():
             return Response({'error': 'Already owned'}, status=400)
         
-        # Check credits
-        ul = UserLevel.objects.filter(member_id=member_id).first()
-        if not ul or ul.total_credits < reward.cost_credits:
-            return Response({'error': 'Not enough credits'}, status=400)
+        from .services import append_ledger
         
         with transaction.atomic():
-            # Deduct credits (negative transaction)
-            CreditLedger.objects.create(
-                member_id=member_id,
+            # Check credits (row lock so concurrent redemptions can't overspend)
+            ul = UserLevel.objects.select_for_update().filter(member_id=member_id).first()
+            if not ul or ul.total_credits < reward.cost_credits:
+                return Response({'error': 'Not enough credits'}, status=400)
+            
+            # Deduct credits (negative transaction, total updated by the ledger service)
+            append_ledger([CreditLedger(
+                member_id=ul.member_id,
                 amount=-reward.cost_credits,
                 reason=f"Redeemed: {reward.name}",
-            )
-            
-            # Update user level
-            ul.total_credits -= reward.cost_credits
-            ul.save()
+            )])
+            ul.refresh_from_db()
+            ul.calculate_level()
             
             # Create redemption
             RewardRedemption.objects.create(
@@ -5,3 +5,7 @@ class GithubConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'github'
     verbose_name = 'GitHub Integration'
+
+    def ready(self):
+        # Connect the resolver index invalidation receivers
+        import github.resolver  # noqa: F401
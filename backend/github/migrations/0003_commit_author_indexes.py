@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('github', '0002_repository_project'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='commit',
+            index=models.Index(fields=['author_email', 'committed_at'], name='github_comm_author__7dceac_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commit',
+            index=models.Index(fields=['author_login', 'committed_at'], name='github_comm_author__4121df_idx'),
+        ),
+    ]
@@ -65,6 +65,10 @@ class Commit(models.Model):
         db_table = 'github_commits'
         ordering = ['-committed_at']
         unique_together = ['repository', 'sha']
+        indexes = [
+            models.Index(fields=['author_email', 'committed_at']),
+            models.Index(fields=['author_login', 'committed_at']),
+        ]
 
     def __str__(self):
         return f"{self.sha[:7]} - {self.message[:50]}"
@@ -0,0 +1,121 @@
+"""
+Precomputed GitHub -> PM resolution for timesheet suggestions.
+
+    repositories: repo_id -> (project_id, project_name)
+        Linked project first, then the name heuristics the suggestions view
+        used to run per (date, repo) group: slug/name exact match, then the
+        first word of the repo name contained in a project name.
+    first_names: lowercased first name -> member_id
+        Rough fallback for commit logins with no MemberIdentity (pm.identities
+        resolves emails and known logins first).
+
+Built with a handful of queries on first use and rebuilt after every GitHub
+sync (and when projects or members change), so resolving a commit costs a
+dict lookup.
+"""
+import threading
+import time
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+INDEX_TTL_SECONDS = 600
+
+_lock = threading.Lock()
+_index = None
+_index_built_at = 0
+
+
+def _match_project(repo_name, projects):
+    """The old per-group heuristics, run against in-memory projects."""
+    lowered = repo_name.lower()
+    for project_id, name, slug in projects:
+        if (slug or '').lower() == lowered or (name or '').lower() == lowered:
+            return project_id, name
+
+    # Try to match start of string, e.g. "NSK" in "NSKRetail"
+    search_term = repo_name.split('.')[0].split('-')[0].lower()
+    for project_id, name, slug in projects:
+        if search_term in (name or '').lower():
+            return project_id, name
+    return None
+
+
+def _build():
+    from github.models import Repository
+    from pm.models import Members, Projects
+
+    projects = list(Projects.objects.order_by('project_id').values_list('project_id', 'name', 'slug'))
+    project_names = {project_id: name for project_id, name, _ in projects}
+
+    repositories = {}
+    for repo_id, repo_name, project_id in Repository.objects.values_list('repo_id', 'name', 'project_id'):
+        if project_id:
+            # Priority 1: Direct Link
+            repositories[repo_id] = (project_id, project_names.get(project_id))
+        else:
+            # Priority 2: Fuzzy Heuristics
+            repositories[repo_id] = _match_project(repo_name, projects)
+
+    # Rough fallback: GitHub login equal to the member's first name.
+    # A first name shared by several members is ambiguous and never matches.
+    first_names = {}
+    ambiguous = set()
+    for member_id, first_name in Members.objects.exclude(first_name__isnull=True).values_list('member_id', 'first_name'):
+        name = first_name.strip().lower()
+        if first_names.setdefault(name, member_id) != member_id:
+            ambiguous.add(name)
+    for name in ambiguous:
+        del first_names[name]
+
+    return {'repositories': repositories, 'first_names': first_names}
+
+
+def get_index():
+    global _index, _index_built_at
+    with _lock:
+        if _index is None or time.monotonic() - _index_built_at > INDEX_TTL_SECONDS:
+            _index = _build()
+            _index_built_at = time.monotonic()
+        return _index
+
+
+def invalidate_index():
+    global _index
+    with _lock:
+        _index = None
+
+
+def resolve_project(repo_id):
+    """(project_id, project_name) for a repository, or None."""
+    return get_index()['repositories'].get(repo_id)
+
+
+def resolve_member(email=None, login=None):
+    """member_id for a commit author: known identities, then the first-name guess."""
+    from pm import identities
+    member_id = identities.resolve_author(email, login)
+    if member_id is None and login:
+        member_id = get_index()['first_names'].get(login.strip().lower())
+    return member_id
+
+
+def author_keys(member_ids):
+    """Emails and logins that resolve to any of `member_ids`."""
+    from pm import identities
+    member_ids = set(member_ids)
+    keys = identities.keys_for(member_ids)
+    keys += [name for name, member_id in get_index()['first_names'].items() if member_id in member_ids]
+    return keys
+
+
+@receiver(post_save, sender='pm.Projects')
+@receiver(post_delete, sender='pm.Projects')
+@receiver(post_save, sender='pm.Members')
+@receiver(post_delete, sender='pm.Members')
+@receiver(post_save, sender='github.Repository')
+@receiver(post_delete, sender='github.Repository')
+def _source_changed(sender, **kwargs):
+    invalidate_index()
+    transaction.on_commit(invalidate_index)
@@ -3,3 +3,7 @@ from django.dispatch import Signal
 # Signal sent when a commit is newly synced
 # Provides arguments: sender, commit (instance), created (bool)
 commit_synced = Signal()
+
+# Signal sent once per repository sync with every commit that was synced
+# Provides arguments: sender, commits (list of Commit instances)
+commits_synced = Signal()
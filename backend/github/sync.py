@@ -74,11 +74,74 @@ class GitHubAPIClient:
         return self._get(f"/repos/{owner}/{repo}/pulls/{pr_number}")
 
 
+class AsyncGitHubAPIClient(GitHubAPIClient):
+    """
+    Async twin of GitHubAPIClient for the ASGI profile.
+    Requests go through the shared pooled client (backend.async_http).
+    """
+    
+    async def _get(self, endpoint: str, params: dict = None) -> dict:
+        from backend.async_http import get_async_client
+        url = f"{self.BASE_URL}{endpoint}"
+        response = await get_async_client().get(url, headers=self.headers, params=params)
+        response.raise_for_status()
+        return response.json()
+    
+    async def _get_paginated(self, endpoint: str, params: dict = None, max_pages: int = 10):
+        params = params or {}
+        params['per_page'] = 100
+        all_results = []
+        
+        for page in range(1, max_pages + 1):
+            params['page'] = page
+            results = await self._get(endpoint, dict(params))
+            if not results:
+                break
+            all_results.extend(results)
+            if len(results) < 100:
+                break
+        
+        return all_results
+    
+    async def get_org_repos(self, org_name: str):
+        import httpx
+        try:
+            return await self._get_paginated(f"/orgs/{org_name}/repos")
+        except httpx.HTTPStatusError:
+            return await self._get_paginated(f"/users/{org_name}/repos")
+    
+    async def get_repo_commits(self, owner: str, repo: str, since: datetime = None):
+        params = {}
+        if since:
+            params['since'] = since.isoformat()
+        return await self._get_paginated(f"/repos/{owner}/{repo}/commits", params)
+    
+    async def get_commit(self, owner: str, repo: str, sha: str):
+        return await self._get(f"/repos/{owner}/{repo}/commits/{sha}")
+    
+    async def get_repo_pulls(self, owner: str, repo: str, state: str = 'all'):
+        return await self._get_paginated(f"/repos/{owner}/{repo}/pulls", {'state': state})
+
+
+# Concurrent commit-detail requests per repository in the async sync
+COMMIT_DETAIL_CONCURRENCY = 10
+
+
 def sync_organization(org: GitHubOrganization) -> str:
     """Sync all repositories for an organization"""
     client = GitHubAPIClient(org.github_token)
-    
-    repos = client.get_org_repos(org.name)
+    return _store_org_repos(org, client.get_org_repos(org.name))
+
+
+async def async_sync_organization(org: GitHubOrganization) -> str:
+    """sync_organization for async views: awaits the GitHub API, then stores."""
+    from asgiref.sync import sync_to_async
+    client = AsyncGitHubAPIClient(org.github_token)
+    repos = await client.get_org_repos(org.name)
+    return await sync_to_async(_store_org_repos)(org, repos)
+
+
+def _store_org_repos(org: GitHubOrganization, repos) -> str:
     created_count = 0
     updated_count = 0
     
@@ -103,9 +166,24 @@ def sync_organization(org: GitHubOrganization) -> str:
     org.last_sync = timezone.now()
     org.save()
     
+    from .resolver import invalidate_index
+    invalidate_index()
+    
     return f"Synced {len(repos)} repos ({created_count} new, {updated_count} updated)"
 
 
+def _existing_commits(repo: Repository, commits_data) -> dict:
+    """Already stored commits for this batch, by sha (one query)."""
+    shas = [c['sha'] for c in commits_data]
+    return {c.sha: c for c in Commit.objects.filter(repository=repo, sha__in=shas)}
+
+
+def _needs_details(existing, sha) -> bool:
+    # New commit, or stored without stats
+    commit = existing.get(sha)
+    return commit is None or (commit.additions == 0 and commit.deletions == 0)
+
+
 def sync_repository(repo: Repository) -> str:
     """Sync commits and PRs for a tracked repository"""
     if not repo.is_tracked:
@@ -118,44 +196,94 @@ def sync_repository(repo: Repository) -> str:
     # Sync commits (last 30 days or since last sync)
     since = repo.last_sync or (timezone.now() - timezone.timedelta(days=30))
     commits_data = client.get_repo_commits(owner, repo_name, since)
-    commits_created = 0
+    existing = _existing_commits(repo, commits_data)
     
+    details = {}
     for c in commits_data:
         sha = c['sha']
-        commit_info = c.get('commit', {})
-        author_info = commit_info.get('author', {})
-        
-        # Check if we have stats
-        existing = Commit.objects.filter(repository=repo, sha=sha).first()
-        additions = 0
-        deletions = 0
-        files_changed = 0
-        
-        should_fetch_details = False
-        if not existing:
-            should_fetch_details = True
-        elif existing.additions == 0 and existing.deletions == 0:
-            should_fetch_details = True
-            
-        if should_fetch_details:
+        if _needs_details(existing, sha):
             try:
-                detail = client.get_commit(owner, repo_name, sha)
-                stats = detail.get('stats', {})
-                additions = stats.get('additions', 0)
-                deletions = stats.get('deletions', 0)
-                # files not always in stats object directly, sometimes in 'files' list length
-                files_changed = len(detail.get('files', []))
+                details[sha] = client.get_commit(owner, repo_name, sha)
             except Exception:
                 # If fetch fails, just keep 0 and continue
                 print(f"Failed to fetch details for {sha}")
-                pass
-        else:
+    
+    # Commits (and their credits) are stored before the PR fetch can fail
+    commits_created = _store_commits(repo, commits_data, existing, details)
+    prs_data = client.get_repo_pulls(owner, repo_name, 'all')
+    return _store_pulls(repo, prs_data, commits_created)
+
+
+async def async_sync_repository(repo: Repository) -> str:
+    """
+    sync_repository for async views. Commit details and the PR list are
+    fetched concurrently instead of one request at a time.
+    """
+    import asyncio
+    from asgiref.sync import sync_to_async
+    
+    if not repo.is_tracked:
+        return "Repository is not tracked"
+    
+    client = AsyncGitHubAPIClient(repo.organization.github_token)
+    owner, repo_name = repo.full_name.split('/')
+    
+    since = repo.last_sync or (timezone.now() - timezone.timedelta(days=30))
+    commits_data = await client.get_repo_commits(owner, repo_name, since)
+    existing = await sync_to_async(_existing_commits)(repo, commits_data)
+    
+    semaphore = asyncio.Semaphore(COMMIT_DETAIL_CONCURRENCY)
+    
+    async def fetch_detail(sha):
+        async with semaphore:
+            try:
+                return sha, await client.get_commit(owner, repo_name, sha)
+            except Exception:
+                print(f"Failed to fetch details for {sha}")
+                return sha, None
+    
+    detail_results, prs_data = await asyncio.gather(
+        asyncio.gather(*(fetch_detail(c['sha']) for c in commits_data if _needs_details(existing, c['sha']))),
+        client.get_repo_pulls(owner, repo_name, 'all'),
+        return_exceptions=True,
+    )
+    if isinstance(detail_results, BaseException):
+        raise detail_results
+    details = {sha: detail for sha, detail in detail_results if detail is not None}
+    
+    # As in sync_repository: a failed PR fetch still keeps the commits
+    commits_created = await sync_to_async(_store_commits)(repo, commits_data, existing, details)
+    if isinstance(prs_data, BaseException):
+        raise prs_data
+    return await sync_to_async(_store_pulls)(repo, prs_data, commits_created)
+
+
+def _store_commits(repo: Repository, commits_data, existing, details) -> int:
+    """Write fetched commits and emit commits_synced for the batch; returns the number created."""
+    commits_created = 0
+    synced_commits = []
+    
+    for c in commits_data:
+        sha = c['sha']
+        commit_info = c.get('commit', {})
+        author_info = commit_info.get('author', {})
+        
+        detail = details.get(sha)
+        if detail is not None:
+            stats = detail.get('stats', {})
+            additions = stats.get('additions', 0)
+            deletions = stats.get('deletions', 0)
+            # files not always in stats object directly, sometimes in 'files' list length
+            files_changed = len(detail.get('files', []))
+        elif sha in existing:
             # Keep existing values
-            additions = existing.additions
-            deletions = existing.deletions
-            files_changed = existing.files_changed
+            additions = existing[sha].additions
+            deletions = existing[sha].deletions
+            files_changed = existing[sha].files_changed
+        else:
+            additions = deletions = files_changed = 0
 
-        _, created = Commit.objects.update_or_create(
+        commit, created = Commit.objects.update_or_create(
             repository=repo,
             sha=sha,
             defaults={
@@ -172,22 +300,30 @@ def sync_repository(repo: Repository) -> str:
         )
         if created:
             commits_created += 1
-            
-        # Trigger signal
-        from .signals import commit_synced
-        commit_synced.send(sender=Commit, commit=_, created=created)
+        synced_commits.append(commit)
     
-    # Sync PRs
-    prs_data = client.get_repo_pulls(owner, repo_name, 'all')
+    # Commits whose email is a known member teach us that member's GitHub login
+    from pm import identities
+    for commit in synced_commits:
+        if commit.author_login and commit.author_email:
+            member_id = identities.resolve('email', commit.author_email)
+            if member_id:
+                identities.learn('github', commit.author_login, member_id)
+    
+    # Trigger one signal for the whole batch (credits are awarded in bulk)
+    if synced_commits:
+        from .signals import commits_synced
+        commits_synced.send(sender=Commit, commits=synced_commits)
+    return commits_created
+
+
+def _store_pulls(repo: Repository, prs_data, commits_created) -> str:
+    """Write fetched PRs and mark the repository synced."""
     prs_created = 0
     
     for pr in prs_data:
         state = 'merged' if pr.get('merged_at') else pr['state']
         
-        # Determine if we need to fetch details for PR stats (commits, additions, deletions)
-        # The list endpoint doesn't return additions/deletions usually
-        # For simplicity, similar check could be done, but let's stick to commits for now as requested
-        
         _, created = PullRequest.objects.update_or_create(
             repository=repo,
             number=pr['number'],
@@ -212,6 +348,9 @@ def sync_repository(repo: Repository) -> str:
     repo.last_sync = timezone.now()
     repo.save()
     
+    from .resolver import invalidate_index
+    invalidate_index()
+    
     return f"Synced {commits_created} new commits, {prs_created} new PRs"
 
 
@@ -1,9 +1,10 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     GitHubOrganizationViewSet, RepositoryViewSet, 
     CommitViewSet, PullRequestViewSet, PeerReviewViewSet,
-    GitHubDashboardView
+    GitHubDashboardView, organization_sync_async, repository_sync_async
 )
 
 router = DefaultRouter()
@@ -13,7 +14,16 @@ router.register(r'commits', CommitViewSet, basename='github-commit')
 router.register(r'prs', PullRequestViewSet, basename='github-pr')
 router.register(r'reviews', PeerReviewViewSet, basename='github-review')
 
-urlpatterns = [
+urlpatterns = []
+
+if settings.ASYNC_IO_VIEWS:
+    # ASGI profile: sync endpoints await GitHub instead of blocking a worker
+    urlpatterns += [
+        path('organizations/<uuid:pk>/sync/', organization_sync_async, name='github-org-sync-async'),
+        path('repos/<uuid:pk>/sync/', repository_sync_async, name='github-repo-sync-async'),
+    ]
+
+urlpatterns += [
     path('', include(router.urls)),
     path('dashboard/', GitHubDashboardView.as_view(), name='github-dashboard'),
 ]
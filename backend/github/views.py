@@ -3,6 +3,8 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.db.models import Count, Sum, Q
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
 from datetime import timedelta
 
@@ -168,3 +170,37 @@ class GitHubDashboardView(APIView):
         stats['active_repos'] = list(active_repos)
         
         return Response(stats)
+
+
+# ==================== ASGI PROFILE ====================
+# Async versions of the org/repo sync actions, routed instead of the ViewSet
+# actions when ASYNC_IO_VIEWS is on (see github/urls.py).
+
+@csrf_exempt
+async def organization_sync_async(request, pk):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    from .sync import async_sync_organization
+    org = await GitHubOrganization.objects.filter(pk=pk).afirst()
+    if org is None:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+    try:
+        result = await async_sync_organization(org)
+        return JsonResponse({'status': 'success', 'message': result})
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+
+@csrf_exempt
+async def repository_sync_async(request, pk):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    from .sync import async_sync_repository
+    repo = await Repository.objects.select_related('organization').filter(pk=pk).afirst()
+    if repo is None:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+    try:
+        result = await async_sync_repository(repo)
+        return JsonResponse({'status': 'success', 'message': result})
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
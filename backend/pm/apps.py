@@ -8,3 +8,4 @@ class PmConfig(AppConfig):
     def ready(self):
         # Import signals to register them
         import pm.signals  # noqa: F401
+        import pm.identities  # noqa: F401
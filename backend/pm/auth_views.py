@@ -1,10 +1,10 @@
 from rest_framework.decorators import api_view, permission_classes, authentication_classes
-import os
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth import authenticate, login
 from django.contrib.auth.models import User
+from django.db import transaction
 from .models import Members, RolePermissions, MemberInvitations
 import uuid
 from django.utils import timezone
@@ -167,23 +167,15 @@ def forgot_password_view(request):
     else:
          reset_link = f"{reset_url_base}?uid={uid}&token={token}"
     
-    # Send Email
-    try:
-        print(f"DEBUG_LINK: {reset_link}")
-        with open("debug_link.txt", "w") as f:
-            f.write(reset_link)
-        from django.core.mail import send_mail
-        send_mail(
-            subject='Password Reset Request - TailAdmin',
-            message=f'Click the link below to reset your password:\n\n{reset_link}\n\nIf you did not request this, please ignore this email.',
-            from_email=os.getenv('EMAIL_HOST_USER'),
-            recipient_list=[email],
-            fail_silently=False,
-        )
-        return Response({'message': 'If an account exists, a reset link has been sent to your email.'})
-    except Exception as e:
-        print(f"Email Error: {e}")
-        return Response({'error': 'Failed to send email. Please try again later.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    # Queue Email (sent by run_mail_worker)
+    from events.mail import queue_email
+    queue_email(
+        to_email=email,
+        subject='Password Reset Request - TailAdmin',
+        body=f'Click the link below to reset your password:\n\n{reset_link}\n\nIf you did not request this, please ignore this email.',
+        category='password_reset',
+    )
+    return Response({'message': 'If an account exists, a reset link has been sent to your email.'})
 
 
 @api_view(['POST'])
@@ -220,68 +212,81 @@ def bulk_invite_view(request):
     if not member_ids:
         return Response({'error': 'No members selected'}, status=status.HTTP_400_BAD_REQUEST)
 
-    invited_count = 0
     errors = []
 
+    # Load all selected members with one query
+    valid_ids = []
     for member_id in member_ids:
         try:
-            member = Members.objects.get(member_id=member_id)
-            
-            # Skip if user already exists
-            if member.user:
-                continue
-                
-            if not member.email:
-                errors.append(f"Member {member.first_name} has no email")
-                continue
-
-            # Generate Token
-            token = str(uuid.uuid4())
-            expires_at = timezone.now() + timedelta(days=7)
-
-            # Create/Update Invitation
-            # Check for existing pending invitation
-            existing_invite = MemberInvitations.objects.filter(member=member, status='PENDING').first()
-            if existing_invite:
-                invitation = existing_invite
-                invitation.token = token # Rotate token on resend
-                invitation.expires_at = expires_at
-                invitation.save()
-            else:
-                invitation = MemberInvitations.objects.create(
-                    member=member,
-                    email=member.email,
-                    role_id=member.role_id,
-                    token=token,
-                    status='PENDING',
-                    expires_at=expires_at
-                )
-
-            # Construct Link
-            if reset_url_base.endswith('/accept-invite'):
-                invite_link = f"{reset_url_base}/{token}"
-            else:
-                 invite_link = f"{reset_url_base}?token={token}"
-
-            # Send Email
-            from django.core.mail import send_mail
-            print(f"DEBUG_INVITE_LINK: {invite_link}")
-            with open("debug_invite_link.txt", "a") as f:
-                f.write(f"{member.email}: {invite_link}\n")
-                
-            send_mail(
-                subject='You are invited to join TailAdmin',
-                message=f'Hello {member.first_name},\n\nYou have been invited to join TailAdmin.\nClick the link below to accept your invitation and set your password:\n\n{invite_link}\n\nThis link expires in 7 days.',
-                from_email=os.getenv('EMAIL_HOST_USER'),
-                recipient_list=[member.email],
-                fail_silently=False,
-            )
-            invited_count += 1
+            valid_ids.append(uuid.UUID(str(member_id)))
+        except ValueError:
+            errors.append(f"Member ID {member_id} not found")
+    valid_ids = list(dict.fromkeys(valid_ids))
+    members = Members.objects.in_bulk(valid_ids)
 
-        except Members.DoesNotExist:
+    to_invite = []
+    for member_id in valid_ids:
+        member = members.get(member_id)
+        if member is None:
             errors.append(f"Member ID {member_id} not found")
-        except Exception as e:
-            errors.append(f"Error inviting {member_id}: {str(e)}")
+            continue
+        # Skip if user already exists
+        if member.user_id:
+            continue
+        if not member.email:
+            errors.append(f"Member {member.first_name} has no email")
+            continue
+        to_invite.append(member)
+
+    expires_at = timezone.now() + timedelta(days=7)
+    existing = {
+        invite.member_id: invite
+        for invite in MemberInvitations.objects.filter(member__in=to_invite, status='PENDING')
+    }
+
+    new_invites = []
+    rotated = []
+    emails = []
+    for member in to_invite:
+        token = str(uuid.uuid4())
+        invitation = existing.get(member.member_id)
+        if invitation:
+            invitation.token = token  # Rotate token on resend
+            invitation.expires_at = expires_at
+            rotated.append(invitation)
+        else:
+            new_invites.append(MemberInvitations(
+                member=member,
+                email=member.email,
+                role_id=member.role_id,
+                token=token,
+                status='PENDING',
+                expires_at=expires_at
+            ))
+
+        # Construct Link
+        if reset_url_base.endswith('/accept-invite'):
+            invite_link = f"{reset_url_base}/{token}"
+        else:
+            invite_link = f"{reset_url_base}?token={token}"
+
+        emails.append({
+            'to_email': member.email,
+            'subject': 'You are invited to join TailAdmin',
+            'body': f'Hello {member.first_name},\n\nYou have been invited to join TailAdmin.\nClick the link below to accept your invitation and set your password:\n\n{invite_link}\n\nThis link expires in 7 days.',
+            'category': 'invite',
+        })
+
+    # Invitations and their emails are stored together; run_mail_worker sends them
+    from events.mail import queue_emails
+    try:
+        with transaction.atomic():
+            MemberInvitations.objects.bulk_update(rotated, ['token', 'expires_at'])
+            MemberInvitations.objects.bulk_create(new_invites)
+            queue_emails(emails)
+    except Exception as e:
+        return Response({'error': f'Failed to create invitations: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    invited_count = len(emails)
 
     return Response({
         'message': f'Successfully invited {invited_count} members.',
@@ -0,0 +1,139 @@
+"""
+Member identity resolution.
+
+Every integration maps external identities to Members through this module:
+
+    from pm import identities
+
+    member_id = identities.resolve('email', commit.author_email)
+    member_id = identities.resolve_author(email, login)     # GitHub commit author
+    identities.learn('github', login, member_id)             # after a confirmed match
+
+The MemberIdentity table ((provider, key) -> member) is loaded into an
+in-process dict on first use, so resolving is a dict lookup. learn() writes
+new identities and adds them to the dict once they commit; other processes
+pick changes up on the TTL. Member emails and Zoho mappings are kept in sync
+by signal receivers; deleting a ZohoMember drops its 'zoho' identity.
+"""
+import threading
+import time
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from pm.models import MemberIdentity, Members
+
+CACHE_TTL_SECONDS = 300
+
+_lock = threading.Lock()
+_cache = None
+_cache_built_at = 0
+
+
+def normalize(provider, value):
+    value = str(value or '').strip()
+    # Zoho user ids are opaque; emails and GitHub logins are case-insensitive
+    return value if provider == 'zoho' else value.lower()
+
+
+def _get_cache():
+    global _cache, _cache_built_at
+    with _lock:
+        if _cache is None or time.monotonic() - _cache_built_at > CACHE_TTL_SECONDS:
+            _cache = {
+                (provider, key): member_id
+                for provider, key, member_id in MemberIdentity.objects.values_list('provider', 'key', 'member_id')
+            }
+            _cache_built_at = time.monotonic()
+        return _cache
+
+
+def invalidate_cache():
+    global _cache
+    with _lock:
+        _cache = None
+
+
+def resolve(provider, value):
+    """member_id for an external identity, or None."""
+    key = normalize(provider, value)
+    if not key:
+        return None
+    return _get_cache().get((provider, key))
+
+
+def resolve_author(email=None, login=None):
+    """member_id for a GitHub commit author, by email then login."""
+    return resolve('email', email) or resolve('github', login)
+
+
+def keys_for(member_ids, providers=('email', 'github')):
+    """Identity keys of the given providers that belong to any of `member_ids`."""
+    member_ids = set(member_ids)
+    return [
+        key for (provider, key), member_id in _get_cache().items()
+        if member_id in member_ids and provider in providers
+    ]
+
+
+def learn(provider, value, member_id, source='auto'):
+    """
+    Record that an identity belongs to a member. Only 'manual' mappings take
+    over a key that already maps to someone else.
+    """
+    key = normalize(provider, value)
+    if not key or not member_id:
+        return False
+
+    cache = _get_cache()
+    current = cache.get((provider, key))
+    if current == member_id:
+        return False
+    if current is not None and source != 'manual':
+        return False
+
+    if current is None:
+        MemberIdentity.objects.bulk_create(
+            [MemberIdentity(provider=provider, key=key, member_id=member_id, source=source)],
+            ignore_conflicts=True
+        )
+    else:
+        MemberIdentity.objects.filter(provider=provider, key=key).update(member_id=member_id, source=source)
+
+    def remember():
+        with _lock:
+            if _cache is cache:
+                cache[(provider, key)] = member_id
+
+    # Only after commit, so a rollback can't leave the dict ahead of the table
+    transaction.on_commit(remember)
+    return True
+
+
+@receiver(post_save, sender=Members)
+def _member_saved(sender, instance, **kwargs):
+    if instance.email:
+        learn('email', instance.email, instance.member_id, source='profile')
+
+
+@receiver(post_save, sender='pm.ZohoMember')
+def _zoho_member_saved(sender, instance, **kwargs):
+    # ZohoMember.mapped_member is a manual (or auto_map confirmed) mapping
+    if instance.mapped_member_id:
+        learn('zoho', instance.zoho_user_id, instance.mapped_member_id, source='manual')
+    elif resolve('zoho', instance.zoho_user_id):
+        MemberIdentity.objects.filter(provider='zoho', key=normalize('zoho', instance.zoho_user_id)).delete()
+
+
+@receiver(post_delete, sender='pm.ZohoMember')
+def _zoho_member_deleted(sender, instance, **kwargs):
+    MemberIdentity.objects.filter(provider='zoho', key=normalize('zoho', instance.zoho_user_id)).delete()
+    invalidate_cache()
+    transaction.on_commit(invalidate_cache)
+
+
+@receiver(post_delete, sender=MemberIdentity)
+def _identity_deleted(sender, **kwargs):
+    invalidate_cache()
+    transaction.on_commit(invalidate_cache)
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:11
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def merge_duplicate_cells(apps, schema_editor):
+    """Fold duplicate (member, date, project, task) entries into the oldest one."""
+    TimesheetEntry = apps.get_model('pm', 'TimesheetEntry')
+    duplicates = (
+        TimesheetEntry.objects.values('member_id', 'date', 'project_id', 'task_id')
+        .annotate(n=Count('timesheet_id'))
+        .filter(n__gt=1)
+    )
+    for cell in duplicates:
+        entries = list(TimesheetEntry.objects.filter(
+            member_id=cell['member_id'], date=cell['date'],
+            project_id=cell['project_id'], task_id=cell['task_id'],
+        ).order_by('created_at'))
+        keep = entries[0]
+        keep.hours = sum(e.hours for e in entries)
+        keep.github_refs = [ref for e in entries for ref in (e.github_refs or [])]
+        keep.save(update_fields=['hours', 'github_refs'])
+        TimesheetEntry.objects.filter(timesheet_id__in=[e.timesheet_id for e in entries[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pm', '0018_memberinvitations'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_cells, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='timesheetentry',
+            unique_together={('member', 'date', 'project', 'task')},
+        ),
+    ]
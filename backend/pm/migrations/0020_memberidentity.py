@@ -0,0 +1,69 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:13
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+def backfill_identities(apps, schema_editor):
+    """Seed identities from member emails, mapped Zoho users and commit logins."""
+    Members = apps.get_model('pm', 'Members')
+    MemberIdentity = apps.get_model('pm', 'MemberIdentity')
+    ZohoMember = apps.get_model('pm', 'ZohoMember')
+    Commit = apps.get_model('github', 'Commit')
+
+    identities = {}
+
+    def add(provider, key, member_id, source):
+        key = (key or '').strip()
+        if provider != 'zoho':
+            key = key.lower()
+        if key and (provider, key) not in identities:
+            identities[(provider, key)] = MemberIdentity(
+                member_id=member_id, provider=provider, key=key, source=source
+            )
+
+    for member_id, email in Members.objects.exclude(email__isnull=True).values_list('member_id', 'email'):
+        add('email', email, member_id, 'profile')
+
+    for member_id, zoho_user_id in ZohoMember.objects.exclude(mapped_member__isnull=True).values_list('mapped_member_id', 'zoho_user_id'):
+        add('zoho', zoho_user_id, member_id, 'manual')
+
+    emails = {key: identity.member_id for (provider, key), identity in identities.items() if provider == 'email'}
+    for email, login in (
+        Commit.objects.exclude(author_login__isnull=True).exclude(author_email__isnull=True)
+        .values_list('author_email', 'author_login').distinct()
+    ):
+        member_id = emails.get(email.strip().lower())
+        if member_id:
+            add('github', login, member_id, 'auto')
+
+    MemberIdentity.objects.bulk_create(identities.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pm', '0019_timesheet_cell_unique'),
+        ('github', '0003_commit_author_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberIdentity',
+            fields=[
+                ('identity_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('provider', models.CharField(choices=[('email', 'Email'), ('github', 'GitHub login'), ('zoho', 'Zoho user id')], max_length=20)),
+                ('key', models.CharField(max_length=255)),
+                ('source', models.CharField(choices=[('profile', 'Member profile'), ('manual', 'Manual mapping'), ('auto', 'Learned from a confirmed match')], default='auto', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('member', models.ForeignKey(db_column='member_id', on_delete=django.db.models.deletion.CASCADE, related_name='identities', to='pm.members')),
+            ],
+            options={
+                'db_table': 'member_identities',
+                'indexes': [models.Index(fields=['member', 'provider'], name='member_iden_member__2881c2_idx')],
+                'unique_together': {('provider', 'key')},
+            },
+        ),
+        migrations.RunPython(backfill_identities, migrations.RunPython.noop),
+    ]
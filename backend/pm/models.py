@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 import uuid
 
@@ -122,6 +124,40 @@ class MemberInvitations(models.Model):
         return f"Invite for {self.email} ({self.status})"
 
 
+class MemberIdentity(models.Model):
+    """
+    An external identity (email, GitHub login, Zoho user id) known to belong
+    to a member. Keys are stored normalized; resolve through pm.identities.
+    """
+    PROVIDER_CHOICES = [
+        ('email', 'Email'),
+        ('github', 'GitHub login'),
+        ('zoho', 'Zoho user id'),
+    ]
+    SOURCE_CHOICES = [
+        ('profile', 'Member profile'),
+        ('manual', 'Manual mapping'),
+        ('auto', 'Learned from a confirmed match'),
+    ]
+
+    identity_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    member = models.ForeignKey(Members, on_delete=models.CASCADE, related_name='identities', db_column='member_id')
+    provider = models.CharField(max_length=20, choices=PROVIDER_CHOICES)
+    key = models.CharField(max_length=255)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='auto')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'member_identities'
+        unique_together = ['provider', 'key']
+        indexes = [
+            models.Index(fields=['member', 'provider']),
+        ]
+
+    def __str__(self):
+        return f"{self.provider}:{self.key}"
+
+
 
 
 class RolePermissions(models.Model):
@@ -549,6 +585,16 @@ class TimesheetEntry(models.Model):
     class Meta:
         db_table = 'timesheet_entries'
         ordering = ['date', 'created_at']
+        constraints = [
+            # One entry per grid cell. MySQL treats NULLs as distinct in a plain
+            # unique key, so the nullable project/task are compared through COALESCE
+            models.UniqueConstraint(
+                'member', 'date',
+                Coalesce('project', Value(''), output_field=models.CharField()),
+                Coalesce('task', Value(''), output_field=models.CharField()),
+                name='timesheet_cell_unique',
+            ),
+        ]
         indexes = [
             models.Index(fields=['member', 'date']),
         ]
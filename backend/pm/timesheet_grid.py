@@ -0,0 +1,92 @@
+"""
+Weekly timesheet grid aggregation.
+
+Entries are grouped per (member, project, task, date) in SQL; the grid is
+assembled from the grouped value rows, so no model instances (or related
+Project/Task objects) are built. Used by TimesheetViewSet.weekly_grid and
+team_grid.
+
+Cell format (unchanged from the original grid):
+    rows: [{project_id, project_name, task_id, task_title,
+            entries: {'2025-01-01': {hours, ids, description}}}]
+    daily_totals: {'2025-01-01': 8.0}
+"""
+import uuid
+
+from django.db.models import Aggregate, CharField, Max, Sum
+
+
+class GroupConcat(Aggregate):
+    """Comma-joined values of a column (GROUP_CONCAT / STRING_AGG)."""
+    function = 'GROUP_CONCAT'
+    output_field = CharField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection,
+            function='STRING_AGG',
+            template="%(function)s(%(expressions)s::text, ',')",
+            **extra_context
+        )
+
+
+def _cells(qs, by_member):
+    fields = ['project_id', 'project__name', 'task_id', 'task__title', 'date']
+    if by_member:
+        fields.insert(0, 'member_id')
+    return (
+        qs.order_by()
+        .values(*fields)
+        .annotate(
+            total_hours=Sum('hours'),
+            entry_ids=GroupConcat('timesheet_id'),
+            # (member, date, project, task) is one entry per cell, so Max is that entry's text
+            last_description=Max('description'),
+        )
+        .order_by('date', 'project__name', 'task__title')
+    )
+
+
+def _add_cell(grid, cell):
+    key = (cell['project_id'], cell['task_id'])
+    row = grid['rows'].get(key)
+    if row is None:
+        row = grid['rows'][key] = {
+            'project_id': cell['project_id'],
+            'project_name': cell['project__name'] if cell['project_id'] else 'General',
+            'task_id': cell['task_id'],
+            'task_title': cell['task__title'] if cell['task_id'] else 'General Task',
+            'entries': {}
+        }
+
+    date_str = cell['date'].isoformat()
+    hours = cell['total_hours'] or 0
+    row['entries'][date_str] = {
+        'hours': hours,
+        'ids': [uuid.UUID(i) for i in (cell['entry_ids'] or '').split(',') if i],
+        'description': cell['last_description']
+    }
+    grid['daily_totals'][date_str] = grid['daily_totals'].get(date_str, 0) + hours
+
+
+def _finish(grid):
+    return {'rows': list(grid['rows'].values()), 'daily_totals': grid['daily_totals']}
+
+
+def build_grid(qs):
+    """One grid for all entries in `qs` (one query)."""
+    grid = {'rows': {}, 'daily_totals': {}}
+    for cell in _cells(qs, by_member=False):
+        _add_cell(grid, cell)
+    return _finish(grid)
+
+
+def build_member_grids(qs, member_ids):
+    """
+    A grid per member for all entries in `qs` (one query for every member).
+    Members without entries get an empty grid.
+    """
+    grids = {member_id: {'rows': {}, 'daily_totals': {}} for member_id in member_ids}
+    for cell in _cells(qs.filter(member_id__in=member_ids), by_member=True):
+        _add_cell(grids[cell['member_id']], cell)
+    return {member_id: _finish(grid) for member_id, grid in grids.items()}
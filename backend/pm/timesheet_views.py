@@ -1,5 +1,7 @@
 import logging
 import datetime
+import uuid
+from django.db import transaction
 from django.db.models import Sum, Q
 from django.utils import timezone
 from rest_framework import viewsets, status
@@ -7,7 +9,8 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
-from .models import TimesheetEntry, Members, Projects, Tasks
+from .models import TimesheetEntry, Members, Tasks
+from .timesheet_grid import build_grid, build_member_grids
 from github.models import Commit, PullRequest
 
 # Simple serializer for now, ideally in pm/serializers.py
@@ -57,6 +60,33 @@ class TimesheetViewSet(viewsets.ModelViewSet):
             else:
                 serializer.save()
 
+    def _can_view_team(self, user):
+        """Superusers, or roles with the 'view_team_timesheets' permission."""
+        from .models import Permissions, RolePermissions
+        
+        # Also allow superusers
+        if user.is_superuser:
+            return True
+        
+        if hasattr(user, 'member') and user.member.role_id:
+            # Check if user's role has view_team_timesheets permission
+            perm = Permissions.objects.filter(name='view_team_timesheets').first()
+            if perm:
+                return RolePermissions.objects.filter(
+                    role_id=user.member.role_id,
+                    permission_id=perm
+                ).exists()
+        return False
+
+    def _selected_members(self, member_ids, team_id):
+        """Members from a comma-separated member_ids param and/or a team_id."""
+        members = Members.objects.all()
+        if member_ids:
+            members = members.filter(member_id__in=[m.strip() for m in member_ids.split(',') if m.strip()])
+        if team_id:
+            members = members.filter(team_members_member_id__team_id=team_id)
+        return list(members.distinct().order_by('first_name', 'last_name'))
+
     @action(detail=False, methods=['get'])
     def weekly_grid(self, request):
         """
@@ -68,133 +98,59 @@ class TimesheetViewSet(viewsets.ModelViewSet):
            total_hours: { '2025-01-01': 8.0 }
         }
         """
-        qs = self.get_queryset()
-        
-        # Structure data
-        grid_rows = {}
-        daily_totals = {}
-        
-        for entry in qs:
-            key = f"proj_{entry.project_id}_task_{entry.task_id}"
-            date_str = entry.date.isoformat()
-            
-            if key not in grid_rows:
-                grid_rows[key] = {
-                    'project_id': entry.project_id,
-                    'project_name': entry.project.name if entry.project else 'General',
-                    'task_id': entry.task_id,
-                    'task_title': entry.task.title if entry.task else 'General Task',
-                    'entries': {}
-                }
-            
-            # If multiple entries for same task/day, sum them
-            current_hours = grid_rows[key]['entries'].get(date_str, {'hours': 0, 'ids': []})
-            current_hours['hours'] += entry.hours
-            if isinstance(current_hours, dict) and 'ids' in current_hours: # Safety check
-                 current_hours['ids'].append(entry.timesheet_id)
-            else:
-                 # Initialize correctly if it was just a float before (legacy check)
-                 current_hours = {'hours': entry.hours, 'ids': [entry.timesheet_id]}
-
-            # Store full entry details for the cell
-            # In a real grid we might want specific entry IDs to editing them
-            # For simplicity, we send the aggregated hours and list of IDs
-            grid_rows[key]['entries'][date_str] = {
-                'hours': current_hours['hours'],
-                'ids': current_hours['ids'],
-                'description': entry.description # Note: last one wins for description preview
-            }
-            
-            daily_totals[date_str] = daily_totals.get(date_str, 0) + entry.hours
-            
-        return Response({
-            'rows': list(grid_rows.values()),
-            'daily_totals': daily_totals
-        })
+        return Response(build_grid(self.get_queryset()))
 
     @action(detail=False, methods=['get'])
     def team_grid(self, request):
         """
-        Get timesheet data for a specific team member (manager view).
+        Get timesheet data for team members (manager view).
         Requires 'view_team_timesheets' permission.
-        Params: member_id (required), start_date, end_date
+        Params: member_id, or member_ids (comma-separated) / team_id for several
+        members at once; start_date, end_date
         """
-        from .models import Permissions, RolePermissions
+        if not self._can_view_team(request.user):
+            return Response({'error': 'Permission denied'}, status=403)
         
-        # Check permission
-        user = request.user
-        has_permission = False
+        # Filter entries by date range
+        start_date = request.query_params.get('start_date')
+        end_date = request.query_params.get('end_date')
         
-        if hasattr(user, 'member') and user.member.role_id:
-            # Check if user's role has view_team_timesheets permission
-            perm = Permissions.objects.filter(name='view_team_timesheets').first()
-            if perm:
-                has_permission = RolePermissions.objects.filter(
-                    role_id=user.member.role_id,
-                    permission_id=perm
-                ).exists()
+        qs = TimesheetEntry.objects.all()
+        if start_date:
+            qs = qs.filter(date__gte=start_date)
+        if end_date:
+            qs = qs.filter(date__lte=end_date)
         
-        # Also allow superusers
-        if user.is_superuser:
-            has_permission = True
+        member_ids = request.query_params.get('member_ids')
+        team_id = request.query_params.get('team_id')
+        if member_ids or team_id:
+            # Several members in one grouped query
+            members = self._selected_members(member_ids, team_id)
             
-        if not has_permission:
-            return Response({'error': 'Permission denied'}, status=403)
+            grids = build_member_grids(qs, [m.member_id for m in members])
+            return Response({
+                'members': [
+                    {
+                        'member': {
+                            'member_id': str(m.member_id),
+                            'first_name': m.first_name,
+                            'last_name': m.last_name
+                        },
+                        **grids[m.member_id]
+                    }
+                    for m in members
+                ]
+            })
         
         # Get member_id parameter
         member_id = request.query_params.get('member_id')
         if not member_id:
-            return Response({'error': 'member_id parameter is required'}, status=400)
+            return Response({'error': 'member_id, member_ids or team_id parameter is required'}, status=400)
         
         try:
             target_member = Members.objects.get(member_id=member_id)
         except Members.DoesNotExist:
             return Response({'error': 'Member not found'}, status=404)
-        
-        # Filter entries for the specified member
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        
-        qs = TimesheetEntry.objects.filter(member=target_member)
-        
-        if start_date:
-            qs = qs.filter(date__gte=start_date)
-        if end_date:
-            qs = qs.filter(date__lte=end_date)
-            
-        qs = qs.select_related('project', 'task')
-        
-        # Structure data (same as weekly_grid)
-        grid_rows = {}
-        daily_totals = {}
-        
-        for entry in qs:
-            key = f"proj_{entry.project_id}_task_{entry.task_id}"
-            date_str = entry.date.isoformat()
-            
-            if key not in grid_rows:
-                grid_rows[key] = {
-                    'project_id': entry.project_id,
-                    'project_name': entry.project.name if entry.project else 'General',
-                    'task_id': entry.task_id,
-                    'task_title': entry.task.title if entry.task else 'General Task',
-                    'entries': {}
-                }
-            
-            current_hours = grid_rows[key]['entries'].get(date_str, {'hours': 0, 'ids': []})
-            current_hours['hours'] += entry.hours
-            if isinstance(current_hours, dict) and 'ids' in current_hours:
-                current_hours['ids'].append(entry.timesheet_id)
-            else:
-                current_hours = {'hours': entry.hours, 'ids': [entry.timesheet_id]}
-
-            grid_rows[key]['entries'][date_str] = {
-                'hours': current_hours['hours'],
-                'ids': current_hours['ids'],
-                'description': entry.description
-            }
-            
-            daily_totals[date_str] = daily_totals.get(date_str, 0) + entry.hours
             
         return Response({
             'member': {
@@ -202,57 +158,86 @@ class TimesheetViewSet(viewsets.ModelViewSet):
                 'first_name': target_member.first_name,
                 'last_name': target_member.last_name
             },
-            'rows': list(grid_rows.values()),
-            'daily_totals': daily_totals
+            **build_grid(qs.filter(member=target_member))
         })
 
     @action(detail=False, methods=['post'])
     def bulk_update(self, request):
         """
         Receive a grid update: list of { date, project_id, task_id, hours, description? }
-        Update or create entries.
+        Update or create entries (one entry per member/date/project/task cell).
+        Loads, diffs and writes the whole grid in a constant number of queries.
         """
         updates = request.data.get('updates', [])
         member = request.user.member if hasattr(request.user, 'member') else Members.objects.first()
         
+        def cell_key(date, project_id, task_id):
+            return (
+                str(date),
+                str(uuid.UUID(str(project_id))) if project_id else None,
+                str(uuid.UUID(str(task_id))) if task_id else None,
+            )
+        
+        # Load every existing entry in the submitted date range with one query
+        dates = [datetime.date.fromisoformat(str(u.get('date'))) for u in updates]
+        cells = {}
+        if dates:
+            existing = TimesheetEntry.objects.filter(member=member, date__range=(min(dates), max(dates)))
+            for entry in existing:
+                cells.setdefault(cell_key(entry.date.isoformat(), entry.project_id, entry.task_id), entry)
+        
+        # Diff the grid against them in memory
+        # Logic: If hours > 0, ensure entry exists. If 0, delete.
+        to_create = {}
+        to_update = {}
+        to_delete = set()
+        now = timezone.now()
+        
         results = []
-        for update in updates:
+        for update, day in zip(updates, dates):
             date = update.get('date')
             project_id = update.get('project_id')
             task_id = update.get('task_id')
             hours = float(update.get('hours', 0))
-            
-            # Find existing entry or create
-            # Logic: If hours > 0, ensure entry exists. If 0, delete.
-            # Simplified: One entry per task/day for now (though model allows multiple)
-            
-            criteria = {
-                'member': member,
-                'date': date,
-                'project_id': project_id,
-                'task_id': task_id
-            }
-            
-            entry = TimesheetEntry.objects.filter(**criteria).first()
+            key = cell_key(day.isoformat(), project_id, task_id)
+            entry = cells.get(key)
             
             if hours <= 0:
                 if entry:
-                    entry.delete()
+                    del cells[key]
+                    if to_create.pop(entry.timesheet_id, None) is None:
+                        to_update.pop(entry.timesheet_id, None)
+                        to_delete.add(entry.timesheet_id)
                     results.append({'status': 'deleted', 'date': date})
             else:
                 if entry:
                     entry.hours = hours
                     if 'description' in update:
                         entry.description = update['description']
-                    entry.save()
+                    entry.updated_at = now
+                    if entry.timesheet_id not in to_create:
+                        to_update[entry.timesheet_id] = entry
                     results.append({'status': 'updated', 'id': entry.timesheet_id})
                 else:
-                    entry = TimesheetEntry.objects.create(
-                        **criteria,
+                    entry = cells[key] = TimesheetEntry(
+                        member=member,
+                        date=day,
+                        project_id=key[1],
+                        task_id=key[2],
                         hours=hours,
                         description=update.get('description', '')
                     )
+                    to_create[entry.timesheet_id] = entry
                     results.append({'status': 'created', 'id': entry.timesheet_id})
+        
+        # Apply the diff in one transaction
+        with transaction.atomic():
+            if to_delete:
+                TimesheetEntry.objects.filter(timesheet_id__in=to_delete).delete()
+            if to_update:
+                TimesheetEntry.objects.bulk_update(to_update.values(), ['hours', 'description', 'updated_at'])
+            if to_create:
+                TimesheetEntry.objects.bulk_create(to_create.values())
                     
         return Response({'results': results})
 
@@ -260,80 +245,70 @@ class TimesheetViewSet(viewsets.ModelViewSet):
     def suggestions(self, request):
         """
         Auto-fill suggestions based on GitHub activity for a date range.
-        Params: start_date, end_date
+        Params: start_date, end_date; member_ids / team_id for a team
+        (manager view, suggestions then carry member_id)
         """
         start_date_str = request.query_params.get('start_date')
         end_date_str = request.query_params.get('end_date')
         
         if not start_date_str or not end_date_str:
             return Response({'error': 'start_date and end_date required'}, status=400)
-            
-        # 1. Identify GitHub Author
-        # Ideally Member model has a 'github_username' field. 
-        # For now, we try to match by email or fallback to 'github_username' field on Member if it existed
-        member = request.user.member if hasattr(request.user, 'member') else Members.objects.first()
         
-        # Simple heuristic: Match Member email to Commit author_email
-        # Or check if Member has a linked GitHub account (future)
+        from github import resolver
         
-        github_emails = [member.email] if member.email else []
-        # Add common variations or other known emails if needed
+        # 1. Identify GitHub Authors: the current member, or a team (manager view)
+        member_ids = request.query_params.get('member_ids')
+        team_id = request.query_params.get('team_id')
+        team_mode = bool(member_ids or team_id)
+        if team_mode:
+            if not self._can_view_team(request.user):
+                return Response({'error': 'Permission denied'}, status=403)
+            members = self._selected_members(member_ids, team_id)
+        else:
+            member = request.user.member if hasattr(request.user, 'member') else Members.objects.first()
+            members = [member] if member else []
         
-        # Find commits
+        # Emails and logins known to belong to these members (precomputed index)
+        author_keys = resolver.author_keys([m.member_id for m in members])
+        if not author_keys:
+            return Response([])
+        
+        # 2. One commit query for the whole range (index-friendly datetime bounds)
+        start = timezone.make_aware(datetime.datetime.combine(datetime.date.fromisoformat(start_date_str), datetime.time.min))
+        end = timezone.make_aware(datetime.datetime.combine(datetime.date.fromisoformat(end_date_str) + datetime.timedelta(days=1), datetime.time.min))
         commits = Commit.objects.filter(
-            committed_at__date__gte=start_date_str,
-            committed_at__date__lte=end_date_str
+            committed_at__gte=start,
+            committed_at__lt=end
         ).filter(
-            # Match by email (exact) OR fuzzy name match (simple)
-            # For MVP, let's assume one main user or strict email match
-            Q(author_email__in=github_emails) | 
-            Q(author_login__iexact=member.first_name) # Very rough guess
-        )
-
-        suggestions = []
+            Q(author_email__in=author_keys) | Q(author_login__in=author_keys)
+        ).values_list('sha', 'message', 'committed_at', 'repository_id', 'repository__name', 'author_email', 'author_login')
         
-        # Group by Date and Repository
+        # 3. Group by Member, Date and Repository in memory
         grouped = {}
-        
-        for commit in commits:
-            date_str = commit.committed_at.date().isoformat()
-            repo_name = commit.repository.name
-            
-            key = f"{date_str}_{repo_name}"
+        for sha, message, committed_at, repo_id, repo_name, author_email, author_login in commits:
+            member_id = resolver.resolve_member(author_email, author_login)
+            date_str = timezone.localtime(committed_at).date().isoformat()
+            key = (member_id, date_str, repo_id)
             
             if key not in grouped:
-                # Priority 1: Direct Link (The new trusty way)
-                if commit.repository.project:
-                    project = commit.repository.project
-                else:
-                    # Priority 2: Fuzzy Heuristics (Fallback)
-                    # Heuristic 1: Exact/Slug match
-                    project = Projects.objects.filter(
-                        Q(slug__iexact=repo_name) | Q(name__iexact=repo_name)
-                    ).first()
-                    
-                    # Heuristic 2: Contains match (risky but better than nothing for auto-fill)
-                    if not project:
-                         # Try to match start of string, e.g. "NSK" in "NSKRetail"
-                         # specific for nskjewels.com -> NSK...
-                         search_term = repo_name.split('.')[0].split('-')[0]
-                         project = Projects.objects.filter(name__icontains=search_term).first()
-                
+                project = resolver.resolve_project(repo_id)
                 grouped[key] = {
+                    'member_id': member_id,
                     'date': date_str,
                     'repository': repo_name,
-                    'project_id': project.project_id if project else None,
-                    'project_name': project.name if project else f"Repo: {repo_name} (Select Project)",
+                    'project_id': project[0] if project else None,
+                    'project_name': project[1] if project else f"Repo: {repo_name} (Select Project)",
                     'commits': [],
                     'messages': []
                 }
             
-            grouped[key]['commits'].append(commit.sha)
-            grouped[key]['messages'].append(commit.message.split('\n')[0])
-            
+            grouped[key]['commits'].append(sha)
+            grouped[key]['messages'].append(message.split('\n')[0])
+        
         # Format suggestions
+        suggestions = []
         for item in grouped.values():
-            suggestions.append({
+            suggestion = {
                 'date': item['date'],
                 'project_id': item['project_id'],
                 'suggested_project': item['project_name'] or f"GitHub: {item['repository']}",
@@ -341,6 +316,9 @@ class TimesheetViewSet(viewsets.ModelViewSet):
                 'hours': 2.0, # Default suggestion
                 'description': f"Commits: {'; '.join(item['messages'][:3])}",
                 'github_refs': item['commits']
-            })
+            }
+            if team_mode:
+                suggestion['member_id'] = item['member_id']
+            suggestions.append(suggestion)
             
         return Response(suggestions)
@@ -1,4 +1,5 @@
 from rest_framework.routers import DefaultRouter
+from django.conf import settings
 from django.urls import path
 from .views import *
 from .timesheet_views import TimesheetViewSet
@@ -9,7 +10,8 @@ from .auth_views import (
 from .import_views import ProjectImportView, TaskImportView, MemberImportView, UnifiedImportView
 from .zoho_views import (
     ZohoBoardViewSet, ZohoSectionViewSet, ZohoStatusViewSet, ZohoMemberViewSet,
-    ZohoTaskDataViewSet, ZohoSyncLogViewSet, ZohoPullWebhooksView, ZohoStatsView, ZohoResetView
+    ZohoTaskDataViewSet, ZohoSyncLogViewSet, ZohoPullWebhooksView, ZohoStatsView, ZohoResetView,
+    zoho_pull_webhooks_async
 )
 
 router = DefaultRouter()
@@ -60,7 +62,11 @@ urlpatterns = router.urls + [
     path('import/unified/', UnifiedImportView.as_view(), name='import-unified'),
     
     # Zoho sync endpoints
-    path('zoho/pull-webhooks/', ZohoPullWebhooksView.as_view(), name='zoho-pull-webhooks'),
+    path(
+        'zoho/pull-webhooks/',
+        zoho_pull_webhooks_async if settings.ASYNC_IO_VIEWS else ZohoPullWebhooksView.as_view(),
+        name='zoho-pull-webhooks'
+    ),
     path('zoho/stats/', ZohoStatsView.as_view(), name='zoho-stats'),
     path('zoho/reset/', ZohoResetView.as_view(), name='zoho-reset'),
 
@@ -2,6 +2,7 @@ from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
 from .models import *
 from .serializers import *
 
@@ -380,44 +381,42 @@ class TasksViewSet(viewsets.ModelViewSet):
         # Capture old status details before save
         old_status = instance.status_id
         
-        obj = serializer.save()
-
-        # Log Status Change
-        if new_status and old_status != new_status:
-            try:
-                # Try to get actor from request
-                actor_id = self.request.data.get('modified_by') or self.request.data.get('member_id')
-                if actor_id:
-                    ActivityLogs.objects.create(
-                        project_id=obj.project_id,
-                        member_id_id=actor_id,
-                        verb='status_changed',
-                        subject_type='task',
-                        subject_id=obj.task_id,
-                        data={
-                            'old_status': str(old_status.task_status_id) if old_status else None,
-                            'new_status': str(new_status.task_status_id),
-                            'new_status_name': new_status.name
-                        }
-                    )
-                    
-                    # 🎮 Emit Signal for Gamification
-                    from pm.signals import task_status_changed
-                    from pm.models import Members
-                    
-                    # Fetch Actor Object
-                    actor_obj = Members.objects.get(member_id=actor_id)
-                    
-                    task_status_changed.send(
-                        sender=instance.__class__,
-                        instance=obj,
-                        old_status=old_status,
-                        new_status=new_status,
-                        actor=actor_obj
-                    )
-                    
-            except Exception as e:
-                print(f"Error logging activity or gamification: {e}")
+        with transaction.atomic():
+            obj = serializer.save()
+
+            # Log Status Change
+            if new_status and old_status != new_status:
+                try:
+                    # Try to get actor from request
+                    actor_id = self.request.data.get('modified_by') or self.request.data.get('member_id')
+                    if actor_id:
+                        # Savepoint: a bad actor id must not roll back the task update
+                        with transaction.atomic():
+                            ActivityLogs.objects.create(
+                                project_id=obj.project_id,
+                                member_id_id=actor_id,
+                                verb='status_changed',
+                                subject_type='task',
+                                subject_id=obj.task_id,
+                                data={
+                                    'old_status': str(old_status.task_status_id) if old_status else None,
+                                    'new_status': str(new_status.task_status_id),
+                                    'new_status_name': new_status.name
+                                }
+                            )
+                            
+                            # 🎮 Outbox event for Gamification (dispatched by run_event_worker,
+                            # committed together with the task update)
+                            from events.bus import publish
+                            publish('task.status_changed', {
+                                'task_id': str(obj.task_id),
+                                'old_status_id': str(old_status.task_status_id) if old_status else None,
+                                'new_status_id': str(new_status.task_status_id),
+                                'actor_id': str(actor_id),
+                            }, ordering_key=actor_id)
+                        
+                except Exception as e:
+                    print(f"Error logging activity or gamification: {e}")
 
 class TeamMembersViewSet(viewsets.ModelViewSet):
     queryset = TeamMembers.objects.all()
@@ -0,0 +1,87 @@
+"""
+Zoho webhook-log API client.
+
+fetch_webhook_batch() is the blocking version used by the WSGI view;
+afetch_webhook_batch() fetches the same pages concurrently over the shared
+pooled async client (backend.async_http) for the ASGI profile.
+Both return (total_count, results) for the requested offset window.
+"""
+import requests
+
+WEBHOOK_API_URL = "https://marketing.logimaxindia.com/api/webhook-logs/?full_raw_body=true"
+
+PAGE_SIZE = 100  # API page size
+PAGE_CONCURRENCY = 5  # pages in flight at once (async client)
+
+
+def _pages_for(start_offset, batch_size, total_count):
+    """API page numbers covering [start_offset, start_offset + batch_size)."""
+    items_to_fetch = min(batch_size, total_count - start_offset)
+    if items_to_fetch <= 0:
+        return []
+    # Include the partial page at the end when the window isn't page-aligned
+    end = start_offset + items_to_fetch
+    first_page = (start_offset // PAGE_SIZE) + 1
+    last_page = ((end - 1) // PAGE_SIZE) + 1
+    return list(range(first_page, last_page + 1))
+
+
+def _assemble(pages_results, start_offset, batch_size):
+    """Join page results in order, trimming the offset and batch size."""
+    all_results = []
+    for page_num, results in enumerate(pages_results):
+        if not results:
+            break
+
+        # Handle offset within first page
+        if page_num == 0:
+            results = results[start_offset % PAGE_SIZE:]
+
+        # Don't exceed batch_size
+        remaining = batch_size - len(all_results)
+        all_results.extend(results[:remaining])
+        if len(all_results) >= batch_size:
+            break
+    return all_results
+
+
+def fetch_webhook_batch(start_offset, batch_size, base_url=WEBHOOK_API_URL):
+    response = requests.get(f"{base_url}&page_size=1", timeout=30)
+    response.raise_for_status()
+    total_count = response.json().get('count', 0)
+
+    pages_results = []
+    for page in _pages_for(start_offset, batch_size, total_count):
+        response = requests.get(f"{base_url}&page={page}&page_size={PAGE_SIZE}", timeout=60)
+        response.raise_for_status()
+        results = response.json().get('results', [])
+        pages_results.append(results)
+        if not results:
+            break
+        print(f"Page {page}: fetched {len(results)} items")
+
+    return total_count, _assemble(pages_results, start_offset, batch_size)
+
+
+async def afetch_webhook_batch(start_offset, batch_size, base_url=WEBHOOK_API_URL):
+    import asyncio
+    from backend.async_http import get_async_client
+
+    client = get_async_client()
+    response = await client.get(f"{base_url}&page_size=1", timeout=30)
+    response.raise_for_status()
+    total_count = response.json().get('count', 0)
+
+    semaphore = asyncio.Semaphore(PAGE_CONCURRENCY)
+
+    async def get_page(page):
+        async with semaphore:
+            r = await client.get(f"{base_url}&page={page}&page_size={PAGE_SIZE}", timeout=60)
+        r.raise_for_status()
+        return r.json().get('results', [])
+
+    # Up to PAGE_CONCURRENCY pages in flight; order is restored by gather
+    pages_results = await asyncio.gather(
+        *(get_page(page) for page in _pages_for(start_offset, batch_size, total_count))
+    )
+    return total_count, _assemble(pages_results, start_offset, batch_size)
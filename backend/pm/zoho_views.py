@@ -1,7 +1,9 @@
-import requests
 import json
 from datetime import datetime
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
 from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -13,10 +15,9 @@ from .zoho_serializers import (
     ZohoMemberSerializer, ZohoTaskDataSerializer, ZohoTaskDataListSerializer,
     ZohoSyncLogSerializer, BoardMappingSerializer, StatusMappingSerializer, MemberMappingSerializer
 )
-from .models import Tasks, Projects, Members, TaskStatuses, TaskAssignees
-
-
-WEBHOOK_API_URL = "https://marketing.logimaxindia.com/api/webhook-logs/?full_raw_body=true"
+from .models import Tasks, Projects, Members, TaskStatuses, TaskAssignees, MemberIdentity
+from . import identities
+from .zoho_client import afetch_webhook_batch, fetch_webhook_batch
 
 
 class ZohoBoardViewSet(viewsets.ModelViewSet):
@@ -203,10 +204,12 @@ class ZohoMemberViewSet(viewsets.ModelViewSet):
                 already_mapped += 1
                 continue
             
-            # 1. Try to find PM member by email (case-insensitive)
+            # 1. Try to find PM member by a known identity (Zoho id, then email)
             pm_member = None
-            if zoho_member.zoho_email:
-                pm_member = Members.objects.filter(email__iexact=zoho_member.zoho_email.strip()).first()
+            member_id = identities.resolve('zoho', zoho_member.zoho_user_id) or \
+                identities.resolve('email', zoho_member.zoho_email)
+            if member_id:
+                pm_member = Members.objects.filter(member_id=member_id).first()
             
             # 2. Fallback: Try to find by Name (case-insensitive)
             if not pm_member and zoho_member.zoho_name:
@@ -227,7 +230,8 @@ class ZohoMemberViewSet(viewsets.ModelViewSet):
 
             if pm_member:
                 zoho_member.mapped_member = pm_member
-                zoho_member.save()
+                zoho_member.save()  # Also records the zoho identity
+                identities.learn('email', zoho_member.zoho_email, pm_member.member_id)
                 mapped_count += 1
             else:
                 not_found.append({'name': zoho_member.zoho_name, 'email': zoho_member.zoho_email})
@@ -329,16 +333,11 @@ class ZohoTaskDataViewSet(viewsets.ModelViewSet):
         # Get Zoho User IDs from JSON (the 'id' field in assignees is zoho_user_id)
         zoho_user_ids = [str(a.get('id')) for a in zoho_task.assignees if a.get('id')]
         
-        # Find mapped PM member IDs through ZohoMember
-        mapped_member_ids = []
-        zoho_members = ZohoMember.objects.filter(
+        # Find mapped PM member IDs through ZohoMember (the authoritative mapping)
+        mapped_member_ids = list(ZohoMember.objects.filter(
             zoho_user_id__in=zoho_user_ids,
             mapped_member__isnull=False
-        ).select_related('mapped_member')
-        
-        for zm in zoho_members:
-            if zm.mapped_member:
-                mapped_member_ids.append(zm.mapped_member.member_id)
+        ).values_list('mapped_member_id', flat=True))
         
         # Current PM members assigned to this task
         current_assignments = TaskAssignees.objects.filter(task_id=task)
@@ -474,137 +473,108 @@ class ZohoPullWebhooksView(APIView):
         sync_log = ZohoSyncLog.objects.create(sync_type='pull_webhooks')
         
         try:
-            # First, get total count from API
-            response = requests.get(f"{WEBHOOK_API_URL}&page_size=1", timeout=30)
-            response.raise_for_status()
-            total_count = response.json().get('count', 0)
-            
-            # Calculate which page and records to fetch
-            # We'll fetch in batches using offset-based pagination
-            all_results = []
-            current_offset = start_offset
-            items_to_fetch = min(batch_size, total_count - start_offset)
-            
-            if items_to_fetch <= 0:
-                return Response({
-                    'success': True,
-                    'message': 'All items already synced',
-                    'total_in_api': total_count,
-                    'offset': start_offset,
-                    'has_more': False
-                })
-            
-            # Fetch items in smaller pages from API
-            page_size = 100  # API page size
-            pages_needed = (items_to_fetch + page_size - 1) // page_size
-            start_page = (start_offset // page_size) + 1
-            
-            for page_num in range(pages_needed):
-                page = start_page + page_num
-                url = f"{WEBHOOK_API_URL}&page={page}&page_size={page_size}"
-                response = requests.get(url, timeout=60)
-                response.raise_for_status()
-                data = response.json()
-                
-                results = data.get('results', [])
-                if not results:
-                    break
-                
-                # Handle offset within first page
-                if page_num == 0:
-                    skip_in_page = start_offset % page_size
-                    results = results[skip_in_page:]
-                
-                # Don't exceed batch_size
-                remaining = batch_size - len(all_results)
-                all_results.extend(results[:remaining])
-                
-                if len(all_results) >= batch_size:
-                    break
-                    
-                print(f"Page {page}: fetched {len(results)} items (batch so far: {len(all_results)}/{batch_size})")
-            
-            # Process this batch
-            for item in all_results:
-                try:
-                    self._process_webhook_item(item, sync_log)
-                    sync_log.items_processed += 1
-                except Exception as e:
-                    sync_log.items_failed += 1
-                    print(f"Error processing webhook {item.get('id')}: {e}")
-            
-            new_offset = start_offset + len(all_results)
-            has_more = new_offset < total_count
-            
-            # Auto-sync tasks if requested
-            auto_synced = 0
-            if auto_sync_tasks:
-                unsynced_tasks = ZohoTaskData.objects.filter(
-                    is_synced=False,
-                    board__mapped_project__isnull=False,
-                    status__mapped_status__isnull=False
-                ).select_related('board__mapped_project', 'status__mapped_status')
-                
-                for zoho_task in unsynced_tasks:
-                    try:
-                        task = Tasks.objects.filter(
-                            title=zoho_task.title,
-                            project_id=zoho_task.board.mapped_project
-                        ).first()
-                        
-                        if not task:
-                            task = Tasks(project_id=zoho_task.board.mapped_project)
-                        
-                        task.title = zoho_task.title
-                        task.description = zoho_task.user_story or zoho_task.description
-                        task.external_url = zoho_task.url
-                        
-                        if zoho_task.status and zoho_task.status.mapped_status:
-                            task.status_id = zoho_task.status.mapped_status
-                        
-                        task.save()
-                        
-                        zoho_task.synced_task = task
-                        zoho_task.is_synced = True
-                        zoho_task.last_sync_at = timezone.now()
-                        zoho_task.save()
-                        auto_synced += 1
-                    except Exception as e:
-                        print(f"Auto-sync error for {zoho_task.zoho_task_id}: {e}")
-            
-            sync_log.status = 'completed'
-            sync_log.completed_at = timezone.now()
-            sync_log.details = {
-                'batch_size': batch_size,
-                'offset': start_offset,
-                'new_offset': new_offset,
-                'total_in_api': total_count,
-                'has_more': has_more,
-                'auto_synced': auto_synced
-            }
-            sync_log.save()
-            
-            return Response({
+            total_count, all_results = fetch_webhook_batch(start_offset, batch_size)
+            return Response(self.process_batch(
+                sync_log, total_count, all_results, start_offset, batch_size, auto_sync_tasks
+            ))
+        except Exception as e:
+            self.fail(sync_log, e)
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    def fail(self, sync_log, error):
+        sync_log.status = 'failed'
+        sync_log.error_message = str(error)
+        sync_log.completed_at = timezone.now()
+        sync_log.save()
+    
+    def process_batch(self, sync_log, total_count, all_results, start_offset, batch_size, auto_sync_tasks):
+        """
+        Parse a fetched batch into ZohoTaskData (and optionally PM tasks).
+        Shared by the sync view and the ASGI view (zoho_pull_webhooks_async).
+        """
+        if start_offset >= total_count:
+            return {
                 'success': True,
+                'message': 'All items already synced',
                 'total_in_api': total_count,
-                'batch_fetched': len(all_results),
-                'processed': sync_log.items_processed,
-                'created': sync_log.items_created,
-                'updated': sync_log.items_updated,
-                'failed': sync_log.items_failed,
                 'offset': start_offset,
-                'new_offset': new_offset,
-                'has_more': has_more,
-                'remaining': total_count - new_offset,
-                'auto_synced': auto_synced
-            })
-            
-        except Exception as e:
-            sync_log.status = 'failed'
-            sync_log.error_message = str(e)
-            sync_log.completed_at = timezone.now()
-            sync_log.save()
-            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                'has_more': False
+            }
+        
+        # Process this batch
+        for item in all_results:
+            try:
+                self._process_webhook_item(item, sync_log)
+                sync_log.items_processed += 1
+            except Exception as e:
+                sync_log.items_failed += 1
+                print(f"Error processing webhook {item.get('id')}: {e}")
+        
+        new_offset = start_offset + len(all_results)
+        has_more = new_offset < total_count
+        
+        # Auto-sync tasks if requested
+        auto_synced = 0
+        if auto_sync_tasks:
+            unsynced_tasks = ZohoTaskData.objects.filter(
+                is_synced=False,
+                board__mapped_project__isnull=False,
+                status__mapped_status__isnull=False
+            ).select_related('board__mapped_project', 'status__mapped_status')
+            
+            for zoho_task in unsynced_tasks:
+                try:
+                    task = Tasks.objects.filter(
+                        title=zoho_task.title,
+                        project_id=zoho_task.board.mapped_project
+                    ).first()
+                    
+                    if not task:
+                        task = Tasks(project_id=zoho_task.board.mapped_project)
+                    
+                    task.title = zoho_task.title
+                    task.description = zoho_task.user_story or zoho_task.description
+                    task.external_url = zoho_task.url
+                    
+                    if zoho_task.status and zoho_task.status.mapped_status:
+                        task.status_id = zoho_task.status.mapped_status
+                    
+                    task.save()
+                    
+                    zoho_task.synced_task = task
+                    zoho_task.is_synced = True
+                    zoho_task.last_sync_at = timezone.now()
+                    zoho_task.save()
+                    auto_synced += 1
+                except Exception as e:
+                    print(f"Auto-sync error for {zoho_task.zoho_task_id}: {e}")
+        
+        sync_log.status = 'completed'
+        sync_log.completed_at = timezone.now()
+        sync_log.details = {
+            'batch_size': batch_size,
+            'offset': start_offset,
+            'new_offset': new_offset,
+            'total_in_api': total_count,
+            'has_more': has_more,
+            'auto_synced': auto_synced
+        }
+        sync_log.save()
+        
+        return {
+            'success': True,
+            'total_in_api': total_count,
+            'batch_fetched': len(all_results),
+            'processed': sync_log.items_processed,
+            'created': sync_log.items_created,
+            'updated': sync_log.items_updated,
+            'failed': sync_log.items_failed,
+            'offset': start_offset,
+            'new_offset': new_offset,
+            'has_more': has_more,
+            'remaining': total_count - new_offset,
+            'auto_synced': auto_synced
+        }
     
     def _process_webhook_item(self, item, sync_log):
         """Parse a webhook log item and create/update ZohoTaskData"""
@@ -804,6 +774,8 @@ class ZohoResetView(APIView):
             ZohoSection.objects.all().delete()
             ZohoStatus.objects.all().delete()
             ZohoMember.objects.all().delete()
+            MemberIdentity.objects.filter(provider='zoho').delete()
+            identities.invalidate_cache()
             ZohoBoard.objects.all().delete()
             ZohoSyncLog.objects.all().delete()
             
@@ -817,3 +789,38 @@ class ZohoResetView(APIView):
             return Response({
                 'error': f'Reset failed: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# ==================== ASGI PROFILE ====================
+
+@csrf_exempt
+async def zoho_pull_webhooks_async(request):
+    """
+    Async ZohoPullWebhooksView for the ASGI profile (ASYNC_IO_VIEWS).
+    Pages are fetched concurrently on the pooled client; parsing and DB
+    writes are the same code as the sync view, run in a worker thread.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+    
+    batch_size = int(data.get('batch_size', 200))
+    start_offset = int(data.get('offset', 0))
+    auto_sync_tasks = data.get('auto_sync', False)
+    
+    view = ZohoPullWebhooksView()
+    sync_log = await ZohoSyncLog.objects.acreate(sync_type='pull_webhooks')
+    
+    try:
+        total_count, all_results = await afetch_webhook_batch(start_offset, batch_size)
+        result = await sync_to_async(view.process_batch)(
+            sync_log, total_count, all_results, start_offset, batch_size, auto_sync_tasks
+        )
+        return JsonResponse(result)
+    except Exception as e:
+        await sync_to_async(view.fail)(sync_log, e)
+        return JsonResponse({'error': str(e)}, status=500)
@@ -0,0 +1,34 @@
+"""
+System checks for the reporting app.
+"""
+from django.conf import settings
+from django.core.checks import Error, register
+
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def check_shared_result_cache(app_configs, **kwargs):
+    """Result cache versions need a cache every process shares (see services/result_cache.py)."""
+    from .services.result_cache import SHARED_CACHE_ALIAS
+
+    if getattr(settings, 'REPORTING_SINGLE_PROCESS', False):
+        return []
+    backend = settings.CACHES.get(SHARED_CACHE_ALIAS, {}).get('BACKEND')
+    if backend is None:
+        return [Error(
+            f"CACHES has no '{SHARED_CACHE_ALIAS}' alias for the reporting result cache.",
+            hint="Configure a shared backend (Redis, Memcached or DatabaseCache).",
+            id='reporting.E001',
+        )]
+    if backend in PROCESS_LOCAL_BACKENDS:
+        return [Error(
+            f"CACHES['{SHARED_CACHE_ALIAS}'] uses {backend.rsplit('.', 1)[-1]}, which is local to one process; "
+            "writes in other processes would not invalidate cached report results.",
+            hint="Use Redis, Memcached or DatabaseCache, or set REPORTING_SINGLE_PROCESS=True.",
+            id='reporting.E002',
+        )]
+    return []
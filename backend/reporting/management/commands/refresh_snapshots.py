@@ -0,0 +1,79 @@
+"""
+Django Management Command: refresh_snapshots
+
+Keeps the snapshot tables of materialized datasets up to date (see
+reporting/services/snapshots.py): builds missing or outdated snapshots,
+refreshes datasets marked by data changes or due by their refresh_interval,
+and drops the snapshots of datasets no longer materialized.
+
+Usage:
+    python manage.py refresh_snapshots                      # Run forever
+    python manage.py refresh_snapshots --once               # Refresh what is due and exit
+    python manage.py refresh_snapshots --dataset=<id> --full
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from reporting.models import Dataset
+from reporting.services import snapshots
+
+
+class Command(BaseCommand):
+    help = 'Refresh snapshot tables of materialized datasets'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Refresh what is due, then exit',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=30.0,
+            help='Seconds between checks',
+        )
+        parser.add_argument(
+            '--dataset',
+            help='Refresh only this dataset (implies --once)',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rebuild snapshots instead of refreshing incrementally',
+        )
+
+    def refresh(self, dataset, full):
+        started = time.monotonic()
+        try:
+            mode, rows = snapshots.refresh(dataset, full=full)
+        except Exception as e:
+            self.stderr.write(f"  {dataset.name}: failed: {e}")
+            return
+        self.stdout.write(f"  {dataset.name}: {mode}, {rows} rows in {time.monotonic() - started:.1f}s")
+
+    def handle(self, *args, **options):
+        full = options.get('full')
+
+        if options.get('dataset'):
+            dataset = Dataset.objects.get(pk=options['dataset'])
+            if not dataset.materialize:
+                self.stderr.write(f"{dataset.name} is not materialized")
+                return
+            self.refresh(dataset, full)
+            return
+
+        self.stdout.write("Snapshot refresher started")
+        while True:
+            close_old_connections()
+            for dataset in snapshots.abandoned_datasets():
+                snapshots.drop_snapshot(dataset)
+                self.stdout.write(f"  {dataset.name}: snapshot dropped")
+            for dataset in snapshots.due_datasets():
+                self.refresh(dataset, full)
+
+            if options.get('once'):
+                break
+            time.sleep(options.get('interval'))
@@ -0,0 +1,80 @@
+"""
+Django Management Command: run_report_worker
+
+Runs queued report jobs (see reporting/services/jobs.py) in a thread pool,
+with at most REPORT_JOB_DATASET_CONCURRENCY jobs per dataset running across
+all workers.
+
+Usage:
+    python manage.py run_report_worker                 # Run forever
+    python manage.py run_report_worker --once          # Run everything queued and exit
+    python manage.py run_report_worker --workers=8
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from reporting.services.jobs import claim_jobs, purge, run_job
+
+
+def _run(job):
+    try:
+        return run_job(job)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Execute queued report jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run until nothing is queued, then exit',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Seconds to sleep when there is nothing to run',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Jobs run at the same time by this process',
+        )
+
+    def handle(self, *args, **options):
+        once = options.get('once')
+        interval = options.get('interval')
+        workers = options.get('workers')
+
+        self.stdout.write(f"Report worker started ({workers} workers)")
+        running = {}
+        last_purge = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                close_old_connections()
+                if time.monotonic() - last_purge > 300:
+                    stale, expired = purge()
+                    if stale or expired:
+                        self.stdout.write(f"  stale={stale} expired={expired}")
+                    last_purge = time.monotonic()
+
+                for job in claim_jobs(workers - len(running)):
+                    self.stdout.write(f"  running {job.job_id} ({job.dataset_id})")
+                    running[pool.submit(_run, job)] = job
+
+                if running:
+                    done, _ = wait(running, timeout=interval, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job = running.pop(future)
+                        self.stdout.write(f"  {'done' if future.result() else 'failed'} {job.job_id}")
+                elif once:
+                    break
+                else:
+                    time.sleep(interval)
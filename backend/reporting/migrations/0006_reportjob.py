@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:26
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reporting', '0005_alter_reportdefinition_display_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('job_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filters', models.JSONField(blank=True, default=dict)),
+                ('row_limit', models.IntegerField(blank=True, null=True)),
+                ('query_hash', models.CharField(help_text='Dataset version + filters + limit', max_length=64)),
+                ('active_key', models.CharField(blank=True, max_length=64, null=True, unique=True)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('columns', models.JSONField(blank=True, default=list)),
+                ('row_count', models.IntegerField(default=0)),
+                ('result_path', models.CharField(blank=True, default='', max_length=500)),
+                ('chunk_offsets', models.JSONField(blank=True, default=list, help_text='Byte offset of each gzip member')),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('dataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='reporting.dataset')),
+                ('report', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to='reporting.reportdefinition')),
+            ],
+            options={
+                'db_table': 'report_jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='report_jobs_status_a52eae_idx'), models.Index(fields=['dataset', 'status'], name='report_jobs_dataset_71514e_idx'), models.Index(fields=['query_hash', 'status'], name='report_jobs_query_h_02cdae_idx')],
+            },
+        ),
+    ]
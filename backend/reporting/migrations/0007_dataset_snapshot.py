@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reporting', '0006_reportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='materialize',
+            field=models.BooleanField(default=False, help_text='Serve reads from a snapshot table'),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='refresh_interval',
+            field=models.PositiveIntegerField(default=60, help_text='Minutes between scheduled refreshes; 0 = only after data changes'),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='snapshot_pending',
+            field=models.CharField(blank=True, choices=[('', 'Up to date'), ('incremental', 'Incremental refresh due'), ('full', 'Full refresh due')], default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='snapshot_refreshed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='snapshot_sources',
+            field=models.JSONField(blank=True, default=list, help_text='Tables the dataset query reads'),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='snapshot_table',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='snapshot_watermark',
+            field=models.DateTimeField(blank=True, help_text='Latest primary-model updated_at copied', null=True),
+        ),
+    ]
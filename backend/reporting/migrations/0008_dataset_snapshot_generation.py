@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reporting', '0007_dataset_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='snapshot_generation',
+            field=models.PositiveBigIntegerField(default=0, help_text='Bumped by every change mark'),
+        ),
+    ]
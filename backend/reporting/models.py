@@ -61,6 +61,21 @@ class Dataset(models.Model):
     # For SQL-based queries
     sql_query = models.TextField(blank=True, null=True, help_text="Raw SQL SELECT query")
     
+    # Materialized snapshot (ORM datasets; refreshed by refresh_snapshots)
+    SNAPSHOT_PENDING_CHOICES = [
+        ('', 'Up to date'),
+        ('incremental', 'Incremental refresh due'),
+        ('full', 'Full refresh due'),
+    ]
+    materialize = models.BooleanField(default=False, help_text="Serve reads from a snapshot table")
+    refresh_interval = models.PositiveIntegerField(default=60, help_text="Minutes between scheduled refreshes; 0 = only after data changes")
+    snapshot_table = models.CharField(max_length=64, blank=True, default='')
+    snapshot_refreshed_at = models.DateTimeField(null=True, blank=True)
+    snapshot_watermark = models.DateTimeField(null=True, blank=True, help_text="Latest primary-model updated_at copied")
+    snapshot_pending = models.CharField(max_length=20, choices=SNAPSHOT_PENDING_CHOICES, blank=True, default='')
+    snapshot_generation = models.PositiveBigIntegerField(default=0, help_text="Bumped by every change mark")
+    snapshot_sources = models.JSONField(default=list, blank=True, help_text="Tables the dataset query reads")
+    
     # Metadata
     is_active = models.BooleanField(default=True)
     is_public = models.BooleanField(default=True, help_text="Available to report builders")
@@ -118,3 +133,49 @@ class DatasetColumn(models.Model):
 
     def __str__(self):
         return f"{self.dataset.name}.{self.display_name}"
+
+
+class ReportJob(models.Model):
+    """
+    A dataset run executed by run_report_worker instead of the request.
+    Results are written to a gzip JSON-lines file the grid pages through.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    job_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='jobs')
+    report = models.ForeignKey(ReportDefinition, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    
+    filters = models.JSONField(default=dict, blank=True)
+    row_limit = models.IntegerField(null=True, blank=True)
+    query_hash = models.CharField(max_length=64, help_text="Dataset version + filters + limit")
+    # query_hash while queued/running, NULL after: duplicate submissions collide on it
+    active_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    columns = models.JSONField(default=list, blank=True)
+    row_count = models.IntegerField(default=0)
+    result_path = models.CharField(max_length=500, blank=True, default='')
+    chunk_offsets = models.JSONField(default=list, blank=True, help_text="Byte offset of each gzip member")
+    error = models.TextField(blank=True, default='')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'report_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['dataset', 'status']),
+            models.Index(fields=['query_hash', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.dataset.name} ({self.status})"
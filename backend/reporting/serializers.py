@@ -1,11 +1,33 @@
 from rest_framework import serializers
-from .models import ReportDefinition, Dataset, DatasetColumn
+from .models import ReportDefinition, Dataset, DatasetColumn, ReportJob
 
 
 class DatasetColumnSerializer(serializers.ModelSerializer):
     class Meta:
         model = DatasetColumn
         fields = '__all__'
+    
+    def validate(self, attrs):
+        def current(name, default=None):
+            return attrs.get(name, getattr(self.instance, name, default))
+        
+        if not current('is_calculated', False):
+            return attrs
+        
+        dataset = current('dataset')
+        field_name = current('field_name') or ''
+        if not dataset or dataset.query_type == 'sql' or not dataset.primary_model:
+            raise serializers.ValidationError({'is_calculated': 'Calculated columns need an ORM dataset with a primary model'})
+        if not field_name.isidentifier() or '__' in field_name:
+            raise serializers.ValidationError({'field_name': 'Use a simple name (letters, digits, _) for calculated columns'})
+        
+        from django.apps import apps
+        from .services.formula import FormulaError, validate_formula
+        try:
+            validate_formula(current('formula'), apps.get_model(dataset.primary_model))
+        except (FormulaError, LookupError, ValueError) as e:
+            raise serializers.ValidationError({'formula': str(e)})
+        return attrs
 
 
 class DatasetSerializer(serializers.ModelSerializer):
@@ -14,6 +36,23 @@ class DatasetSerializer(serializers.ModelSerializer):
     class Meta:
         model = Dataset
         fields = '__all__'
+        read_only_fields = [
+            'snapshot_table', 'snapshot_refreshed_at', 'snapshot_watermark', 'snapshot_pending', 'snapshot_generation',
+            'snapshot_sources',
+        ]
+    
+    def validate(self, attrs):
+        query_type = attrs.get('query_type', getattr(self.instance, 'query_type', 'orm'))
+        sql_query = attrs.get('sql_query', getattr(self.instance, 'sql_query', None))
+        if query_type == 'sql' and sql_query:
+            from .services.sql_engine import prepare
+            try:
+                prepare(sql_query)
+            except ValueError as e:
+                raise serializers.ValidationError({'sql_query': str(e)})
+        if query_type == 'sql' and attrs.get('materialize', getattr(self.instance, 'materialize', False)):
+            raise serializers.ValidationError({'materialize': "Only ORM datasets can be materialized"})
+        return attrs
 
 
 class DatasetListSerializer(serializers.ModelSerializer):
@@ -35,3 +74,15 @@ class ReportDefinitionSerializer(serializers.ModelSerializer):
     class Meta:
         model = ReportDefinition
         fields = '__all__'
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    dataset_name = serializers.CharField(source='dataset.name', read_only=True)
+    
+    class Meta:
+        model = ReportJob
+        fields = [
+            'job_id', 'dataset', 'dataset_name', 'report', 'filters', 'row_limit', 'status',
+            'columns', 'row_count', 'error', 'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = fields
@@ -2,12 +2,275 @@
 Enhanced Dataset Execution Engine
 Supports both SQL and ORM-based queries with multi-model JOINs
 """
+import threading
+from collections import OrderedDict
+
 from django.apps import apps
-from django.db import connection
 from django.db.models import F
 from ..models import Dataset
 
 
+# ==================== COMPILED PLANS ====================
+
+class ExecutionPlan:
+    """
+    Everything about an ORM dataset that doesn't depend on the request:
+    the model, validated column paths, select_related paths, annotations and
+    the alias -> path renamer. Built once per dataset version by compile_plan().
+    """
+    
+    def __init__(self, model, values_fields, select_related_paths, annotations, alias_to_path, calculated=None,
+                 multi_row_columns=()):
+        self.model = model
+        self.values_fields = values_fields
+        self.select_related_paths = select_related_paths
+        self.annotations = annotations
+        self.alias_to_path = alias_to_path
+        self.calculated = calculated or {}  # calculated column -> annotation alias
+        self.multi_row_columns = tuple(multi_row_columns)  # columns through a to-many relation
+    
+    def require_single_row(self, purpose):
+        """
+        Raise ValueError if a column goes through a to-many relation: those give
+        several rows per primary key, which pk-keyset paging can't step through.
+        """
+        if self.multi_row_columns:
+            raise ValueError(
+                f"This dataset can't be {purpose}: column(s) {', '.join(self.multi_row_columns)} "
+                f"have several values per row. Use an aggregate calculated column instead."
+            )
+    
+    def queryset(self, filters=None):
+        return self.annotated(filters).values(*self.values_fields)
+    
+    def annotated(self, filters=None, columns=None):
+        """Filtered queryset with the annotations `columns` need (default all), before values()."""
+        qs = self.model.objects.all()
+        
+        # Apply select_related for FK optimization
+        if self.select_related_paths:
+            qs = qs.select_related(*self.select_related_paths)
+        
+        # Filters on calculated columns apply after they are annotated
+        plain_filters, calculated_filters = {}, {}
+        for key, value in (filters or {}).items():
+            column, sep, lookup = key.partition('__')
+            if column in self.calculated:
+                calculated_filters[self.calculated[column] + sep + lookup] = value
+            else:
+                plain_filters[key] = value
+        
+        # Apply filters
+        try:
+            if plain_filters:
+                qs = qs.filter(**plain_filters)
+            annotations = self.annotations
+            if columns is not None:
+                needed = {self.lookup(c) for c in columns} | {k.split('__')[0] for k in calculated_filters}
+                annotations = {k: v for k, v in annotations.items() if k in needed}
+            if annotations:
+                qs = qs.annotate(**annotations)
+            if calculated_filters:
+                qs = qs.filter(**calculated_filters)
+        except Exception as e:
+            raise ValueError(f"Filter error: {e}")
+        return qs
+    
+    def lookup(self, column):
+        """Name to filter/order/group a column by (calculated columns use their alias)."""
+        return self.calculated.get(column, column)
+    
+    @property
+    def columns(self):
+        """Column paths in output order."""
+        return [self.alias_to_path.get(f, f) for f in self.values_fields]
+    
+    def field_for(self, path):
+        """Model field at the end of a column path (the output field for calculated columns)."""
+        if path in self.calculated:
+            return getattr(self.annotations[self.calculated[path]], '_output_field_or_none', None)
+        model = self.model
+        parts = path.split('__')
+        for part in parts[:-1]:
+            model = model._meta.get_field(part).related_model
+        return model._meta.get_field(parts[-1])
+    
+    def rename(self, row):
+        """Rename aliased fields back to original paths for consistency"""
+        if not self.alias_to_path:
+            return row
+        return {self.alias_to_path.get(key, key): value for key, value in row.items()}
+
+
+def to_many_paths(model, paths):
+    """
+    The paths (columns or filter keys) that go through a reverse FK or
+    many-to-many, and so give several rows per primary key.
+    """
+    found = []
+    for path in paths:
+        current_model = model
+        for part in path.split('__'):
+            try:
+                field = current_model._meta.get_field(part)
+            except Exception:
+                break  # a lookup (__gte) or an unknown name, reported elsewhere
+            if field.one_to_many or field.many_to_many:
+                found.append(path)
+                break
+            if not field.is_relation:
+                break
+            current_model = field.related_model
+    return found
+
+
+def compile_plan(dataset: Dataset) -> ExecutionPlan:
+    """Resolve and validate an ORM dataset definition into an ExecutionPlan."""
+    try:
+        app_label, model_name = dataset.primary_model.split('.')
+        model = apps.get_model(app_label, model_name)
+    except (ValueError, LookupError) as e:
+        raise ValueError(f"Invalid model '{dataset.primary_model}': {str(e)}")
+    
+    # Get visible columns from dataset definition
+    visible_columns = []
+    calculated_columns = {}  # field_name -> formula
+    for field_name, is_calculated, formula in dataset.columns.filter(is_visible=True).values_list(
+        'field_name', 'is_calculated', 'formula'
+    ):
+        if is_calculated:
+            calculated_columns[field_name] = formula
+        else:
+            visible_columns.append(field_name)
+    
+    if not visible_columns and not calculated_columns:
+        # Fallback: get all fields from primary model
+        visible_columns = [f.name for f in model._meta.get_fields() 
+                         if hasattr(f, 'get_internal_type') and not f.auto_created]
+    
+    # Validate fields exist before attempting query
+    invalid_fields = []
+    for col in visible_columns:
+        try:
+            # Try to resolve the field path
+            if '__' in col:
+                # Relation field - check each part of the path
+                parts = col.split('__')
+                current_model = model
+                for i, part in enumerate(parts[:-1]):
+                    try:
+                        field = current_model._meta.get_field(part)
+                        if hasattr(field, 'related_model') and field.related_model:
+                            current_model = field.related_model
+                        else:
+                            invalid_fields.append(f"{col} ('{part}' is not a relation)")
+                            break
+                    except Exception:
+                        invalid_fields.append(f"{col} ('{part}' not found in {current_model.__name__})")
+                        break
+            else:
+                # Direct field
+                model._meta.get_field(col)
+        except Exception:
+            invalid_fields.append(col)
+    
+    if invalid_fields:
+        raise ValueError(f"Invalid column(s) in dataset: {', '.join(invalid_fields)}. Please edit the dataset to fix column paths.")
+    
+    multi_row_columns = to_many_paths(model, visible_columns)
+    
+    # Separate direct fields from relation fields
+    direct_fields = []
+    relation_fields = {}  # field_path -> alias
+    select_related_paths = set()
+    
+    for col in visible_columns:
+        if '__' in col:
+            # This is a relation field (e.g., project__name, project__owner__first_name)
+            relation_fields[col] = col.replace('__', '_')  # Alias for annotate
+            
+            # Extract the relation path for select_related
+            parts = col.split('__')
+            for i in range(1, len(parts)):
+                select_related_paths.add('__'.join(parts[:i]))
+        else:
+            direct_fields.append(col)
+    
+    # Build annotations for relation fields
+    annotations = {alias: F(field_path) for field_path, alias in relation_fields.items()}
+    
+    # Calculated columns compile to expressions computed in the same query
+    from .formula import FormulaError, compile_formula
+    calculated_aliases = {}  # field_name -> alias
+    for field_name, formula in calculated_columns.items():
+        alias = f"calc_{field_name}"
+        try:
+            annotations[alias] = compile_formula(formula, model)
+        except FormulaError as e:
+            raise ValueError(f"Invalid formula for calculated column '{field_name}': {e}")
+        calculated_aliases[field_name] = alias
+    
+    values_fields = direct_fields + list(relation_fields.values()) + list(calculated_aliases.values())
+    alias_to_path = {v: k for k, v in relation_fields.items()}
+    alias_to_path.update({v: k for k, v in calculated_aliases.items()})
+    
+    plan = ExecutionPlan(
+        model=model,
+        values_fields=values_fields,
+        select_related_paths=tuple(sorted(select_related_paths)),
+        annotations=annotations,
+        alias_to_path=alias_to_path,
+        calculated=calculated_aliases,
+        multi_row_columns=multi_row_columns,
+    )
+    
+    # Resolve the query once so bad paths fail here rather than on every run
+    try:
+        plan.queryset().query.sql_with_params()
+    except Exception as e:
+        raise ValueError(f"Cannot resolve field path(s). Error: {str(e)}. Check that all selected columns exist in the database schema.")
+    
+    return plan
+
+
+PLAN_CACHE_SIZE = 256
+
+_plan_lock = threading.Lock()
+_plans = OrderedDict()  # dataset_id -> (updated_at, ExecutionPlan)
+
+
+def get_plan(dataset: Dataset) -> ExecutionPlan:
+    """
+    Compiled plan for a dataset, reused until its updated_at changes. A
+    materialized dataset with an up-to-date snapshot gets a plan reading the
+    snapshot table (see services/snapshots.py).
+    """
+    version = (dataset.updated_at, dataset.materialize, dataset.snapshot_table)
+    with _plan_lock:
+        cached = _plans.get(dataset.dataset_id)
+        if cached and cached[0] == version:
+            _plans.move_to_end(dataset.dataset_id)
+            return cached[1]
+    
+    plan = compile_plan(dataset)
+    from . import snapshots
+    if snapshots.is_current(dataset):
+        plan = snapshots.snapshot_plan(dataset, plan)
+    with _plan_lock:
+        _plans[dataset.dataset_id] = (version, plan)
+        while len(_plans) > PLAN_CACHE_SIZE:
+            _plans.popitem(last=False)
+    return plan
+
+
+def clear_plans(dataset_id=None):
+    with _plan_lock:
+        if dataset_id is None:
+            _plans.clear()
+        else:
+            _plans.pop(dataset_id, None)
+
+
 class DatasetExecutor:
     @staticmethod
     def execute(dataset: Dataset, filters: dict = None, limit: int = 100):
@@ -17,158 +280,51 @@ class DatasetExecutor:
         else:
             return DatasetExecutor._execute_orm(dataset, filters, limit)
     
+    @staticmethod
+    def execute_cached(dataset: Dataset, filters: dict = None, limit: int = 100):
+        """execute() through the result cache (see services/result_cache.py)."""
+        from .result_cache import get_or_compute, query_tables
+        
+        tables = None
+        if dataset.query_type != 'sql' and dataset.primary_model:
+            tables = query_tables(get_plan(dataset).queryset(filters))
+        
+        return get_or_compute(
+            f"dataset:{dataset.dataset_id}:{dataset.updated_at.isoformat()}",
+            filters, limit,
+            lambda: DatasetExecutor.execute(dataset, filters, limit),
+            tables=tables,
+            stats_id=str(dataset.dataset_id),
+        )
+    
     @staticmethod
     def _execute_sql(dataset: Dataset, filters: dict, limit: int):
-        """Execute raw SQL query"""
+        """Execute raw SQL query (validated, wrapped and guarded by sql_engine)"""
         if not dataset.sql_query:
             return []
         
-        sql = dataset.sql_query.strip()
-        
-        # Basic safety: only allow SELECT
-        if not sql.upper().startswith('SELECT'):
-            raise ValueError("Only SELECT queries are allowed")
-        
-        # Apply limit if not present
-        if 'LIMIT' not in sql.upper():
-            sql = f"{sql} LIMIT {limit}"
-        
-        with connection.cursor() as cursor:
-            cursor.execute(sql)
-            columns = [col[0] for col in cursor.description]
-            results = []
-            for row in cursor.fetchall():
-                results.append(dict(zip(columns, row)))
-        
-        return results
+        from . import sql_engine
+        return sql_engine.execute(dataset.sql_query, filters, limit)
     
     @staticmethod
     def _execute_orm(dataset: Dataset, filters: dict, limit: int):
         """Execute ORM-based query with multi-model support"""
         if not dataset.primary_model:
             return []
-        
-        try:
-            app_label, model_name = dataset.primary_model.split('.')
-            model = apps.get_model(app_label, model_name)
-        except (ValueError, LookupError) as e:
-            raise ValueError(f"Invalid model '{dataset.primary_model}': {str(e)}")
-        
-        # Start with all objects
-        qs = model.objects.all()
-        
-        # Get visible columns from dataset definition
-        visible_columns = list(
-            dataset.columns.filter(is_visible=True).values_list('field_name', flat=True)
-        )
-        
-        if not visible_columns:
-            # Fallback: get all fields from primary model
-            visible_columns = [f.name for f in model._meta.get_fields() 
-                             if hasattr(f, 'get_internal_type') and not f.auto_created]
-        
-        # Validate fields exist before attempting query
-        invalid_fields = []
-        for col in visible_columns:
-            try:
-                # Try to resolve the field path
-                if '__' in col:
-                    # Relation field - check each part of the path
-                    parts = col.split('__')
-                    current_model = model
-                    for i, part in enumerate(parts[:-1]):
-                        try:
-                            field = current_model._meta.get_field(part)
-                            if hasattr(field, 'related_model') and field.related_model:
-                                current_model = field.related_model
-                            else:
-                                invalid_fields.append(f"{col} ('{part}' is not a relation)")
-                                break
-                        except Exception:
-                            invalid_fields.append(f"{col} ('{part}' not found in {current_model.__name__})")
-                            break
-                else:
-                    # Direct field
-                    model._meta.get_field(col)
-            except Exception:
-                invalid_fields.append(col)
-        
-        if invalid_fields:
-            raise ValueError(f"Invalid column(s) in dataset: {', '.join(invalid_fields)}. Please edit the dataset to fix column paths.")
-        
-        # Separate direct fields from relation fields
-        direct_fields = []
-        relation_fields = {}  # field_path -> alias
-        select_related_paths = set()
-        
-        for col in visible_columns:
-            if '__' in col:
-                # This is a relation field (e.g., project__name, project__owner__first_name)
-                relation_fields[col] = col.replace('__', '_')  # Alias for annotate
-                
-                # Extract the relation path for select_related
-                parts = col.split('__')
-                for i in range(1, len(parts)):
-                    select_related_paths.add('__'.join(parts[:i]))
-            else:
-                direct_fields.append(col)
-        
-        # Apply select_related for FK optimization
-        if select_related_paths:
-            try:
-                qs = qs.select_related(*select_related_paths)
-            except Exception as e:
-                # Log but don't fail - some paths may not be valid for select_related
-                print(f"select_related warning: {e}")
-        
-        # Apply filters
-        if filters:
-            try:
-                qs = qs.filter(**filters)
-            except Exception as e:
-                raise ValueError(f"Filter error: {e}")
-        
-        # Build annotations for relation fields
-        annotations = {}
-        for field_path, alias in relation_fields.items():
-            annotations[alias] = F(field_path)
-        
-        if annotations:
-            try:
-                qs = qs.annotate(**annotations)
-            except Exception as e:
-                raise ValueError(f"Cannot resolve field path(s). Error: {str(e)}. Check that all selected columns exist in the database schema.")
-        
-        # Build values list
-        values_fields = direct_fields + list(relation_fields.values())
-        
-        try:
-            qs = qs.values(*values_fields)
-        except Exception as e:
-            # Provide helpful error message
-            raise ValueError(f"Query error: {str(e)}. Some columns may not exist. Please verify the dataset configuration.")
-        
-        # Apply limit and convert to list
+        return list(DatasetExecutor.iter_rows(dataset, filters, limit))
+    
+    @staticmethod
+    def iter_rows(dataset: Dataset, filters: dict = None, limit: int = None):
+        """Stream rows of an ORM dataset using its compiled plan."""
+        plan = get_plan(dataset)
+        qs = plan.queryset(filters)
+        if limit is not None:
+            qs = qs[:limit]
         try:
-            results = list(qs[:limit])
+            for row in qs.iterator(chunk_size=2000):
+                yield plan.rename(row)
         except Exception as e:
             raise ValueError(f"Execution error: {str(e)}")
-        
-        # Rename aliased fields back to original paths for consistency
-        if relation_fields:
-            alias_to_path = {v: k for k, v in relation_fields.items()}
-            normalized_results = []
-            for row in results:
-                normalized_row = {}
-                for key, value in row.items():
-                    if key in alias_to_path:
-                        normalized_row[alias_to_path[key]] = value
-                    else:
-                        normalized_row[key] = value
-                normalized_results.append(normalized_row)
-            return normalized_results
-        
-        return results
     
     @staticmethod
     def get_columns(dataset: Dataset):
@@ -0,0 +1,490 @@
+"""
+Formula language for calculated dataset columns.
+
+A formula is parsed into a small AST and compiled into Django expressions
+(F/Func/Case/aggregates) on the dataset's primary model, so the database
+computes it in the same query as the other columns:
+
+    DATEDIFF(TODAY(), due_date)                          -- overdue days
+    COALESCE(SUM(timesheet_entries__hours), 0) - estimate_hours
+    ROUND(percent_complete / 100, 2)
+    CASE WHEN due_date < TODAY() AND percent_complete < 100 THEN 'Late' ELSE 'On track' END
+
+Syntax:
+    literals        12, 4.5, 'text', TRUE, FALSE, NULL
+    fields          field paths as in dataset columns (project__name)
+    operators       + - * /   = != <> < <= > >=   AND OR NOT   IS [NOT] NULL
+    CASE            CASE WHEN <cond> THEN <expr> ... [ELSE <expr>] END
+    functions       see FUNCTIONS below; aggregates see AGGREGATES
+
+Fields that go through a to-many relation (timesheet_entries__hours) are
+only allowed inside an aggregate, which is computed per dataset row. Each
+aggregate is its own correlated subquery, so aggregates over different
+to-many paths don't multiply each other's joined rows.
+
+compile_formula() raises FormulaError for anything it can't compile; the
+column serializer calls validate_formula() when a column is saved.
+"""
+import re
+
+from django.db.models import (
+    Avg, BooleanField, Case, CharField, Count, DateField, DateTimeField, F,
+    FloatField, IntegerField, Max, Min, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.expressions import CombinedExpression, ExpressionWrapper, Func
+from django.db.models.functions import (
+    Abs, Cast, Coalesce, Concat, ExtractDay, ExtractMonth, ExtractYear, Length,
+    Lower, Now, NullIf, Round, TruncDate, Upper,
+)
+from django.db.models import lookups
+
+
+class FormulaError(ValueError):
+    pass
+
+
+class DateDiff(Func):
+    """Whole days from the second date to the first (MySQL DATEDIFF semantics)."""
+    function = 'DATEDIFF'
+    arity = 2
+    output_field = IntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection,
+            template='CAST(julianday(date(%(expressions)s)) AS INTEGER)',
+            arg_joiner=')) - julianday(date(',
+            **extra_context
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection,
+            template='(%(expressions)s::date)',
+            arg_joiner='::date - ',
+            **extra_context
+        )
+
+
+# ==================== PARSER ====================
+
+TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<number>\d+(?:\.\d+)?|\.\d+)
+      | (?P<string>'(?:[^']|'')*')
+      | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+      | (?P<op><=|>=|!=|<>|[-+*/(),=<>])
+    )
+""", re.VERBOSE)
+
+KEYWORDS = {'AND', 'OR', 'NOT', 'IS', 'NULL', 'TRUE', 'FALSE', 'CASE', 'WHEN', 'THEN', 'ELSE', 'END'}
+
+
+def tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = TOKEN_RE.match(text, pos)
+        if not match or match.end() == pos:
+            raise FormulaError(f"Unexpected character at position {pos + 1}: '{text[pos:].strip()[:10]}'")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'name' and value.upper() in KEYWORDS:
+            kind, value = 'keyword', value.upper()
+        elif kind == 'string':
+            value = value[1:-1].replace("''", "'")
+        tokens.append((kind, value))
+        pos = match.end()
+    return tokens
+
+
+class Parser:
+    """Recursive descent parser producing tuples: ('num', 1), ('field', 'a__b'), ('call', 'SUM', [...]) ..."""
+
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.pos = 0
+
+    def peek(self, *values):
+        if self.pos < len(self.tokens):
+            kind, value = self.tokens[self.pos]
+            if not values or value in values and kind in ('op', 'keyword'):
+                return value
+        return None
+
+    def take(self, *values):
+        value = self.peek(*values)
+        if value is not None:
+            self.pos += 1
+        return value
+
+    def expect(self, value):
+        if self.take(value) is None:
+            found = self.tokens[self.pos][1] if self.pos < len(self.tokens) else 'end of formula'
+            raise FormulaError(f"Expected '{value}' but found '{found}'")
+
+    def parse(self):
+        if not self.tokens:
+            raise FormulaError("Formula is empty")
+        node = self.parse_or()
+        if self.pos < len(self.tokens):
+            raise FormulaError(f"Unexpected '{self.tokens[self.pos][1]}'")
+        return node
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self.take('OR'):
+            node = ('or', node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_not()
+        while self.take('AND'):
+            node = ('and', node, self.parse_not())
+        return node
+
+    def parse_not(self):
+        if self.take('NOT'):
+            return ('not', self.parse_not())
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        node = self.parse_additive()
+        if self.take('IS'):
+            negated = bool(self.take('NOT'))
+            self.expect('NULL')
+            return ('isnull', node, negated)
+        op = self.take('=', '!=', '<>', '<', '<=', '>', '>=')
+        if op:
+            return ('cmp', op, node, self.parse_additive())
+        return node
+
+    def parse_additive(self):
+        node = self.parse_multiplicative()
+        while True:
+            op = self.take('+', '-')
+            if not op:
+                return node
+            node = ('arith', op, node, self.parse_multiplicative())
+
+    def parse_multiplicative(self):
+        node = self.parse_unary()
+        while True:
+            op = self.take('*', '/')
+            if not op:
+                return node
+            node = ('arith', op, node, self.parse_unary())
+
+    def parse_unary(self):
+        if self.take('-'):
+            return ('arith', '*', ('num', -1), self.parse_unary())
+        return self.parse_primary()
+
+    def parse_primary(self):
+        if self.pos >= len(self.tokens):
+            raise FormulaError("Formula ends unexpectedly")
+        kind, value = self.tokens[self.pos]
+        self.pos += 1
+
+        if kind == 'number':
+            return ('num', float(value) if '.' in value else int(value))
+        if kind == 'string':
+            return ('str', value)
+        if kind == 'op' and value == '(':
+            node = self.parse_or()
+            self.expect(')')
+            return node
+        if kind == 'keyword':
+            if value in ('TRUE', 'FALSE'):
+                return ('bool', value == 'TRUE')
+            if value == 'NULL':
+                return ('null',)
+            if value == 'CASE':
+                return self.parse_case()
+            raise FormulaError(f"Unexpected '{value}'")
+        if kind == 'name':
+            if self.take('('):
+                args = []
+                if not self.take(')'):
+                    args.append(self.parse_or())
+                    while self.take(','):
+                        args.append(self.parse_or())
+                    self.expect(')')
+                return ('call', value.upper(), args)
+            return ('field', value)
+        raise FormulaError(f"Unexpected '{value}'")
+
+    def parse_case(self):
+        whens = []
+        while self.take('WHEN'):
+            condition = self.parse_or()
+            self.expect('THEN')
+            whens.append((condition, self.parse_or()))
+        if not whens:
+            raise FormulaError("CASE needs at least one WHEN")
+        default = self.parse_or() if self.take('ELSE') else ('null',)
+        self.expect('END')
+        return ('case', whens, default)
+
+
+# ==================== COMPILER ====================
+
+# Value kinds tracked while compiling, for type checks and output fields
+OUTPUT_FIELDS = {
+    'int': IntegerField,
+    'number': FloatField,
+    'text': CharField,
+    'date': DateField,
+    'datetime': DateTimeField,
+    'bool': BooleanField,
+}
+
+FIELD_KINDS = {
+    'AutoField': 'int', 'BigAutoField': 'int', 'SmallAutoField': 'int',
+    'IntegerField': 'int', 'BigIntegerField': 'int', 'SmallIntegerField': 'int',
+    'PositiveIntegerField': 'int', 'PositiveBigIntegerField': 'int', 'PositiveSmallIntegerField': 'int',
+    'DecimalField': 'number', 'FloatField': 'number',
+    'CharField': 'text', 'TextField': 'text', 'EmailField': 'text', 'SlugField': 'text',
+    'URLField': 'text', 'UUIDField': 'text',
+    'DateField': 'date', 'DateTimeField': 'datetime',
+    'BooleanField': 'bool',
+}
+
+COMPARISONS = {
+    '=': lookups.Exact, '!=': lookups.Exact, '<>': lookups.Exact,
+    '<': lookups.LessThan, '<=': lookups.LessThanOrEqual,
+    '>': lookups.GreaterThan, '>=': lookups.GreaterThanOrEqual,
+}
+
+AGGREGATES = {'SUM': Sum, 'AVG': Avg, 'MIN': Min, 'MAX': Max, 'COUNT': Count}
+
+# name -> (min args, max args)
+FUNCTIONS = {
+    'COALESCE': (2, None), 'NULLIF': (2, 2), 'IF': (3, 3),
+    'ROUND': (1, 2), 'ABS': (1, 1),
+    'LOWER': (1, 1), 'UPPER': (1, 1), 'LENGTH': (1, 1), 'CONCAT': (2, None),
+    'DATEDIFF': (2, 2), 'YEAR': (1, 1), 'MONTH': (1, 1), 'DAY': (1, 1),
+    'TODAY': (0, 0), 'NOW': (0, 0),
+}
+
+NUMERIC = ('int', 'number', None)
+TEMPORAL = ('date', 'datetime', None)
+
+
+def _output_field(kinds):
+    """Common output field for values of `kinds` (None = unknown/NULL)."""
+    kinds = {k for k in kinds if k is not None}
+    if not kinds:
+        return None
+    if kinds <= {'int', 'number'}:
+        return FloatField() if 'number' in kinds else IntegerField()
+    if kinds <= {'date', 'datetime'}:
+        return DateTimeField() if 'datetime' in kinds else DateField()
+    if len(kinds) == 1:
+        return OUTPUT_FIELDS[kinds.pop()]()
+    raise FormulaError(f"Cannot mix {' and '.join(sorted(kinds))} values")
+
+
+class Compiler:
+
+    def __init__(self, model):
+        self.model = model
+        self.has_aggregate = False
+
+    def aggregate(self, func):
+        """`func` over the current row's related rows, as a subquery with its own joins."""
+        rows = self.model._default_manager.filter(pk=OuterRef('pk')).order_by().values('pk')
+        return Subquery(rows.annotate(_value=func).values('_value'))
+
+    def field(self, path, in_aggregate):
+        model = self.model
+        parts = path.split('__')
+        field = None
+        for i, part in enumerate(parts):
+            try:
+                field = model._meta.get_field(part)
+            except Exception:
+                raise FormulaError(f"Unknown field '{path}' ('{part}' not found in {model.__name__})")
+            if (field.one_to_many or field.many_to_many) and not in_aggregate:
+                raise FormulaError(f"'{path}' has many values per row; wrap it in an aggregate such as SUM()")
+            if i < len(parts) - 1:
+                if not field.is_relation:
+                    raise FormulaError(f"Unknown field '{path}' ('{part}' is not a relation)")
+                model = field.related_model
+        kind = FIELD_KINDS.get(field.get_internal_type()) if not field.is_relation else None
+        return F(path), kind
+
+    def value(self, node, in_aggregate=False):
+        """(expression, kind) for a value node."""
+        tag = node[0]
+
+        if tag == 'num':
+            kind = 'number' if isinstance(node[1], float) else 'int'
+            return Value(node[1], output_field=OUTPUT_FIELDS[kind]()), kind
+        if tag == 'str':
+            return Value(node[1], output_field=CharField()), 'text'
+        if tag == 'bool':
+            return Value(node[1], output_field=BooleanField()), 'bool'
+        if tag == 'null':
+            return Value(None), None
+        if tag == 'field':
+            return self.field(node[1], in_aggregate)
+        if tag == 'arith':
+            return self.arith(node, in_aggregate)
+        if tag == 'case':
+            return self.case(node[1], node[2], in_aggregate)
+        if tag == 'call':
+            return self.call(node[1], node[2], in_aggregate)
+
+        # Conditions used as values (a boolean column)
+        condition = self.condition(node, in_aggregate)
+        return ExpressionWrapper(condition, output_field=BooleanField()), 'bool'
+
+    def arith(self, node, in_aggregate):
+        _, op, lhs, rhs = node
+        left, left_kind = self.value(lhs, in_aggregate)
+        right, right_kind = self.value(rhs, in_aggregate)
+        if left_kind not in NUMERIC or right_kind not in NUMERIC:
+            raise FormulaError(f"'{op}' needs numbers (use DATEDIFF for dates, CONCAT for text)")
+        if op == '/':
+            # Integer division truncates on some backends
+            left = Cast(left, FloatField())
+            return CombinedExpression(left, op, right, output_field=FloatField()), 'number'
+        output = _output_field([left_kind, right_kind]) or FloatField()
+        kind = 'int' if isinstance(output, IntegerField) else 'number'
+        return CombinedExpression(left, op, right, output_field=output), kind
+
+    def condition(self, node, in_aggregate=False):
+        """Q for a condition node; plain boolean values compare to TRUE."""
+        tag = node[0]
+        if tag == 'and':
+            return self.condition(node[1], in_aggregate) & self.condition(node[2], in_aggregate)
+        if tag == 'or':
+            return self.condition(node[1], in_aggregate) | self.condition(node[2], in_aggregate)
+        if tag == 'not':
+            return ~self.condition(node[1], in_aggregate)
+        if tag == 'isnull':
+            expr, _ = self.value(node[1], in_aggregate)
+            return Q(lookups.IsNull(expr, not node[2]))
+        if tag == 'cmp':
+            _, op, lhs, rhs = node
+            left, left_kind = self.value(lhs, in_aggregate)
+            right, right_kind = self.value(rhs, in_aggregate)
+            _output_field([left_kind, right_kind])
+            q = Q(COMPARISONS[op](left, right))
+            return ~q if op in ('!=', '<>') else q
+
+        expr, kind = self.value(node, in_aggregate)
+        if kind not in ('bool', None):
+            raise FormulaError("Expected a condition (e.g. a comparison)")
+        return Q(lookups.Exact(expr, Value(True)))
+
+    def case(self, whens, default, in_aggregate):
+        compiled = []
+        kinds = []
+        for condition, result in whens:
+            expr, kind = self.value(result, in_aggregate)
+            compiled.append((self.condition(condition, in_aggregate), expr))
+            kinds.append(kind)
+        default_expr, default_kind = self.value(default, in_aggregate)
+        kinds.append(default_kind)
+        output = _output_field(kinds)
+        case = Case(
+            *[When(condition, then=expr) for condition, expr in compiled],
+            default=default_expr,
+            output_field=output,
+        )
+        return case, _kind_of(output)
+
+    def call(self, name, args, in_aggregate):
+        if name in AGGREGATES:
+            if in_aggregate:
+                raise FormulaError(f"{name}() cannot be nested inside another aggregate")
+            if len(args) != 1:
+                raise FormulaError(f"{name}() takes exactly one argument")
+            self.has_aggregate = True
+            expr, kind = self.value(args[0], in_aggregate=True)
+            if name == 'COUNT':
+                return self.aggregate(Count(expr)), 'int'
+            if name in ('SUM', 'AVG') and kind not in NUMERIC:
+                raise FormulaError(f"{name}() needs a number")
+            if name == 'AVG':
+                return self.aggregate(Avg(expr, output_field=FloatField())), 'number'
+            return self.aggregate(AGGREGATES[name](expr)), kind
+
+        if name not in FUNCTIONS:
+            raise FormulaError(f"Unknown function '{name}'")
+        low, high = FUNCTIONS[name]
+        if len(args) < low or (high is not None and len(args) > high):
+            expected = f"{low}" if low == high else f"{low}+" if high is None else f"{low}-{high}"
+            raise FormulaError(f"{name}() takes {expected} argument(s), got {len(args)}")
+
+        if name == 'TODAY':
+            return TruncDate(Now()), 'date'
+        if name == 'NOW':
+            return Now(), 'datetime'
+        if name == 'IF':
+            return self.case([(args[0], args[1])], args[2], in_aggregate)
+
+        values = [self.value(arg, in_aggregate) for arg in args]
+        exprs = [expr for expr, _ in values]
+        kinds = [kind for _, kind in values]
+
+        if name == 'COALESCE':
+            output = _output_field(kinds)
+            return Coalesce(*exprs, output_field=output), _kind_of(output)
+        if name == 'NULLIF':
+            output = _output_field(kinds)
+            return NullIf(*exprs, output_field=output), _kind_of(output)
+        if name in ('ROUND', 'ABS'):
+            if kinds[0] not in NUMERIC or (len(kinds) > 1 and kinds[1] not in ('int', None)):
+                raise FormulaError(f"{name}() needs a number")
+            if name == 'ABS':
+                return Abs(exprs[0]), kinds[0]
+            precision = args[1][1] if len(args) > 1 and args[1][0] == 'num' else 0
+            return Round(exprs[0], precision=precision, output_field=FloatField()), 'number'
+        if name in ('LOWER', 'UPPER', 'LENGTH'):
+            if name == 'LENGTH':
+                return Length(exprs[0]), 'int'
+            return (Lower if name == 'LOWER' else Upper)(exprs[0]), 'text'
+        if name == 'CONCAT':
+            text = [Cast(e, CharField()) if k != 'text' else e for e, k in values]
+            return Concat(*text, output_field=CharField()), 'text'
+        if name == 'DATEDIFF':
+            if any(k not in TEMPORAL for k in kinds):
+                raise FormulaError("DATEDIFF() needs two dates")
+            return DateDiff(*exprs), 'int'
+        # YEAR / MONTH / DAY
+        if kinds[0] not in TEMPORAL:
+            raise FormulaError(f"{name}() needs a date")
+        extract = {'YEAR': ExtractYear, 'MONTH': ExtractMonth, 'DAY': ExtractDay}[name]
+        return extract(exprs[0]), 'int'
+
+
+def _kind_of(output_field):
+    if output_field is None:
+        return None
+    for kind, field_class in OUTPUT_FIELDS.items():
+        if type(output_field) is field_class:
+            return kind
+    return None
+
+
+def compile_formula(formula, model):
+    """Django expression computing `formula` for each row of `model`."""
+    node = Parser(formula or '').parse()
+    expression, _ = Compiler(model).value(node)
+    return expression
+
+
+def validate_formula(formula, model):
+    """Compile `formula` and resolve it against `model`; raises FormulaError with a readable message."""
+    expression = compile_formula(formula, model)
+    try:
+        model.objects.annotate(_formula=expression).values('_formula').query.sql_with_params()
+    except FormulaError:
+        raise
+    except Exception as e:
+        raise FormulaError(str(e))
+    return expression
@@ -0,0 +1,306 @@
+"""
+AG Grid server-side row model for datasets.
+
+Translates an SSRM request into one windowed query plus a count:
+
+    {
+        'startRow': 0, 'endRow': 100,
+        'sortModel': [{'colId': 'project__name', 'sort': 'asc'}],
+        'filterModel': {'title': {'filterType': 'text', 'type': 'contains', 'filter': 'bug'}},
+        'rowGroupCols': [{'id': 'status__name'}],
+        'valueCols': [{'id': 'estimated_hours', 'aggFunc': 'sum'}],
+        'groupKeys': []
+    }
+
+ORM datasets become filter()/order_by()/values().annotate() on the compiled
+plan; SQL datasets are wrapped as a subquery with quoted column names and
+bound parameters (see sql_engine). Column ids must be dataset columns, and a
+report's saved filters apply to both kinds. Windows are ordered with a unique
+tiebreaker (pk, the group value, or every column of a SQL dataset) so OFFSET
+pages neither repeat nor skip rows.
+
+Returns {'rows': [...], 'lastRow': total}; group rows carry the group value,
+the aggregated value columns and childCount.
+"""
+from django.db import connection
+from django.db.models import Avg, Count, DateField, DateTimeField, Max, Min, Q, Sum
+
+from ..models import Dataset
+from . import sql_engine
+from .executor import get_plan
+
+MAX_WINDOW = 1000
+
+ORM_AGGREGATES = {'sum': Sum, 'avg': Avg, 'min': Min, 'max': Max, 'count': Count}
+SQL_AGGREGATES = {'sum': 'SUM', 'avg': 'AVG', 'min': 'MIN', 'max': 'MAX', 'count': 'COUNT'}
+
+# AG Grid filter type -> (ORM lookup, negated)
+ORM_LOOKUPS = {
+    'equals': ('exact', False),
+    'notEqual': ('exact', True),
+    'contains': ('icontains', False),
+    'notContains': ('icontains', True),
+    'startsWith': ('istartswith', False),
+    'endsWith': ('iendswith', False),
+    'lessThan': ('lt', False),
+    'lessThanOrEqual': ('lte', False),
+    'greaterThan': ('gt', False),
+    'greaterThanOrEqual': ('gte', False),
+}
+
+
+class GridRequestError(ValueError):
+    pass
+
+
+def _window(params):
+    start = max(int(params.get('startRow') or 0), 0)
+    end = int(params.get('endRow') or start + 100)
+    if end <= start:
+        raise GridRequestError("endRow must be greater than startRow")
+    return start, min(end, start + MAX_WINDOW)
+
+
+def _conditions(model):
+    """Flatten a column filter into (operator, [conditions])."""
+    if 'conditions' in model:
+        return model.get('operator', 'AND'), model['conditions']
+    if 'condition1' in model:
+        return model.get('operator', 'AND'), [model['condition1'], model['condition2']]
+    return 'AND', [model]
+
+
+def _check_columns(col_ids, allowed):
+    unknown = [c for c in col_ids if c not in allowed]
+    if unknown:
+        raise GridRequestError(f"Unknown column(s): {', '.join(unknown)}")
+
+
+class ServerSideRowModel:
+
+    @staticmethod
+    def execute(dataset: Dataset, params: dict, filters: dict = None):
+        if dataset.query_type == 'sql':
+            return ServerSideRowModel._execute_sql(dataset, params, filters)
+        return ServerSideRowModel._execute_orm(dataset, params, filters)
+
+    # ==================== ORM ====================
+
+    @staticmethod
+    def _orm_condition(plan, column, condition):
+        col = plan.lookup(column)
+        filter_type = condition.get('filterType')
+        op = condition.get('type', 'equals')
+
+        if filter_type == 'set':
+            return Q(**{f"{col}__in": condition.get('values') or []})
+        if op == 'blank':
+            return Q(**{f"{col}__isnull": True}) | Q(**{col: ''}) if filter_type == 'text' else Q(**{f"{col}__isnull": True})
+        if op == 'notBlank':
+            return ~(Q(**{f"{col}__isnull": True}) | Q(**{col: ''})) if filter_type == 'text' else Q(**{f"{col}__isnull": False})
+
+        if filter_type == 'date':
+            value, value_to = condition.get('dateFrom'), condition.get('dateTo')
+            field = plan.field_for(column)
+            if isinstance(field, DateField):
+                # AG Grid sends 'YYYY-MM-DD hh:mm:ss' at midnight; compare whole days
+                value = value[:10] if value else value
+                value_to = value_to[:10] if value_to else value_to
+                if isinstance(field, DateTimeField):
+                    col = f"{col}__date"
+        else:
+            value, value_to = condition.get('filter'), condition.get('filterTo')
+
+        if op == 'inRange':
+            return Q(**{f"{col}__range": (value, value_to)})
+        if op not in ORM_LOOKUPS:
+            raise GridRequestError(f"Unsupported filter type '{op}'")
+        lookup, negated = ORM_LOOKUPS[op]
+        q = Q(**{f"{col}__{lookup}": value})
+        return ~q if negated else q
+
+    @staticmethod
+    def _orm_filter(plan, filter_model):
+        q = Q()
+        for col, model in (filter_model or {}).items():
+            operator, conditions = _conditions(model)
+            col_q = None
+            for condition in conditions:
+                cq = ServerSideRowModel._orm_condition(plan, col, condition)
+                col_q = cq if col_q is None else (col_q | cq if operator == 'OR' else col_q & cq)
+            if col_q is not None:
+                q &= col_q
+        return q
+
+    @staticmethod
+    def _execute_orm(dataset, params, filters):
+        plan = get_plan(dataset)
+        start, end = _window(params)
+
+        group_cols = [c.get('field') or c['id'] for c in params.get('rowGroupCols') or []]
+        value_cols = params.get('valueCols') or []
+        group_keys = params.get('groupKeys') or []
+        sort_model = params.get('sortModel') or []
+        filter_model = params.get('filterModel') or {}
+
+        _check_columns(
+            group_cols + [c.get('field') or c['id'] for c in value_cols] +
+            [s['colId'] for s in sort_model] + list(filter_model),
+            set(plan.columns)
+        )
+
+        where = ServerSideRowModel._orm_filter(plan, filter_model)
+        for col, key in zip(group_cols, group_keys):
+            where &= Q(**{plan.lookup(col): key})
+
+        if len(group_cols) > len(group_keys):
+            # Group level: one row per value of the next group column
+            group_col = group_cols[len(group_keys)]
+            aggregates = {}
+            aliases = {group_col: plan.lookup(group_col)}
+            for i, value_col in enumerate(value_cols):
+                func = ORM_AGGREGATES.get((value_col.get('aggFunc') or 'sum').lower())
+                if func is None:
+                    raise GridRequestError(f"Unsupported aggFunc '{value_col.get('aggFunc')}'")
+                alias = f"agg_{i}"
+                aggregates[alias] = func(plan.lookup(value_col.get('field') or value_col['id']))
+                aliases[value_col['id']] = alias
+
+            used = group_cols + [c.get('field') or c['id'] for c in value_cols] + list(filter_model)
+            qs = plan.annotated(filters, columns=used).filter(where)
+            qs = qs.values(aliases[group_col]).annotate(child_count=Count('pk'), **aggregates)
+            order = [
+                ('-' if s.get('sort') == 'desc' else '') + aliases[s['colId']]
+                for s in sort_model if s['colId'] in aliases
+            ]
+            # The group value is unique per row: a stable order for OFFSET paging
+            qs = qs.order_by(*order, aliases[group_col])
+
+            rename = {alias: col_id for col_id, alias in aliases.items()}
+            rename['child_count'] = 'childCount'
+            rows = [{rename.get(k, k): v for k, v in row.items()} for row in qs[start:end]]
+            return {'rows': rows, 'lastRow': qs.count()}
+
+        # Leaf level: the dataset's own columns
+        qs = plan.queryset(filters).filter(where)
+        order = [('-' if s.get('sort') == 'desc' else '') + plan.lookup(s['colId']) for s in sort_model]
+        # pk as the tiebreaker, so OFFSET windows neither repeat nor skip rows
+        qs = qs.order_by(*order, 'pk')
+        rows = [plan.rename(row) for row in qs[start:end]]
+        return {'rows': rows, 'lastRow': qs.count()}
+
+    # ==================== SQL ====================
+
+    @staticmethod
+    def _sql_condition(col, condition):
+        qcol = connection.ops.quote_name(col)
+        filter_type = condition.get('filterType')
+        op = condition.get('type', 'equals')
+
+        if filter_type == 'set':
+            values = condition.get('values') or []
+            if not values:
+                return '1 = 0', []
+            return f"{qcol} IN ({', '.join(['%s'] * len(values))})", list(values)
+        if op == 'blank':
+            return f"({qcol} IS NULL OR {qcol} = '')", []
+        if op == 'notBlank':
+            return f"({qcol} IS NOT NULL AND {qcol} <> '')", []
+
+        if filter_type == 'date':
+            value, value_to = condition.get('dateFrom'), condition.get('dateTo')
+        else:
+            value, value_to = condition.get('filter'), condition.get('filterTo')
+
+        text_ops = {
+            'contains': (f"LOWER({qcol}) LIKE LOWER(%s)", f"%{value}%"),
+            'notContains': (f"LOWER({qcol}) NOT LIKE LOWER(%s)", f"%{value}%"),
+            'startsWith': (f"LOWER({qcol}) LIKE LOWER(%s)", f"{value}%"),
+            'endsWith': (f"LOWER({qcol}) LIKE LOWER(%s)", f"%{value}"),
+        }
+        compare_ops = {
+            'equals': '=', 'notEqual': '<>', 'lessThan': '<', 'lessThanOrEqual': '<=',
+            'greaterThan': '>', 'greaterThanOrEqual': '>=',
+        }
+        if op in text_ops:
+            sql, param = text_ops[op]
+            return sql, [param]
+        if op in compare_ops:
+            return f"{qcol} {compare_ops[op]} %s", [value]
+        if op == 'inRange':
+            return f"{qcol} BETWEEN %s AND %s", [value, value_to]
+        raise GridRequestError(f"Unsupported filter type '{op}'")
+
+    @staticmethod
+    def _execute_sql(dataset, params, filters=None):
+        if not dataset.sql_query:
+            return {'rows': [], 'lastRow': 0}
+
+        source = sql_engine.subquery(dataset.sql_query)
+        start, end = _window(params)
+        group_cols = [c.get('field') or c['id'] for c in params.get('rowGroupCols') or []]
+        value_cols = params.get('valueCols') or []
+        group_keys = params.get('groupKeys') or []
+        sort_model = params.get('sortModel') or []
+        filter_model = params.get('filterModel') or {}
+
+        columns = sql_engine.get_columns(dataset.sql_query)
+        _check_columns(
+            group_cols + [c.get('field') or c['id'] for c in value_cols] +
+            [s['colId'] for s in sort_model] + list(filter_model),
+            set(columns)
+        )
+        quote = connection.ops.quote_name
+
+        # Report filters (ORM-style keys on the dataset's columns), then the grid's own
+        where, where_params = [], []
+        filters_sql, where_params = sql_engine.where_clause(filters, columns)
+        if filters_sql:
+            where.append(f"({filters_sql[len(' WHERE '):]})")
+        for col, model in filter_model.items():
+            operator, conditions = _conditions(model)
+            parts = []
+            for condition in conditions:
+                sql, cparams = ServerSideRowModel._sql_condition(col, condition)
+                parts.append(sql)
+                where_params += cparams
+            where.append('(' + f' {"OR" if operator == "OR" else "AND"} '.join(parts) + ')')
+        for col, key in zip(group_cols, group_keys):
+            where.append(f"{quote(col)} = %s")
+            where_params.append(key)
+        where_sql = f" WHERE {' AND '.join(where)}" if where else ''
+
+        if len(group_cols) > len(group_keys):
+            group_col = quote(group_cols[len(group_keys)])
+            selects = [group_col, "COUNT(*) AS childCount"]
+            sortable = {group_cols[len(group_keys)]}
+            for value_col in value_cols:
+                func = SQL_AGGREGATES.get((value_col.get('aggFunc') or 'sum').lower())
+                if func is None:
+                    raise GridRequestError(f"Unsupported aggFunc '{value_col.get('aggFunc')}'")
+                field = quote(value_col.get('field') or value_col['id'])
+                selects.append(f"{func}({field}) AS {quote(value_col['id'])}")
+                sortable.add(value_col['id'])
+            body = f"SELECT {', '.join(selects)} FROM {source}{where_sql} GROUP BY {group_col}"
+            order = [f"{quote(s['colId'])} {'DESC' if s.get('sort') == 'desc' else 'ASC'}"
+                     for s in sort_model if s['colId'] in sortable] + [group_col]
+        else:
+            body = f"SELECT * FROM {source}{where_sql}"
+            order = [f"{quote(s['colId'])} {'DESC' if s.get('sort') == 'desc' else 'ASC'}" for s in sort_model]
+            # SQL datasets have no known key: every column breaks ties for OFFSET paging
+            sorted_cols = {s['colId'] for s in sort_model}
+            order += [quote(col) for col in columns if col not in sorted_cols]
+
+        page_sql = sql_engine.hinted(
+            body + (f" ORDER BY {', '.join(order)}" if order else '') + " LIMIT %s OFFSET %s"
+        )
+        count_sql = sql_engine.hinted(f"SELECT COUNT(*) FROM ({body}) page")
+        with connection.cursor() as cursor:
+            sql_engine.check_budget(cursor, page_sql, where_params + [end - start, start])
+            sql_engine.check_budget(cursor, count_sql, where_params)
+            cursor.execute(page_sql, where_params + [end - start, start])
+            columns = [col[0] for col in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            cursor.execute(count_sql, where_params)
+            total = cursor.fetchone()[0]
+        return {'rows': rows, 'lastRow': total}
@@ -0,0 +1,223 @@
+"""
+Report jobs: dataset runs executed off the request path.
+
+    job, created = submit(dataset, filters, limit)     # returns at once
+    page = read_rows(job, start, end)                  # once job.status == 'done'
+
+submit() coalesces: while a job for the same (dataset version, filters,
+limit) is queued or running, submitting again returns that job (enforced by
+the unique active_key column), and a result finished within RESULT_REUSE is
+returned instead of running the query again.
+
+The run_report_worker command claims queued jobs (claim_jobs) into a
+thread pool, with at most REPORT_JOB_DATASET_CONCURRENCY running per
+dataset across all workers, and runs them (run_job). Rows are streamed from
+the dataset (services/export.py) into a gzip JSON-lines file under
+REPORT_JOB_DIR: one JSON array per row, written as a separate gzip member
+every CHUNK_ROWS rows. chunk_offsets records where each member starts, so
+a page is read by seeking to its chunk instead of decompressing from the
+top.
+"""
+import gzip
+import hashlib
+import json
+import os
+import traceback
+from datetime import timedelta
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from ..models import Dataset, ReportJob
+
+CHUNK_ROWS = 1000
+MAX_WINDOW = 1000  # rows per read_rows() call, as in grid.py
+RESULT_REUSE = timedelta(minutes=5)
+RESULT_TTL = timedelta(hours=24)  # result files are deleted after this
+STALE_AFTER = timedelta(hours=2)  # running this long = its worker died
+
+
+def _job_dir():
+    path = Path(getattr(settings, 'REPORT_JOB_DIR', settings.BASE_DIR / 'var' / 'report_jobs'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def parse_limit(value):
+    """Row limit from request data: None for no limit, else a positive int."""
+    if value is None or value == '':
+        return None
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid limit '{value}'")
+    if limit <= 0:
+        raise ValueError("limit must be a positive number")
+    return limit
+
+
+def query_hash(dataset, filters, limit):
+    raw = json.dumps(
+        [str(dataset.dataset_id), dataset.updated_at.isoformat(), filters or {}, limit],
+        sort_keys=True, default=str
+    )
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+# ==================== SUBMIT ====================
+
+def submit(dataset: Dataset, filters: dict = None, limit: int = None, report=None):
+    """(job, created): a new queued job, or the one already covering this query."""
+    filters = filters or {}
+    limit = parse_limit(limit)
+    key = query_hash(dataset, filters, limit)
+
+    recent = ReportJob.objects.filter(
+        query_hash=key, status='done', finished_at__gte=timezone.now() - RESULT_REUSE
+    ).order_by('-finished_at').first()
+    if recent:
+        return recent, False
+
+    try:
+        with transaction.atomic():
+            job = ReportJob.objects.create(
+                dataset=dataset, report=report, filters=filters, row_limit=limit,
+                query_hash=key, active_key=key,
+            )
+        return job, True
+    except IntegrityError:
+        # Same query already queued or running
+        existing = ReportJob.objects.filter(active_key=key).first()
+        if existing:
+            return existing, False
+        # It finished between the insert and the lookup
+        return submit(dataset, filters, limit, report)
+
+
+# ==================== WORKER ====================
+
+def claim_jobs(slots):
+    """
+    Mark up to `slots` queued jobs as running and return them, oldest first,
+    skipping datasets already at REPORT_JOB_DATASET_CONCURRENCY.
+    """
+    if slots <= 0:
+        return []
+    per_dataset = getattr(settings, 'REPORT_JOB_DATASET_CONCURRENCY', 2)
+
+    with transaction.atomic():
+        queued = list(
+            ReportJob.objects.select_for_update(skip_locked=True)
+            .filter(status='queued').order_by('created_at')[:slots * 5]
+        )
+        if not queued:
+            return []
+
+        dataset_ids = {job.dataset_id for job in queued}
+        # Lock the datasets so two workers can't both fill the last slot
+        list(Dataset.objects.select_for_update().filter(dataset_id__in=dataset_ids).values_list('pk', flat=True))
+        running = dict(
+            ReportJob.objects.filter(status='running', dataset_id__in=dataset_ids)
+            .values('dataset_id').annotate(n=Count('pk')).values_list('dataset_id', 'n')
+        )
+
+        claimed = []
+        for job in queued:
+            if len(claimed) >= slots:
+                break
+            if running.get(job.dataset_id, 0) >= per_dataset:
+                continue
+            running[job.dataset_id] = running.get(job.dataset_id, 0) + 1
+            claimed.append(job)
+
+        now = timezone.now()
+        ReportJob.objects.filter(pk__in=[job.pk for job in claimed]).update(status='running', started_at=now)
+        for job in claimed:
+            job.status, job.started_at = 'running', now
+    return claimed
+
+
+def _write_results(path, rows):
+    """Write rows as gzip JSON lines, one member per CHUNK_ROWS; returns (row_count, offsets)."""
+    row_count = 0
+    offsets = []
+    with open(path, 'wb') as raw:
+        while True:
+            chunk = list(islice(rows, CHUNK_ROWS))
+            if not chunk:
+                break
+            offsets.append(raw.tell())
+            lines = ''.join(json.dumps(list(row), default=str, separators=(',', ':')) + '\n' for row in chunk)
+            raw.write(gzip.compress(lines.encode(), compresslevel=6))
+            row_count += len(chunk)
+    return row_count, offsets
+
+
+def run_job(job: ReportJob):
+    """Execute a claimed job and store its result file."""
+    from .export import dataset_rows
+
+    path = _job_dir() / f"{job.job_id}.jsonl.gz"
+    try:
+        headers, rows = dataset_rows(job.dataset, job.filters, labels=False)
+        if job.row_limit is not None:
+            rows = islice(rows, job.row_limit)
+        row_count, offsets = _write_results(path, iter(rows))
+    except Exception as e:
+        traceback.print_exc()
+        if path.exists():
+            path.unlink()
+        ReportJob.objects.filter(pk=job.pk).update(
+            status='failed', error=str(e)[:4000], active_key=None, finished_at=timezone.now()
+        )
+        return False
+
+    ReportJob.objects.filter(pk=job.pk).update(
+        status='done', columns=list(headers), row_count=row_count, result_path=str(path),
+        chunk_offsets=offsets, active_key=None, finished_at=timezone.now()
+    )
+    return True
+
+
+def purge():
+    """Fail jobs whose worker died and delete expired result files. Returns (stale, expired)."""
+    now = timezone.now()
+    stale = ReportJob.objects.filter(status='running', started_at__lt=now - STALE_AFTER).update(
+        status='failed', error='Worker stopped before the job finished', active_key=None, finished_at=now
+    )
+
+    expired = 0
+    for job in ReportJob.objects.filter(status='done', finished_at__lt=now - RESULT_TTL).exclude(result_path=''):
+        if os.path.exists(job.result_path):
+            os.remove(job.result_path)
+        job.result_path = ''
+        job.chunk_offsets = []
+        job.save(update_fields=['result_path', 'chunk_offsets'])
+        expired += 1
+    return stale, expired
+
+
+# ==================== RESULTS ====================
+
+def read_rows(job: ReportJob, start=0, end=100):
+    """Rows [start, end) of a finished job as dicts, at most MAX_WINDOW of them."""
+    if job.status != 'done' or not job.result_path or not os.path.exists(job.result_path):
+        raise ValueError("Job results are not available")
+
+    start = max(start, 0)
+    end = min(end, start + MAX_WINDOW, job.row_count)
+    if end <= start:
+        return []
+
+    chunk = start // CHUNK_ROWS
+    skip = start - chunk * CHUNK_ROWS
+    with open(job.result_path, 'rb') as raw:
+        raw.seek(job.chunk_offsets[chunk])
+        # GzipFile reads on through the following members as needed
+        with gzip.GzipFile(fileobj=raw) as lines:
+            selected = islice(lines, skip, skip + end - start)
+            return [dict(zip(job.columns, json.loads(line))) for line in selected]
@@ -0,0 +1,202 @@
+"""
+Filter options for the report builder: distinct values of a field, or
+instances of a model, with prefix search (q=) and keyset paging (after=).
+
+Distinct values are served two ways:
+- Indexed columns are queried directly; `LIKE 'q%'` and `> after` with
+  ORDER BY/LIMIT become index range scans.
+- Other columns have their sorted distinct list (up to MAX_CACHED_VALUES)
+  cached per (model, field) through the result cache, so the table is
+  scanned once and search/paging run in memory. Writes to any table the
+  list reads invalidate it (see result_cache.py).
+
+Both return (options, next_cursor); next_cursor is the `after` value for the
+following page, or None on the last page.
+"""
+import json
+
+from django.apps import apps
+from django.db.models import Q
+
+from .result_cache import get_or_compute, query_tables
+from .schema import SchemaService
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_CACHED_VALUES = 5000
+
+# Never offered as options, whatever the model
+SENSITIVE_FIELDS = {'password'}
+
+# Preferred label fields when searching model instances
+LABEL_FIELDS = ('name', 'title', 'username', 'email', 'code')
+
+
+class OptionsError(ValueError):
+    pass
+
+
+def resolve_model(model_key):
+    try:
+        app_label, model_name = model_key.split('.')
+        model = apps.get_model(app_label, model_name)
+    except (ValueError, LookupError):
+        raise OptionsError(f"Invalid model '{model_key}'")
+    if model._meta.app_label not in SchemaService.ALLOWED_APPS:
+        raise OptionsError(f"Model '{model_key}' is not available for reporting")
+    return model
+
+
+def resolve_field(model, path):
+    """Final model field of a (possibly related) path; to-one relations only."""
+    current = model
+    field = None
+    for i, part in enumerate(path.split('__')):
+        try:
+            field = current._meta.get_field(part)
+        except Exception:
+            raise OptionsError(f"Unknown field '{path}'")
+        if field.one_to_many or field.many_to_many or part in SENSITIVE_FIELDS:
+            raise OptionsError(f"Field '{path}' can't be used for options")
+        if i < len(path.split('__')) - 1:
+            if not field.is_relation:
+                raise OptionsError(f"Unknown field '{path}'")
+            current = field.related_model
+    return field
+
+
+def is_indexed(field):
+    if field.primary_key or field.unique or field.db_index or field.is_relation:
+        return True
+    meta = field.model._meta
+    leading = [index.fields[0] for index in meta.indexes if index.fields]
+    leading += [fields[0] for fields in meta.unique_together if fields]
+    return field.name in leading
+
+
+def _limit(limit):
+    try:
+        return max(1, min(int(limit or PAGE_SIZE), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return PAGE_SIZE
+
+
+def _page(values, limit):
+    """Options for one page of values, plus the cursor for the next page."""
+    has_more = len(values) > limit
+    values = values[:limit]
+    options = [{'value': str(v), 'label': str(v)} for v in values]
+    return options, (str(values[-1]) if has_more and values else None)
+
+
+# ==================== DISTINCT VALUES ====================
+
+def _values_query(model, path, q=None, after=None):
+    qs = model.objects.filter(**{f"{path}__isnull": False})
+    if q:
+        # istartswith is a plain LIKE 'q%' on MySQL's case-insensitive collations
+        qs = qs.filter(**{f"{path}__istartswith": q})
+    if after is not None:
+        qs = qs.filter(**{f"{path}__gt": after})
+    return qs.order_by(path).values_list(path, flat=True).distinct()
+
+
+def _cached_values(model, path):
+    """Sorted distinct values, or None if there are more than MAX_CACHED_VALUES."""
+    qs = _values_query(model, path)
+
+    def compute():
+        values = list(qs[:MAX_CACHED_VALUES + 1])
+        return None if len(values) > MAX_CACHED_VALUES else values
+
+    return get_or_compute(
+        f"options:{model._meta.label}:{path}", {}, None, compute,
+        tables=query_tables(qs),
+        stats_id=f"options:{model._meta.label}",
+    )
+
+
+def field_options(model_key, path, q=None, after=None, limit=None):
+    """Distinct values of `path` on `model_key` starting with `q`, after the `after` cursor."""
+    model = resolve_model(model_key)
+    field = resolve_field(model, path)
+    limit = _limit(limit)
+
+    if not is_indexed(field):
+        values = _cached_values(model, path)
+        if values is not None:
+            if q:
+                prefix = q.lower()
+                values = [v for v in values if str(v).lower().startswith(prefix)]
+            if after is not None:
+                position = next((i for i, v in enumerate(values) if str(v) == after), None)
+                values = values[position + 1:] if position is not None else []
+            return _page(values, limit)
+
+    values = list(_values_query(model, path, q, after)[:limit + 1])
+    return _page(values, limit)
+
+
+# ==================== MODEL INSTANCES ====================
+
+def _label_field(model):
+    names = {f.name: f for f in model._meta.concrete_fields}
+    for name in LABEL_FIELDS:
+        if name in names and names[name].get_internal_type() in ('CharField', 'EmailField', 'SlugField'):
+            return name
+    return next((f.name for f in model._meta.concrete_fields if f.get_internal_type() == 'CharField'), None)
+
+
+def _instance_cursor(after, label_field):
+    """Q selecting instances after an `after` cursor: JSON [label, pk] (or [pk] with no label field)."""
+    try:
+        key = json.loads(after)
+        if label_field:
+            label, pk = key
+        else:
+            (pk,) = key
+    except (TypeError, ValueError):
+        raise OptionsError("Invalid cursor")
+    if not label_field:
+        return Q(pk__gt=pk)
+    if label is None:
+        # NULL labels sort first
+        return Q(**{f"{label_field}__isnull": True, 'pk__gt': pk}) | Q(**{f"{label_field}__isnull": False})
+    return Q(**{f"{label_field}__gt": label}) | Q(**{label_field: label, 'pk__gt': pk})
+
+
+def instance_options(model_key, q=None, after=None, limit=None):
+    """(pk, str(obj)) options for a model, ordered and searched on its label field, keyset-paged by (label, pk)."""
+    model = resolve_model(model_key)
+    limit = _limit(limit)
+    label_field = _label_field(model)
+
+    qs = model.objects.order_by(*([label_field, 'pk'] if label_field else ['pk']))
+    if q:
+        if not label_field:
+            raise OptionsError(f"'{model_key}' has no text field to search")
+        qs = qs.filter(**{f"{label_field}__istartswith": q})
+    if after is not None:
+        qs = qs.filter(_instance_cursor(after, label_field))
+
+    def compute():
+        objects = list(qs[:limit + 1])
+        has_more = len(objects) > limit
+        objects = objects[:limit]
+        next_cursor = None
+        if has_more and objects:
+            last = objects[-1]
+            key = [getattr(last, label_field), str(last.pk)] if label_field else [str(last.pk)]
+            next_cursor = json.dumps(key, default=str)
+        return {'rows': [{'value': obj.pk, 'label': str(obj)} for obj in objects], 'next': next_cursor}
+
+    if q or after is not None:
+        page = compute()
+    else:
+        # The unfiltered first page is what every dropdown opens with
+        page = get_or_compute(
+            f"options:{model._meta.label}:instances", {}, limit, compute,
+            tables=query_tables(qs),
+            stats_id=f"options:{model._meta.label}",
+        )
+    return page['rows'], page['next']
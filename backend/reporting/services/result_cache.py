@@ -0,0 +1,195 @@
+"""
+Result cache for dataset and report previews.
+
+Entries are keyed by (scope, normalized filters, limit), where scope is a
+dataset version ("dataset:<id>:<updated_at>") or a hash of an ad-hoc report
+config. Each entry remembers the tables its query reads and their version
+tokens; a committed post_save/post_delete on a model whose table reporting
+reads gives that table a new version, so a write to a dependency turns the
+entry into a miss. Raw SQL datasets have no known dependencies and expire on
+SQL_TTL_SECONDS instead.
+
+Version bumps run in transaction.on_commit, outside the writer's
+transaction: nothing is locked while it runs, and a reader can't cache
+uncommitted data under the new version. A bump stores a fresh random token
+rather than incrementing, so it needs no atomic incr. Only tracked tables
+are bumped: the tables of the reporting apps (SchemaService.ALLOWED_APPS)
+and their relations, plus every table an ORM dataset reads. Entries reading
+an untracked table fall back to SQL_TTL_SECONDS.
+
+Table versions and hit/miss stats live in the shared 'reporting' cache
+(settings.CACHES), so a write in any process - another web worker or one of
+the background workers - invalidates entries everywhere; entries themselves
+stay in the process-local default cache. checks.py rejects a process-local
+'reporting' cache unless REPORTING_SINGLE_PROCESS is set.
+
+Bulk writes (queryset.update(), bulk_create) send no signals; ORM entries
+also expire on ORM_TTL_SECONDS to bound that staleness.
+"""
+import hashlib
+import json
+import threading
+import time
+import uuid
+
+from django.core.cache import cache, caches
+from django.db import DatabaseError, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+ORM_TTL_SECONDS = 600
+SQL_TTL_SECONDS = 60
+TRACKED_TTL_SECONDS = 300
+
+RESULT_PREFIX = 'reporting:result:'
+TABLE_PREFIX = 'reporting:table:'
+STATS_PREFIX = 'reporting:stats:'
+
+SHARED_CACHE_ALIAS = 'reporting'
+
+
+def shared_cache():
+    return caches[SHARED_CACHE_ALIAS]
+
+
+def _key(scope, filters, limit):
+    raw = json.dumps([scope, filters or {}, limit], sort_keys=True, default=str)
+    return RESULT_PREFIX + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def query_tables(qs):
+    """Tables a queryset reads (base table plus every join)."""
+    return sorted({alias.table_name for alias in qs.query.alias_map.values()})
+
+
+def _table_versions(tables):
+    found = shared_cache().get_many([TABLE_PREFIX + t for t in tables])
+    return {t: found.get(TABLE_PREFIX + t, 0) for t in tables}
+
+
+def bump_table(table):
+    """Give `table` a new version; call it after the write has committed."""
+    shared_cache().set(TABLE_PREFIX + table, uuid.uuid4().hex, None)
+
+
+# ==================== TRACKED TABLES ====================
+
+_tracked_lock = threading.Lock()
+_tracked = None
+_tracked_built_at = 0
+
+
+def _build_tracked():
+    from django.apps import apps
+    from ..models import Dataset
+    from .executor import get_plan
+    from .schema import SchemaService
+
+    tables = set()
+    # Reporting-app models and whatever the query builder can join from them
+    frontier = [m for m in apps.get_models() if m._meta.app_label in SchemaService.ALLOWED_APPS]
+    seen = set(frontier)
+    for _ in range(SchemaService.MAX_DEPTH + 1):
+        following = []
+        for model in frontier:
+            tables.add(model._meta.db_table)
+            for field in model._meta.get_fields():
+                related = field.related_model if field.is_relation else None
+                if related and not isinstance(related, str) and related not in seen:
+                    seen.add(related)
+                    following.append(related)
+        frontier = following
+
+    datasets = Dataset.objects.filter(is_active=True, primary_model__gt='').exclude(query_type='sql')
+    for dataset in datasets:
+        try:
+            tables.update(query_tables(get_plan(dataset).queryset()))
+        except Exception:
+            continue
+    return tables
+
+
+def tracked_tables():
+    """Tables whose writes invalidate cached results (rebuilt every TRACKED_TTL_SECONDS)."""
+    global _tracked, _tracked_built_at
+    with _tracked_lock:
+        if _tracked is None or time.monotonic() - _tracked_built_at > TRACKED_TTL_SECONDS:
+            try:
+                _tracked = _build_tracked()
+            except DatabaseError:
+                # Saves during migrate, before the datasets table exists
+                return set()
+            _tracked_built_at = time.monotonic()
+        return _tracked
+
+
+def invalidate_tracked():
+    global _tracked
+    with _tracked_lock:
+        _tracked = None
+
+
+def _count(stats_id, outcome):
+    key = f"{STATS_PREFIX}{stats_id}:{outcome}"
+    shared = shared_cache()
+    try:
+        shared.incr(key)
+    except ValueError:
+        shared.set(key, 1, None)
+
+
+def get_stats(stats_ids):
+    """{stats_id: {'hits', 'misses', 'hit_rate'}}"""
+    keys = [f"{STATS_PREFIX}{s}:{o}" for s in stats_ids for o in ('hit', 'miss')]
+    found = shared_cache().get_many(keys)
+    stats = {}
+    for stats_id in stats_ids:
+        hits = found.get(f"{STATS_PREFIX}{stats_id}:hit", 0)
+        misses = found.get(f"{STATS_PREFIX}{stats_id}:miss", 0)
+        stats[stats_id] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+        }
+    return stats
+
+
+def get_or_compute(scope, filters, limit, compute, tables=None, stats_id=None):
+    """
+    Cached result of compute() for (scope, filters, limit).
+    `tables` lists the dependencies (None = unknown, use the SQL TTL).
+    """
+    key = _key(scope, filters, limit)
+    stats_id = stats_id or scope
+
+    entry = cache.get(key)
+    if entry is not None:
+        if not entry['tables'] or _table_versions(entry['tables']) == entry['versions']:
+            _count(stats_id, 'hit')
+            return entry['rows']
+
+    _count(stats_id, 'miss')
+    # Read versions before running the query so a concurrent write invalidates it
+    versions = _table_versions(tables) if tables else {}
+    rows = compute()
+    # Writes to untracked tables don't bump versions: only trust the TTL
+    tracked = bool(tables) and set(tables) <= tracked_tables()
+    cache.set(
+        key,
+        {'rows': rows, 'tables': tables or [], 'versions': versions},
+        ORM_TTL_SECONDS if tracked else SQL_TTL_SECONDS
+    )
+    return rows
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def _model_changed(sender, **kwargs):
+    from ..models import Dataset
+
+    if sender is Dataset:
+        invalidate_tracked()
+        return
+    table = sender._meta.db_table
+    if table in tracked_tables():
+        transaction.on_commit(lambda: bump_table(table))
@@ -1,10 +1,86 @@
 """
 Enhanced Schema Service with FK Chain Discovery
 Provides deep introspection of models and their relationships
+
+Models don't change at runtime, so each schema is walked once per process
+and kept in an immutable index (read-only mappings and tuples). The schema
+endpoint serves pre-rendered JSON with an ETag from the same index.
 """
+import hashlib
+import json
+import threading
+from types import MappingProxyType
+
 from django.apps import apps
 from django.db.models import ForeignKey, OneToOneField, ManyToManyField, ManyToOneRel, ManyToManyRel
 
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class SchemaEntry:
+    """A frozen schema document plus its rendered JSON and ETag."""
+    
+    def __init__(self, data):
+        self.data = _freeze(data)
+        self.json = json.dumps(data, default=str, separators=(',', ':')).encode()
+        self.etag = '"%s"' % hashlib.sha1(self.json).hexdigest()
+
+
+class SchemaIndex:
+    """
+    Schema documents keyed by ('models',), ('schema', label, include_relations)
+    or ('tree', label). ALLOWED_APPS are built up front on first use; other
+    models are added the first time they are asked for. Entries are never
+    replaced.
+    """
+    
+    _lock = threading.Lock()
+    _entries = None
+    
+    @classmethod
+    def entries(cls):
+        with cls._lock:
+            if cls._entries is None:
+                entries = {('models',): SchemaEntry(SchemaService._build_models())}
+                for app_config in apps.get_app_configs():
+                    if app_config.label in SchemaService.ALLOWED_APPS:
+                        for model in app_config.get_models():
+                            for key, builder in SchemaIndex._builders(model).items():
+                                entries[key] = SchemaEntry(builder())
+                cls._entries = entries
+            return cls._entries
+    
+    @staticmethod
+    def _builders(model):
+        label = model._meta.label
+        return {
+            ('schema', label, True): lambda: SchemaService._build_model_schema(model, True),
+            ('schema', label, False): lambda: SchemaService._build_model_schema(model, False),
+            ('tree', label): lambda: SchemaService._build_relation_tree(model, depth=0, max_depth=2, visited=set()),
+        }
+    
+    @classmethod
+    def get(cls, key, model=None):
+        entries = cls.entries()
+        entry = entries.get(key)
+        if entry is None and model is not None:
+            entry = SchemaEntry(cls._builders(model)[key]())
+            with cls._lock:
+                entry = cls._entries.setdefault(key, entry)
+        return entry
+    
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries = None
+
+
 class SchemaService:
     ALLOWED_APPS = ['pm', 'hr', 'auth', 'contenttypes', 'forms'] # Added auth/contenttypes/forms for completeness
     MAX_DEPTH = 3  # Maximum relation depth to traverse
@@ -15,9 +91,35 @@ class SchemaService:
             return [{'value': k, 'label': str(v)} for k, v in field.choices]
         return None
 
+    @staticmethod
+    def _resolve(app_label, model_name):
+        try:
+            return apps.get_model(app_label, model_name)
+        except LookupError:
+            return None
+    
+    @staticmethod
+    def get_entry(model_key=None, tree=False):
+        """
+        Cached SchemaEntry for the schema endpoint: the model list, a model
+        schema, or a relation tree. None if the model doesn't exist.
+        """
+        if not model_key:
+            return SchemaIndex.get(('models',))
+        app_label, model_name = model_key.split('.')
+        model = SchemaService._resolve(app_label, model_name)
+        if model is None:
+            return None
+        key = ('tree', model._meta.label) if tree else ('schema', model._meta.label, True)
+        return SchemaIndex.get(key, model)
+    
     @staticmethod
     def get_models():
-        """List all exposed models"""
+        """List all exposed models (read-only)"""
+        return SchemaIndex.get(('models',)).data
+    
+    @staticmethod
+    def _build_models():
         models_data = []
         for app_config in apps.get_app_configs():
             if app_config.label in SchemaService.ALLOWED_APPS:
@@ -32,14 +134,17 @@ class SchemaService:
 
     @staticmethod
     def get_model_schema(app_label, model_name, include_relations=True):
-        """Get fields and relations for a specific model"""
-        try:
-            model = apps.get_model(app_label, model_name)
-        except LookupError:
+        """Get fields and relations for a specific model (read-only)"""
+        model = SchemaService._resolve(app_label, model_name)
+        if model is None:
             return None
-
+        return SchemaIndex.get(('schema', model._meta.label, bool(include_relations)), model).data
+    
+    @staticmethod
+    def _build_model_schema(model, include_relations=True):
+        """Walk a model's fields and relations"""
         schema = {
-            'model': f"{app_label}.{model_name}",
+            'model': model._meta.label,
             'fields': [],
             'relations': [],
             'all_fields': []  # Flattened list including relation fields
@@ -166,12 +271,12 @@ class SchemaService:
         Get a tree structure of all reachable relations from a model.
         Useful for building a visual relation picker.
         """
-        try:
-            model = apps.get_model(app_label, model_name)
-        except LookupError:
+        model = SchemaService._resolve(app_label, model_name)
+        if model is None:
             return None
-        
-        return SchemaService._build_relation_tree(model, depth=0, max_depth=max_depth, visited=set())
+        if max_depth != 2:
+            return _freeze(SchemaService._build_relation_tree(model, depth=0, max_depth=max_depth, visited=set()))
+        return SchemaIndex.get(('tree', model._meta.label), model).data
     
     @staticmethod
     def _build_relation_tree(model, depth, max_depth, visited):
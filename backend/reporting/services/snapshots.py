@@ -0,0 +1,364 @@
+"""
+Materialized datasets.
+
+A Dataset with materialize=True is copied into a snapshot table, and reads
+(previews, grid, exports, jobs) go to the snapshot instead of re-running the
+joins. One row per primary-model row:
+
+    id | source_pk (unique) | one column per dataset column (same types)
+
+Filterable columns are indexed. The table name carries the dataset's
+version (updated_at), so editing a dataset switches reads back to the live
+query until a snapshot for the new definition has been built.
+
+Refreshes are run by the refresh_snapshots command:
+- full: the table is rebuilt from the live query inside one transaction.
+- incremental: only primary rows whose updated_at is newer than the
+  watermark (less WATERMARK_OVERLAP, for rows that commit after a
+  later-stamped one) are re-copied. Used when the primary model has
+  updated_at and nothing but primary rows have been saved.
+Committed writes mark datasets for refresh (post_save/post_delete, run in
+on_commit so writers don't queue on the Dataset row): saving a primary row
+asks for an incremental refresh; deletes or changes to any other table the
+query reads ask for a full one. Every mark bumps snapshot_generation, and a
+refresh only clears the mark if the generation it started from is still
+current. Refreshes are also due every refresh_interval minutes.
+"""
+import hashlib
+import threading
+import time
+from datetime import timedelta
+
+from django.apps.registry import Apps
+from django.db import DatabaseError, connection, models, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from ..models import Dataset
+from .executor import ExecutionPlan, compile_plan
+
+COPY_CHUNK_SIZE = 2000
+INDEX_TTL_SECONDS = 300
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+# Field options that belong to the source column, not its copy
+DROPPED_FIELD_OPTIONS = (
+    'primary_key', 'unique', 'db_index', 'db_column', 'default', 'auto_now', 'auto_now_add',
+    'editable', 'choices', 'validators', 'db_comment', 'verbose_name', 'help_text', 'blank', 'null',
+    'db_default', 'db_tablespace',
+)
+
+
+def table_name(dataset):
+    version = hashlib.sha1(dataset.updated_at.isoformat().encode()).hexdigest()[:8]
+    return f"ds_snap_{dataset.dataset_id.hex[:12]}_{version}"
+
+
+def is_current(dataset):
+    return bool(dataset.materialize and dataset.snapshot_table and dataset.snapshot_table == table_name(dataset))
+
+
+# ==================== SNAPSHOT MODEL ====================
+
+def _copy_field(field, indexed):
+    """A nullable column of the same type as `field`."""
+    while field.is_relation:
+        field = field.target_field
+    if isinstance(field, models.AutoField):
+        field = models.BigIntegerField() if isinstance(field, models.BigAutoField) else models.IntegerField()
+    _, path, args, kwargs = field.deconstruct()
+    for option in DROPPED_FIELD_OPTIONS:
+        kwargs.pop(option, None)
+    copy = field.__class__(*args, **kwargs)
+    copy.null = True
+    copy.db_index = indexed and not isinstance(copy, models.TextField)
+    return copy
+
+
+def _output_copy(output_field, indexed):
+    """Column for a calculated value (text results become TextField)."""
+    if output_field is None or isinstance(output_field, models.CharField) and not output_field.max_length:
+        return models.TextField(null=True)
+    return _copy_field(output_field, indexed)
+
+
+def snapshot_model(dataset, plan, table):
+    """Unregistered model class for a dataset's snapshot table, plus {path: field name}."""
+    filterable = set(dataset.columns.filter(is_filterable=True).values_list('field_name', flat=True))
+
+    attrs = {
+        '__module__': __name__,
+        'source_pk': _copy_field(plan.model._meta.pk, indexed=False),
+    }
+    attrs['source_pk'].unique = True
+    names = {}
+    for i, path in enumerate(plan.columns):
+        name = f"c{i}"
+        if path in plan.calculated:
+            attrs[name] = _output_copy(plan.field_for(path), path in filterable)
+        else:
+            attrs[name] = _copy_field(plan.field_for(path), path in filterable)
+        attrs[name].db_column = path[:64]
+        names[path] = name
+
+    # A private registry, so snapshot models never touch the app registry
+    attrs['Meta'] = type('Meta', (), {'app_label': 'reporting', 'db_table': table, 'apps': Apps()})
+    model = type(f"Snapshot_{table}", (models.Model,), attrs)
+    return model, names
+
+
+class SnapshotPlan(ExecutionPlan):
+    """ExecutionPlan reading a dataset's snapshot table; columns keep their dataset paths."""
+
+    def __init__(self, model, names, live_plan):
+        super().__init__(
+            model=model,
+            values_fields=list(names.values()),
+            select_related_paths=(),
+            annotations={},
+            alias_to_path={name: path for path, name in names.items()},
+        )
+        self.names = names
+        self.live_plan = live_plan
+
+    def lookup(self, column):
+        return self.names.get(column, column)
+
+    def field_for(self, path):
+        return self.model._meta.get_field(self.names[path])
+
+    def annotated(self, filters=None, columns=None):
+        translated = {}
+        for key, value in (filters or {}).items():
+            # Column paths contain '__' themselves: match the longest column prefix
+            path = max((p for p in self.names if key == p or key.startswith(p + '__')), key=len, default=None)
+            if path is None:
+                raise ValueError(f"Filter error: '{key}' is not a column of this materialized dataset")
+            translated[self.names[path] + key[len(path):]] = value
+        try:
+            return self.model.objects.filter(**translated)
+        except Exception as e:
+            raise ValueError(f"Filter error: {e}")
+
+
+def snapshot_plan(dataset, live_plan):
+    model, names = snapshot_model(dataset, live_plan, dataset.snapshot_table)
+    return SnapshotPlan(model, names, live_plan)
+
+
+# ==================== REFRESH ====================
+
+def _has_updated_at(model):
+    try:
+        return isinstance(model._meta.get_field('updated_at'), models.DateTimeField)
+    except Exception:
+        return False
+
+
+def _is_time_dependent(dataset):
+    formulas = dataset.columns.filter(is_calculated=True).values_list('formula', flat=True)
+    return any('TODAY(' in (f or '').upper() or 'NOW(' in (f or '').upper() for f in formulas)
+
+
+def _copy_rows(model, plan, names, qs):
+    """Insert the rows of a live values() queryset into the snapshot, keyset-paged by pk."""
+    fields = plan.values_fields
+    qs = qs.values('pk', *fields).order_by('pk')
+    copied = 0
+    last_pk = None
+    while True:
+        chunk = list((qs if last_pk is None else qs.filter(pk__gt=last_pk))[:COPY_CHUNK_SIZE])
+        if not chunk:
+            return copied
+        model.objects.bulk_create([
+            model(source_pk=row['pk'], **{names[plan.alias_to_path.get(f, f)]: row[f] for f in fields})
+            for row in chunk
+        ])
+        copied += len(chunk)
+        last_pk = chunk[-1]['pk']
+
+
+def _delete(qs):
+    # A plain DELETE: snapshot rows have no signals or relations to collect
+    qs._raw_delete(qs.db)
+
+
+def _drop_table(table):
+    if table and table in connection.introspection.table_names():
+        with connection.schema_editor() as editor:
+            editor.execute(editor.sql_delete_table % {'table': editor.quote_name(table)})
+
+
+def refresh(dataset, full=False):
+    """
+    Bring a dataset's snapshot up to date. Returns (mode, rows copied), mode
+    being 'full' or 'incremental'.
+    """
+    from .result_cache import bump_table, query_tables
+
+    plan = compile_plan(dataset)
+    # source_pk is unique: one snapshot row per source row
+    plan.require_single_row('materialized')
+    # Marks made from here on bump the generation and keep the dataset due
+    pending, generation = Dataset.objects.filter(pk=dataset.pk).values_list(
+        'snapshot_pending', 'snapshot_generation'
+    ).get()
+    table = table_name(dataset)
+    rebuild = dataset.snapshot_table != table or table not in connection.introspection.table_names()
+    incremental = (
+        not full and not rebuild and pending != 'full'
+        and dataset.snapshot_watermark is not None
+        and _has_updated_at(plan.model) and not _is_time_dependent(dataset)
+    )
+    model, names = snapshot_model(dataset, plan, table)
+    started = timezone.now()
+
+    if rebuild:
+        _drop_table(table)
+        with connection.schema_editor() as editor:
+            editor.create_model(model)
+
+    with transaction.atomic():
+        # Taken before copying, so rows saved meanwhile are picked up next time
+        watermark = None
+        if _has_updated_at(plan.model):
+            watermark = plan.model.objects.aggregate(latest=models.Max('updated_at'))['latest']
+
+        if incremental:
+            changed = plan.model.objects.filter(updated_at__gte=dataset.snapshot_watermark - WATERMARK_OVERLAP)
+            changed_pks = list(changed.values_list('pk', flat=True))
+            _delete(model.objects.filter(source_pk__in=changed_pks))
+            copied = _copy_rows(model, plan, names, plan.queryset().filter(pk__in=changed_pks))
+        else:
+            _delete(model.objects.all())
+            copied = _copy_rows(model, plan, names, plan.queryset())
+
+        Dataset.objects.filter(pk=dataset.pk).update(
+            snapshot_table=table,
+            snapshot_refreshed_at=started,
+            snapshot_watermark=watermark,
+            snapshot_sources=query_tables(plan.queryset()),
+        )
+        # Unless another change marked it while we were copying
+        Dataset.objects.filter(pk=dataset.pk, snapshot_generation=generation).update(snapshot_pending='')
+
+    if rebuild and dataset.snapshot_table and dataset.snapshot_table != table:
+        _drop_table(dataset.snapshot_table)
+    bump_table(table)
+    invalidate_index()
+    return ('incremental' if incremental else 'full'), copied
+
+
+def drop_snapshot(dataset):
+    _drop_table(dataset.snapshot_table)
+    Dataset.objects.filter(pk=dataset.pk).update(
+        snapshot_table='', snapshot_refreshed_at=None, snapshot_watermark=None, snapshot_pending='', snapshot_sources=[]
+    )
+    invalidate_index()
+
+
+def due_datasets(now=None):
+    """Materialized datasets whose snapshot is missing, outdated, marked for refresh or past its interval."""
+    now = now or timezone.now()
+    due = []
+    for dataset in Dataset.objects.filter(materialize=True, is_active=True):
+        if dataset.query_type == 'sql' or not dataset.primary_model:
+            continue
+        scheduled = (
+            dataset.refresh_interval
+            and dataset.snapshot_refreshed_at
+            and now - dataset.snapshot_refreshed_at >= timedelta(minutes=dataset.refresh_interval)
+        )
+        if not is_current(dataset) or dataset.snapshot_pending or scheduled:
+            due.append(dataset)
+    return due
+
+
+def abandoned_datasets():
+    """Datasets that still have a snapshot table but are no longer materialized."""
+    return list(Dataset.objects.filter(materialize=False).exclude(snapshot_table=''))
+
+
+# ==================== CHANGE TRACKING ====================
+
+_lock = threading.Lock()
+_index = None  # table -> [(dataset_id, is_primary_table)]
+_index_built_at = 0
+
+
+def _build_index():
+    from django.apps import apps
+
+    index = {}
+    for dataset_id, primary_model, sources in Dataset.objects.filter(materialize=True).exclude(
+        snapshot_table=''
+    ).values_list('dataset_id', 'primary_model', 'snapshot_sources'):
+        try:
+            primary_table = apps.get_model(primary_model)._meta.db_table
+        except (LookupError, ValueError, TypeError):
+            continue
+        for table in sources or [primary_table]:
+            index.setdefault(table, []).append((dataset_id, table == primary_table))
+    return index
+
+
+def get_index():
+    global _index, _index_built_at
+    with _lock:
+        if _index is None or time.monotonic() - _index_built_at > INDEX_TTL_SECONDS:
+            try:
+                _index = _build_index()
+            except DatabaseError:
+                # Saves during migrate, before the datasets table exists
+                return {}
+            _index_built_at = time.monotonic()
+        return _index
+
+
+def invalidate_index():
+    global _index
+    with _lock:
+        _index = None
+
+
+def _mark(table, deleted):
+    entries = get_index().get(table)
+    if not entries:
+        return
+    incremental = [dataset_id for dataset_id, primary in entries if primary and not deleted]
+    full = [dataset_id for dataset_id, primary in entries if not primary or deleted]
+
+    def mark():
+        generation = models.F('snapshot_generation') + 1
+        if incremental:
+            Dataset.objects.filter(pk__in=incremental).update(
+                snapshot_pending=models.Case(
+                    models.When(snapshot_pending='', then=models.Value('incremental')),
+                    default=models.F('snapshot_pending'),
+                ),
+                snapshot_generation=generation,
+            )
+        if full:
+            Dataset.objects.filter(pk__in=full).update(snapshot_pending='full', snapshot_generation=generation)
+
+    # After the writer commits: outside its transaction, and only for writes that happened
+    transaction.on_commit(mark)
+
+
+@receiver(post_save)
+def _row_saved(sender, **kwargs):
+    if sender is Dataset:
+        invalidate_index()
+        return
+    _mark(sender._meta.db_table, deleted=False)
+
+
+@receiver(post_delete)
+def _row_deleted(sender, instance, **kwargs):
+    if sender is Dataset:
+        invalidate_index()
+        if instance.snapshot_table:
+            transaction.on_commit(lambda: _drop_table(instance.snapshot_table))
+        return
+    _mark(sender._meta.db_table, deleted=True)
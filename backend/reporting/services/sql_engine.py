@@ -0,0 +1,203 @@
+"""
+SQL dataset engine.
+
+A dataset's sql_query is parsed with sqlparse and must be a single
+read-only SELECT (or WITH ... SELECT). It is never edited; instead it is
+wrapped as a derived table and everything the request adds goes on the
+outer query:
+
+    SELECT /*+ MAX_EXECUTION_TIME(30000) */ * FROM (<dataset sql>) ds
+    WHERE `status` = %s AND `hours` >= %s
+    LIMIT %s
+
+Filters use ORM-style keys ({'status': 'Open', 'hours__gte': 4}) against the
+dataset's output columns, and every value is a bound parameter.
+
+On MySQL the outer query carries a MAX_EXECUTION_TIME hint
+(settings.REPORTING_SQL_TIMEOUT_MS, added by hinted(), which callers that
+build their own SQL around subquery() use as well), and is EXPLAINed first;
+queries whose estimated row count exceeds settings.REPORTING_SQL_MAX_EXPLAIN_ROWS
+are rejected before they run. Either setting can be 0 to turn it off.
+"""
+import threading
+from collections import OrderedDict
+
+import sqlparse
+from django.conf import settings
+from django.db import connection
+from sqlparse import tokens as T
+
+ALIAS = 'ds'
+
+# Keywords that have no business in a read-only dataset query
+FORBIDDEN_KEYWORDS = {
+    'INTO', 'OUTFILE', 'DUMPFILE', 'LOCK', 'UNLOCK', 'GRANT', 'REVOKE', 'HANDLER',
+    'CALL', 'SLEEP', 'BENCHMARK', 'LOAD_FILE',
+}
+
+# Filter lookups, rendered with the backend's own operators (connection.operators)
+LOOKUPS = {
+    'exact', 'iexact', 'gt', 'gte', 'lt', 'lte',
+    'contains', 'icontains', 'startswith', 'istartswith', 'endswith', 'iendswith',
+}
+PATTERNS = {
+    'iexact': '{}', 'contains': '%{}%', 'icontains': '%{}%',
+    'startswith': '{}%', 'istartswith': '{}%', 'endswith': '%{}', 'iendswith': '%{}',
+}
+
+COLUMN_CACHE_SIZE = 256
+
+_columns_lock = threading.Lock()
+_columns = OrderedDict()  # dataset sql -> [column names]
+
+
+class SQLDatasetError(ValueError):
+    pass
+
+
+def prepare(sql):
+    """
+    Validated dataset SQL, ready to be wrapped as a subquery: one read-only
+    SELECT, comments and trailing semicolons removed.
+    """
+    if not sql or not sql.strip():
+        raise SQLDatasetError("SQL query is empty")
+
+    cleaned = sqlparse.format(sql, strip_comments=True).strip().rstrip(';').strip()
+    statements = [s for s in sqlparse.parse(cleaned) if s.value.strip()]
+    if len(statements) != 1:
+        raise SQLDatasetError("Only a single SQL statement is allowed")
+
+    statement = statements[0]
+    if statement.get_type() != 'SELECT':
+        raise SQLDatasetError("Only SELECT queries are allowed")
+
+    for token in statement.flatten():
+        if token.ttype in (T.Keyword.DML, T.Keyword.DDL) and token.normalized != 'SELECT':
+            raise SQLDatasetError(f"'{token.normalized}' is not allowed in a dataset query")
+        if token.ttype in T.Keyword or token.ttype in T.Name:
+            if token.normalized.upper() in FORBIDDEN_KEYWORDS:
+                raise SQLDatasetError(f"'{token.value}' is not allowed in a dataset query")
+
+    return cleaned
+
+
+def subquery(sql):
+    """`(<dataset sql>) ds`, with % escaped for use alongside bound parameters."""
+    return f"({prepare(sql).replace('%', '%%')}) {ALIAS}"
+
+
+def get_columns(sql):
+    """Output column names of the dataset SQL (cached per SQL text)."""
+    inner = prepare(sql)
+    with _columns_lock:
+        if inner in _columns:
+            _columns.move_to_end(inner)
+            return _columns[inner]
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT * FROM {subquery(sql)} WHERE 1 = 0", [])
+        names = [col[0] for col in cursor.description]
+
+    with _columns_lock:
+        _columns[inner] = names
+        while len(_columns) > COLUMN_CACHE_SIZE:
+            _columns.popitem(last=False)
+    return names
+
+
+def where_clause(filters, columns):
+    """(' WHERE ...', params) for ORM-style filters on the dataset's columns."""
+    if not filters:
+        return '', []
+
+    clauses, params = [], []
+    for key, value in filters.items():
+        col, _, lookup = key.partition('__')
+        lookup = lookup or 'exact'
+        if col not in columns:
+            raise SQLDatasetError(f"Unknown filter column '{col}'")
+        qcol = connection.ops.quote_name(col)
+
+        if lookup == 'in':
+            values = list(value or [])
+            if not values:
+                clauses.append('1 = 0')
+                continue
+            clauses.append(f"{qcol} IN ({', '.join(['%s'] * len(values))})")
+            params += values
+        elif lookup == 'range':
+            low, high = value
+            clauses.append(f"{qcol} BETWEEN %s AND %s")
+            params += [low, high]
+        elif lookup == 'isnull':
+            clauses.append(f"{qcol} IS {'' if value else 'NOT '}NULL")
+        elif lookup == 'exact' and value is None:
+            clauses.append(f"{qcol} IS NULL")
+        elif lookup in LOOKUPS:
+            if lookup in PATTERNS:
+                value = PATTERNS[lookup].format(connection.ops.prep_for_like_query(value))
+            clauses.append(f"{qcol} {connection.operators[lookup]}")
+            params.append(value)
+        else:
+            raise SQLDatasetError(f"Unsupported filter lookup '{lookup}'")
+
+    return ' WHERE ' + ' AND '.join(clauses), params
+
+
+def hinted(select_sql):
+    """`select_sql` (an outer query starting with SELECT) with the MAX_EXECUTION_TIME hint on MySQL."""
+    timeout_ms = getattr(settings, 'REPORTING_SQL_TIMEOUT_MS', 0)
+    if not timeout_ms or connection.vendor != 'mysql':
+        return select_sql
+    head, rest = select_sql[:6], select_sql[6:]
+    if head.upper() != 'SELECT':
+        raise SQLDatasetError("Only SELECT queries can carry a timeout hint")
+    return f"{head} /*+ MAX_EXECUTION_TIME({int(timeout_ms)}) */{rest}"
+
+
+def build(sql, filters=None, limit=None, timeout=True):
+    """(outer sql, params) selecting the dataset's rows with filters and limit applied."""
+    where, params = where_clause(filters, get_columns(sql) if filters else [])
+
+    outer = f"SELECT * FROM {subquery(sql)}{where}"
+    if timeout:
+        outer = hinted(outer)
+    if limit is not None:
+        outer += " LIMIT %s"
+        params.append(int(limit))
+    return outer, params
+
+
+def estimate_rows(cursor, sql, params):
+    """MySQL's EXPLAIN row estimate: per SELECT, the product of rows x filtered across its tables."""
+    cursor.execute(f"EXPLAIN {sql}", params)
+    columns = [col[0] for col in cursor.description]
+    per_select = {}
+    for row in cursor.fetchall():
+        plan = dict(zip(columns, row))
+        rows = float(plan.get('rows') or 1) * float(plan.get('filtered') or 100) / 100
+        per_select[plan.get('id')] = per_select.get(plan.get('id'), 1) * max(rows, 1)
+    return int(sum(per_select.values()))
+
+
+def check_budget(cursor, sql, params):
+    budget = getattr(settings, 'REPORTING_SQL_MAX_EXPLAIN_ROWS', 0)
+    if not budget or connection.vendor != 'mysql':
+        return
+    estimate = estimate_rows(cursor, sql, params)
+    if estimate > budget:
+        raise SQLDatasetError(
+            f"Query is too expensive: an estimated {estimate:,} rows would be examined "
+            f"(limit {budget:,}). Narrow the query or add filters."
+        )
+
+
+def execute(sql, filters=None, limit=100):
+    """Rows of the dataset SQL as dicts, after the safety checks."""
+    outer, params = build(sql, filters, limit)
+    with connection.cursor() as cursor:
+        check_budget(cursor, outer, params)
+        cursor.execute(outer, params)
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
@@ -0,0 +1,17 @@
+"""
+Signals for the reporting module
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Dataset, DatasetColumn
+
+
+@receiver(post_save, sender=DatasetColumn)
+@receiver(post_delete, sender=DatasetColumn)
+def touch_dataset(sender, instance, **kwargs):
+    """Column edits change the dataset's compiled plan: bump its updated_at."""
+    from .services.executor import clear_plans
+    Dataset.objects.filter(dataset_id=instance.dataset_id).update(updated_at=timezone.now())
+    clear_plans(instance.dataset_id)
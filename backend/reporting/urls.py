@@ -4,17 +4,20 @@ from .views import (
     ReportDefinitionViewSet, 
     DatasetViewSet,
     DatasetColumnViewSet,
+    ReportJobViewSet,
     SchemaView, 
     SchemaView, 
     PreviewView,
     OptionsView,
-    FixColumnsView
+    FixColumnsView,
+    CacheStatsView
 )
 
 router = DefaultRouter()
 router.register(r'definitions', ReportDefinitionViewSet)
 router.register(r'datasets', DatasetViewSet)
 router.register(r'columns', DatasetColumnViewSet)
+router.register(r'jobs', ReportJobViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -22,5 +25,6 @@ urlpatterns = [
     path('preview/', PreviewView.as_view(), name='preview'),
     path('options/', OptionsView.as_view(), name='options'),
     path('fix-columns/', FixColumnsView.as_view(), name='fix-columns'),
+    path('cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
 ]
 
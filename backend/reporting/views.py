@@ -1,16 +1,26 @@
-from rest_framework import viewsets, views, status
+import json
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse, HttpResponseNotModified
+
+from rest_framework import mixins, viewsets, views, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import ReportDefinition, Dataset, DatasetColumn
+from .models import ReportDefinition, Dataset, DatasetColumn, ReportJob
 from .serializers import (
     ReportDefinitionSerializer, 
     DatasetSerializer, 
     DatasetListSerializer,
-    DatasetColumnSerializer
+    DatasetColumnSerializer,
+    ReportJobSerializer
 )
 from .services.schema import SchemaService
 from .services.query import QueryBuilderService
 from .services.executor import DatasetExecutor
+from .services.result_cache import get_or_compute, get_stats, query_tables
+from .services.grid import ServerSideRowModel
+from .services.export import dataset_rows, report_rows, export_response
+from .services.options import field_options, instance_options
+from .services import jobs
 
 
 class DatasetViewSet(viewsets.ModelViewSet):
@@ -38,7 +48,7 @@ class DatasetViewSet(viewsets.ModelViewSet):
         limit = request.data.get('limit', 50)
         
         try:
-            data = DatasetExecutor.execute(dataset, filters, limit)
+            data = DatasetExecutor.execute_cached(dataset, filters, limit)
             columns = DatasetExecutor.get_columns(dataset)
             return Response({
                 'data': data,
@@ -48,6 +58,33 @@ class DatasetViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({'error': str(e)}, status=400)
     
+    @action(detail=True, methods=['post'])
+    def rows(self, request, pk=None):
+        """AG Grid server-side row model: one window of rows (or groups) plus lastRow"""
+        dataset = self.get_object()
+        try:
+            return Response(ServerSideRowModel.execute(dataset, request.data, request.data.get('filters')))
+        except Exception as e:
+            return Response({'error': str(e)}, status=400)
+    
+    @action(detail=True, methods=['get'], url_path=r'export/(?P<file_type>csv|xlsx)')
+    def export(self, request, pk=None, file_type='csv'):
+        """Download every row as CSV or XLSX (?filters={json})"""
+        dataset = self.get_object()
+        try:
+            filters = json.loads(request.query_params.get('filters') or '{}')
+            headers, rows = dataset_rows(dataset, filters)
+            return export_response(headers, rows, dataset.name, file_type)
+        except Exception as e:
+            return Response({'error': str(e)}, status=400)
+    
+    @action(detail=True, methods=['get'])
+    def cache_stats(self, request, pk=None):
+        """Result cache hit/miss counts for this dataset"""
+        dataset = self.get_object()
+        dataset_id = str(dataset.dataset_id)
+        return Response({'dataset_id': dataset_id, **get_stats([dataset_id])[dataset_id]})
+    
     @action(detail=True, methods=['post'])
     def add_column(self, request, pk=None):
         """Add a column to dataset"""
@@ -86,33 +123,51 @@ class ReportDefinitionViewSet(viewsets.ModelViewSet):
             
         serializer.save(created_by=created_by)
 
+    @action(detail=True, methods=['post'])
+    def rows(self, request, pk=None):
+        """AG Grid server-side row model over the report's dataset and saved filters"""
+        report = self.get_object()
+        if not report.dataset:
+            return Response({'error': 'Report has no dataset'}, status=400)
+        filters = {**(report.filters or {}), **(request.data.get('filters') or {})}
+        try:
+            return Response(ServerSideRowModel.execute(report.dataset, request.data, filters))
+        except Exception as e:
+            return Response({'error': str(e)}, status=400)
+
+    @action(detail=True, methods=['get'], url_path=r'export/(?P<file_type>csv|xlsx)')
+    def export(self, request, pk=None, file_type='csv'):
+        """Download the full report as CSV or XLSX (?filters={json})"""
+        report = self.get_object()
+        try:
+            filters = json.loads(request.query_params.get('filters') or '{}')
+            headers, rows = report_rows(report, filters)
+            return export_response(headers, rows, report.name, file_type)
+        except Exception as e:
+            return Response({'error': str(e)}, status=400)
+
 
 class SchemaView(views.APIView):
-    """GET /api/reporting/schema/ -> List models or model fields"""
+    """GET /api/reporting/schema/ -> List models or model fields (ETag-cached)"""
     def get(self, request):
         model_key = request.query_params.get('model')
         tree = request.query_params.get('tree')  # If ?tree=true, return relation tree
         
-        if not model_key:
-            return Response(SchemaService.get_models())
+        try:
+            entry = SchemaService.get_entry(model_key, tree=bool(tree))
+        except ValueError:
+            return Response({'error': 'Invalid format. Use app.Model'}, status=400)
+        if entry is None:
+            return Response({'error': 'Model not found'}, status=404)
+        
+        if entry.etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
         else:
-            try:
-                app_label, model_name = model_key.split('.')
-                
-                if tree:
-                    # Return relation tree for visual picker
-                    relation_tree = SchemaService.get_relation_tree(app_label, model_name)
-                    if relation_tree:
-                        return Response(relation_tree)
-                    return Response({'error': 'Model not found'}, status=404)
-                
-                schema = SchemaService.get_model_schema(app_label, model_name)
-                if schema:
-                    return Response(schema)
-                return Response({'error': 'Model not found'}, status=404)
-            except ValueError:
-                return Response({'error': 'Invalid format. Use app.Model'}, status=400)
-
+            response = HttpResponse(entry.json, content_type='application/json')
+        response['ETag'] = entry.etag
+        # Browsers keep the copy and revalidate it with If-None-Match
+        response['Cache-Control'] = 'no-cache'
+        return response
 
 
 class PreviewView(views.APIView):
@@ -126,7 +181,15 @@ class PreviewView(views.APIView):
             try:
                 dataset = Dataset.objects.get(dataset_id=dataset_id)
                 filters = config.get('filters', {})
-                data = DatasetExecutor.execute(dataset, filters, limit=50)
+                if config.get('async'):
+                    # Long-running datasets: queue a job and let the grid poll it
+                    try:
+                        limit = jobs.parse_limit(config.get('limit'))
+                    except ValueError as e:
+                        return Response({'error': str(e)}, status=400)
+                    job, created = jobs.submit(dataset, filters, limit)
+                    return Response({'job': ReportJobSerializer(job).data, 'coalesced': not created}, status=202)
+                data = DatasetExecutor.execute_cached(dataset, filters, limit=50)
                 return Response({'data': data, 'count': len(data)})
             except Dataset.DoesNotExist:
                 return Response({'error': 'Dataset not found'}, status=404)
@@ -138,42 +201,113 @@ class PreviewView(views.APIView):
         # Legacy: direct model query
         try:
             qs = QueryBuilderService.build_query(config)
-            data = list(qs[:50])
+            scope = {k: config.get(k) for k in ('primary_model', 'columns')}
+            data = get_or_compute(
+                f"query:{json.dumps(scope, sort_keys=True)}", config.get('filters', {}), 50,
+                lambda: list(qs[:50]),
+                tables=query_tables(qs),
+                stats_id=f"model:{config.get('primary_model')}",
+            )
             return Response({'data': data, 'count': len(data)})
         except Exception as e:
             import traceback
             traceback.print_exc()
             return Response({'error': str(e)}, status=400)
 
+class ReportJobViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Report jobs: POST {dataset_id | report_id, filters, limit} queues a run
+    (or returns the matching queued/running/recent one); poll the job, then
+    page through its stored result with rows/.
+    """
+    queryset = ReportJob.objects.select_related('dataset')
+    serializer_class = ReportJobSerializer
+    
+    def get_queryset(self):
+        qs = super().get_queryset()
+        dataset_id = self.request.query_params.get('dataset')
+        if dataset_id:
+            qs = qs.filter(dataset_id=dataset_id)
+        return qs
+    
+    def create(self, request, *args, **kwargs):
+        filters = request.data.get('filters') or {}
+        report = None
+        try:
+            if request.data.get('report_id'):
+                report = ReportDefinition.objects.select_related('dataset').get(report_id=request.data['report_id'])
+                if not report.dataset:
+                    return Response({'error': 'Report has no dataset'}, status=400)
+                dataset = report.dataset
+                filters = {**(report.filters or {}), **filters}
+            else:
+                dataset = Dataset.objects.get(dataset_id=request.data.get('dataset_id'))
+        except (ReportDefinition.DoesNotExist, Dataset.DoesNotExist, ValidationError, ValueError):
+            return Response({'error': 'Dataset not found'}, status=404)
+        
+        try:
+            limit = jobs.parse_limit(request.data.get('limit'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        
+        job, created = jobs.submit(dataset, filters, limit, report=report)
+        return Response(
+            {**self.get_serializer(job).data, 'coalesced': not created},
+            status=201 if created else 200
+        )
+    
+    @action(detail=True, methods=['get', 'post'])
+    def rows(self, request, pk=None):
+        """One window of the stored result: startRow/endRow -> {rows, lastRow}"""
+        job = self.get_object()
+        params = request.data if request.method == 'POST' else request.query_params
+        try:
+            start = int(params.get('startRow') or 0)
+            end = int(params.get('endRow') or start + 100)
+            return Response({'rows': jobs.read_rows(job, start, end), 'lastRow': job.row_count})
+        except ValueError as e:
+            return Response({'error': str(e), 'status': job.status}, status=409)
+
+
 class OptionsView(views.APIView):
-    """GET /api/reporting/options/?model=app.Model"""
+    """
+    GET /api/reporting/options/?model=app.Model[&field=path][&q=prefix][&after=cursor][&limit=50]
+    Returns a list of {value, label}; X-Next-Cursor holds `after` for the next page.
+    """
     def get(self, request):
         model_key = request.query_params.get('model')
         if not model_key: return Response({'error': 'Model required'}, status=400)
         
+        field_name = request.query_params.get('field')
+        q = request.query_params.get('q') or None
+        after = request.query_params.get('after')
+        limit = request.query_params.get('limit')
+        
         try:
-            from django.apps import apps
-            app_label, model_name = model_key.split('.')
-            Model = apps.get_model(app_label, model_name)
-            
-            # Check if specific field requested
-            field_name = request.query_params.get('field')
             if field_name:
-                 # Fetch distinct values for specific field (e.g. status, category)
-                 qs = Model.objects.values_list(field_name, flat=True).distinct().order_by(field_name)[:50]
-                 options = [{'value': str(x), 'label': str(x)} for x in qs if x is not None]
-                 return Response(options)
-
-            # Default: Model instances (ID/Label)
-            # Limit to 50 options for dropdown
-            qs = Model.objects.all()[:50]
-            options = []
-            for obj in qs:
-                options.append({'value': obj.pk, 'label': str(obj)})
-            
-            return Response(options)
+                # Distinct values for a specific field (e.g. status, category)
+                options, next_cursor = field_options(model_key, field_name, q, after, limit)
+            else:
+                # Default: Model instances (ID/Label)
+                options, next_cursor = instance_options(model_key, q, after, limit)
         except Exception as e:
             return Response({'error': str(e)}, status=400)
+        
+        response = Response(options)
+        if next_cursor is not None:
+            response['X-Next-Cursor'] = next_cursor
+        return response
+
+
+class CacheStatsView(views.APIView):
+    """GET /api/reporting/cache-stats/ - Result cache hit/miss counts per dataset"""
+    def get(self, request):
+        datasets = list(Dataset.objects.values_list('dataset_id', 'name'))
+        stats = get_stats([str(dataset_id) for dataset_id, _ in datasets])
+        return Response([
+            {'dataset_id': str(dataset_id), 'name': name, **stats[str(dataset_id)]}
+            for dataset_id, name in datasets
+        ])
 
 
 class FixColumnsView(views.APIView):
@@ -23,24 +23,26 @@ def seed_history():
     prefixes = ["Task #101", "Bug #205", "Feature #304", "Deploy v1.2"]
     
     # Create 5 random transactions
+    entries = []
     for i in range(5):
         rule = random.choice(rules)
         prefix = random.choice(prefixes)
         
-        CreditLedger.objects.create(
+        entries.append(CreditLedger(
             member_id=member_id,
             amount=rule.credits,
             reason=f"{rule.name}: {prefix} - {random.randint(1,100)}",
             rule=rule,
             created_at=timezone.now() - timedelta(days=i)
-        )
+        ))
         print(f"   + {rule.credits} Credits")
 
+    # Write through the ledger service so UserLevel totals stay in sync
+    from gamification.services import append_ledger
+    append_ledger(entries)
+
     # Update Level
-    from django.db.models import Sum
-    total = CreditLedger.objects.filter(member_id=member_id).aggregate(Sum('amount'))['amount__sum'] or 0
     ul, _ = UserLevel.objects.get_or_create(member_id=member_id)
-    ul.total_credits = total
     ul.calculate_level()
     print(f"   ✅ User Level Updated: {ul.current_level} ({ul.total_credits} Credits)")
 